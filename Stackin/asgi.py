@@ -1,7 +1,9 @@
 """
-ASGI config for firstproject project.
+ASGI config for Stackin project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP đi vào Django; WebSocket được route theo path tới các ASGI app real-time
+(xem Stackin/realtime.py).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -11,6 +13,26 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'firstproject.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Stackin.settings')
 
-application = get_asgi_application()
+# Khởi tạo Django trước khi import code dùng model
+django_application = get_asgi_application()
+
+from chat.realtime import chat_websocket  # noqa: E402
+from noti.realtime import notifications_websocket  # noqa: E402
+
+WEBSOCKET_ROUTES = {
+    '/ws/notifications/': notifications_websocket,
+    '/ws/chat/': chat_websocket,  # ?room=<room_id>&token=<JWT>
+}
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        handler = WEBSOCKET_ROUTES.get(scope['path'])
+        if handler is None:
+            await receive()  # websocket.connect
+            await send({'type': 'websocket.close', 'code': 4404})
+            return
+        return await handler(scope, receive, send)
+    return await django_application(scope, receive, send)
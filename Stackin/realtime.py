@@ -0,0 +1,178 @@
+# Stackin/realtime.py
+"""
+Hạ tầng real-time dùng chung (push notification, chat...).
+
+- Broker: pub/sub theo channel (string). Code đồng bộ (view, relay worker) gọi publish();
+  consumer async (WebSocket / SSE trên ASGI) gọi subscribe() rồi đọc message.
+- InMemoryBroker: broker trong process, đủ cho dev / 1 process ASGI. Chạy nhiều process
+  thì cắm broker liên process (vd Redis pub/sub) qua setting REALTIME_BROKER
+  (dotted path tới class kế thừa Broker).
+- publish_on_commit(): chỉ phát sau khi transaction commit, client không nhận
+  sự kiện của dữ liệu bị rollback.
+- authenticate_scope(): xác thực JWT (simplejwt) cho kết nối ASGI, token lấy từ
+  query string ?token=... hoặc header Authorization: Bearer ...
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils.module_loading import import_string
+
+DEFAULT_QUEUE_SIZE = 256
+
+
+class Subscription:
+    """Hàng đợi message của 1 consumer; dùng trong event loop đã subscribe."""
+
+    def __init__(self, broker: "Broker", channels, maxsize: int = DEFAULT_QUEUE_SIZE):
+        self.broker = broker
+        self.channels = tuple(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def deliver(self, channel, message):
+        try:
+            self.queue.put_nowait((channel, message))
+        except asyncio.QueueFull:
+            # Consumer quá chậm: bỏ message, client tự đồng bộ lại qua API REST
+            self.dropped += 1
+
+    async def get(self, timeout: float | None = None):
+        """Trả về (channel, message); hết timeout thì trả về None."""
+        if timeout is None:
+            return await self.queue.get()
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    """Interface broker pub/sub."""
+
+    def publish(self, channel: str, message: dict):
+        raise NotImplementedError
+
+    def subscribe(self, *channels, maxsize: int = DEFAULT_QUEUE_SIZE) -> Subscription:
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription: Subscription):
+        raise NotImplementedError
+
+
+class InMemoryBroker(Broker):
+    """
+    Broker trong process. publish() an toàn khi gọi từ thread bất kỳ: message được
+    chuyển vào event loop của từng subscriber bằng call_soon_threadsafe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # channel -> set[Subscription]
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(sub.deliver, channel, message)
+            except RuntimeError:
+                # Event loop của subscriber đã đóng
+                self.unsubscribe(sub)
+        return len(subscribers)
+
+    def subscribe(self, *channels, maxsize=DEFAULT_QUEUE_SIZE):
+        sub = Subscription(self, channels, maxsize=maxsize)
+        with self._lock:
+            for channel in sub.channels:
+                self._subscribers.setdefault(channel, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subs = self._subscribers.get(channel)
+                if subs is None:
+                    continue
+                subs.discard(subscription)
+                if not subs:
+                    del self._subscribers[channel]
+
+    def subscriber_count(self, channel) -> int:
+        with self._lock:
+            return len(self._subscribers.get(channel, ()))
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker() -> Broker:
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, "REALTIME_BROKER", "Stackin.realtime.InMemoryBroker")
+                _broker = import_string(path)()
+    return _broker
+
+
+def publish(channel: str, message: dict):
+    return get_broker().publish(channel, message)
+
+
+def publish_on_commit(channel: str, message: dict):
+    transaction.on_commit(lambda: publish(channel, message))
+
+
+def db_sync_to_async(func):
+    """
+    sync_to_async cho code chạm DB từ consumer ASGI không đi qua request cycle
+    (WebSocket): dọn connection cũ trước/sau như Django làm cho mỗi request.
+    """
+    def inner(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(inner)
+
+
+def scope_token(scope) -> str | None:
+    query = parse_qs(scope.get("query_string", b"").decode())
+    if query.get("token"):
+        return query["token"][0]
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            parts = value.decode().split()
+            if len(parts) == 2 and parts[0].lower() == "bearer":
+                return parts[1]
+    return None
+
+
+def user_from_token(raw_token: str | None):
+    """Trả về user active ứng với access token JWT, sai/hết hạn thì None."""
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+
+    if not raw_token:
+        return None
+    auth = JWTAuthentication()
+    try:
+        return auth.get_user(auth.get_validated_token(raw_token))
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+
+async def authenticate_scope(scope):
+    return await db_sync_to_async(user_from_token)(scope_token(scope))
@@ -23,6 +23,11 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = 'django-insecure-awloy4r_x5lk!9de)-ib=*_9t-jk_bqw6py7=@*6=0h7_@bbvv'
 WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "mock-secret")
+# Tiền tệ quy đổi cho dashboard/sao kê & TTL cache tỷ giá (giây)
+REPORTING_CURRENCY = os.getenv("REPORTING_CURRENCY", "VND")
+FX_CACHE_TTL = int(os.getenv("FX_CACHE_TTL", "300"))
+# Phí nền tảng mặc định (%) khi không có FeeRule nào khớp
+PLATFORM_FEE_PERCENT_DEFAULT = os.getenv("PLATFORM_FEE_PERCENT_DEFAULT", "10.00")
 
 
 # SECURITY WARNING: don't run with debug turned on in production!
@@ -51,6 +56,7 @@ INSTALLED_APPS = [
     'chat',
     'report',
     'chatbot',
+    'outbox',
 ]
 
 MIDDLEWARE = [
@@ -85,6 +91,44 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'Stackin.wsgi.application'
+ASGI_APPLICATION = 'Stackin.asgi.application'
+
+# Broker pub/sub cho push real-time (WebSocket/SSE); mặc định broker trong process
+REALTIME_BROKER = os.getenv("REALTIME_BROKER", "Stackin.realtime.InMemoryBroker")
+
+# SMTP cho kênh email; dev: `python manage.py smtp_debug_server` (localhost:1025)
+EMAIL_BACKEND = os.getenv("EMAIL_BACKEND", "django.core.mail.backends.smtp.EmailBackend")
+EMAIL_HOST = os.getenv("EMAIL_HOST", "localhost")
+EMAIL_PORT = int(os.getenv("EMAIL_PORT", "1025"))
+EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER", "")
+EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD", "")
+EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "False") == "True"
+EMAIL_TIMEOUT = 10
+DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "Stackin <no-reply@stackin.local>")
+
+# Kênh gửi notification ra ngoài (noti/channels.py, worker: dispatch_notifications).
+# Kênh không có ở đây thì notification chỉ lưu in-app.
+NOTIFICATION_CHANNELS = {
+    "email": {"BACKEND": "noti.channels.EmailChannel", "BATCH_SIZE": 50, "CONCURRENCY": 4, "MAX_ATTEMPTS": 6},
+    "sms": {"BACKEND": "noti.channels.StubChannel", "ADDRESS_FIELD": "phone",
+            "BATCH_SIZE": 100, "CONCURRENCY": 2, "MAX_ATTEMPTS": 5},
+    "push": {"BACKEND": "noti.channels.StubChannel", "BATCH_SIZE": 500, "CONCURRENCY": 2, "MAX_ATTEMPTS": 5},
+}
+
+# Gộp notification chưa đọc cùng (user, category, task) trong cửa sổ (giây) thay vì tạo dòng mới
+NOTIFICATION_COALESCE_WINDOWS = {
+    "chat": 10 * 60,
+    "review": 60 * 60,
+}
+
+# Lưu giữ notification (lệnh purge_notifications): số ngày theo created_at, None = giữ mãi
+NOTIFICATION_RETENTION = {
+    "MODE": os.getenv("NOTIFICATION_RETENTION_MODE", "delete"),  # "delete" | "archive"
+    "READ_DAYS": 90,
+    "ARCHIVED_DAYS": 30,
+    "UNREAD_DAYS": None,
+    "BATCH_SIZE": 1000,
+}
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -1,5 +1,5 @@
 """
-WSGI config for firstproject project.
+WSGI config for Stackin project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
 
@@ -11,6 +11,6 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'firstproject.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Stackin.settings')
 
 application = get_wsgi_application()
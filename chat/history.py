@@ -0,0 +1,115 @@
+# chat/history.py
+"""
+Lịch sử tin nhắn của 1 room (ChatMessageListView): phân trang 2 chiều theo id tin nhắn.
+
+- id tăng theo thứ tự insert nên dùng làm thứ tự thời gian; mọi trang là 1 range trên
+  index (room, id) rồi dừng ở LIMIT, không OFFSET, không filesort, kể cả room rất dài:
+    (mặc định)  tin mới nhất          room_id = ? ORDER BY id DESC LIMIT n+1
+    ?before=X   các tin cũ hơn X      room_id = ? AND id < X ORDER BY id DESC LIMIT n+1
+    ?after=X    các tin mới hơn X     room_id = ? AND id > X ORDER BY id ASC LIMIT n+1
+- results luôn theo thứ tự cũ -> mới; "previous" / "next" là link trang cũ hơn / mới hơn
+  (null nếu không còn).
+- explain_history_plans(): EXPLAIN cả 3 dạng (lệnh explain_chat_history).
+"""
+from __future__ import annotations
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .models import ChatMessage
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 100
+
+
+def _int_param(request, name):
+    raw = request.query_params.get(name)
+    if raw in (None, ""):
+        return None
+    try:
+        return int(raw)
+    except ValueError:
+        raise ValidationError({name: "Must be an integer."})
+
+
+def history_page(qs, before=None, after=None, limit=DEFAULT_LIMIT):
+    """(rows cũ -> mới, còn tin cũ hơn, còn tin mới hơn) cho queryset tin nhắn của 1 room."""
+    if after is not None:
+        rows = list(qs.filter(id__gt=after).order_by("id")[:limit + 1])
+        has_newer = len(rows) > limit
+        return rows[:limit], True, has_newer
+    if before is not None:
+        qs = qs.filter(id__lt=before)
+    rows = list(qs.order_by("-id")[:limit + 1])
+    has_older = len(rows) > limit
+    rows = rows[:limit]
+    rows.reverse()
+    return rows, has_older, before is not None
+
+
+class MessageHistoryPagination(BasePagination):
+    """
+    ?limit=<1..100>&before=<message id> | &after=<message id>.
+    Response: {"previous": <url|null>, "next": <url|null>, "results": [...]}.
+    """
+    limit_query_param = "limit"
+    before_query_param = "before"
+    after_query_param = "after"
+
+    def get_limit(self, request) -> int:
+        limit = _int_param(request, self.limit_query_param)
+        if limit is None:
+            return DEFAULT_LIMIT
+        return max(1, min(limit, MAX_LIMIT))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        before = _int_param(request, self.before_query_param)
+        after = _int_param(request, self.after_query_param)
+        if before is not None and after is not None:
+            raise ValidationError({"before": "Use either before or after, not both."})
+
+        rows, has_older, has_newer = history_page(queryset, before, after, self.get_limit(request))
+        # Trang rỗng (vd after = tin mới nhất): giữ mốc cũ để client hỏi tiếp từ đúng vị trí
+        self.before_id = rows[0].id if rows else (after + 1 if after is not None else None)
+        self.after_id = rows[-1].id if rows else (before - 1 if before is not None else None)
+        self.has_older = has_older and self.before_id is not None
+        self.has_newer = has_newer and self.after_id is not None
+        return rows
+
+    def _link(self, param, value):
+        url = self.request.build_absolute_uri()
+        other = self.after_query_param if param == self.before_query_param else self.before_query_param
+        return replace_query_param(remove_query_param(url, other), param, value)
+
+    def get_previous_link(self):
+        return self._link(self.before_query_param, self.before_id) if self.has_older else None
+
+    def get_next_link(self):
+        return self._link(self.after_query_param, self.after_id) if self.has_newer else None
+
+    def get_paginated_response(self, data):
+        return Response({"previous": self.get_previous_link(), "next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+def explain_history_plans(room_id, limit=DEFAULT_LIMIT) -> list:
+    """[(mô tả, text EXPLAIN)] cho trang mới nhất, ?before= và ?after=."""
+    qs = ChatMessage.objects.filter(room_id=room_id)
+    pivot = 2 ** 62
+    return [
+        ("latest", qs.order_by("-id")[:limit + 1].explain()),
+        ("before", qs.filter(id__lt=pivot).order_by("-id")[:limit + 1].explain()),
+        ("after", qs.filter(id__gt=0).order_by("id")[:limit + 1].explain()),
+    ]
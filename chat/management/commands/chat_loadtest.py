@@ -0,0 +1,180 @@
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from chat.models import ChatRoom
+from chat.realtime import chat_websocket
+from task.models import Category, Task
+
+
+class _Connection:
+    """Client WebSocket giả lập: nói chuyện trực tiếp với ASGI app qua hàng đợi, không qua mạng."""
+
+    def __init__(self, room_id, token, stats):
+        self.room_id = room_id
+        self.scope = {
+            'type': 'websocket', 'path': '/ws/chat/', 'headers': [],
+            'query_string': f'room={room_id}&token={token}'.encode(),
+        }
+        self.inbox = asyncio.Queue()
+        self.ready = asyncio.Event()
+        self.close_code = None
+        self.stats = stats
+        self.task = None
+
+    async def receive(self):
+        return await self.inbox.get()
+
+    async def send(self, message):
+        kind = message['type']
+        if kind == 'websocket.accept':
+            self.ready.set()
+        elif kind == 'websocket.close':
+            self.close_code = message.get('code')
+            self.ready.set()
+        elif kind == 'websocket.send':
+            payload = json.loads(message['text'])
+            if payload['type'] == 'message':
+                sent_at = float(payload['message']['content'].rsplit(' ', 1)[1])
+                self.stats['latencies'].append(time.perf_counter() - sent_at)
+            elif payload['type'] == 'ack':
+                self.stats['acked'] += 1
+
+    async def open(self):
+        self.task = asyncio.ensure_future(chat_websocket(self.scope, self.receive, self.send))
+        await self.inbox.put({'type': 'websocket.connect'})
+        await self.ready.wait()
+        return self.close_code is None
+
+    def post(self, seq):
+        text = json.dumps({'type': 'message', 'client_id': seq, 'content': f'load {seq} {time.perf_counter()}'})
+        self.inbox.put_nowait({'type': 'websocket.receive', 'text': text})
+
+    async def close(self):
+        await self.inbox.put({'type': 'websocket.disconnect', 'code': 1000})
+        await self.task
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test the chat WebSocket gateway in-process: thousands of connections over N rooms, '
+        'messages persisted and fanned out through the realtime broker (synthetic data is deleted afterwards)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=100)
+        parser.add_argument('--connections', type=int, default=2000, help='Spread evenly over the rooms')
+        parser.add_argument('--messages', type=int, default=2000)
+        parser.add_argument('--rate', type=float, default=0, help='Target messages/s (0 = as fast as possible)')
+        parser.add_argument('--timeout', type=float, default=60, help='Max seconds to wait for fan-out')
+        parser.add_argument('--keep', action='store_true', help='Keep the synthetic users/tasks/rooms')
+
+    def handle(self, *args, **options):
+        rooms, connections, messages = options['rooms'], options['connections'], options['messages']
+        if rooms <= 0 or connections < rooms or messages <= 0 or options['rate'] < 0:
+            raise CommandError('Need --rooms > 0, --connections >= --rooms, --messages > 0, --rate >= 0')
+
+        prefix = f'chatload_{uuid.uuid4().hex[:8]}'
+        room_users = self.setup(prefix, rooms)
+        try:
+            stats = asyncio.run(self.run(room_users, connections, messages, options['rate'], options['timeout']))
+        finally:
+            if not options['keep']:
+                self.cleanup(prefix)
+        self.report(stats)
+
+    def setup(self, prefix, n_rooms):
+        User = get_user_model()
+        User.objects.bulk_create([
+            User(username=f'{prefix}_{i}', email=f'{prefix}_{i}@example.com') for i in range(2 * n_rooms)
+        ])
+        users = list(User.objects.filter(username__startswith=f'{prefix}_').order_by('id'))
+        category = Category.objects.create(name=prefix)
+        Task.objects.bulk_create([
+            Task(client=users[2 * i], tasker=users[2 * i + 1], category=category, title=f'{prefix} {i}',
+                 description='chat load test', price=Decimal('100000.00'))
+            for i in range(n_rooms)
+        ])
+        tasks = list(Task.objects.filter(category=category).order_by('id'))
+        ChatRoom.objects.bulk_create([ChatRoom(task=task) for task in tasks])
+        by_task = dict(ChatRoom.objects.filter(task__in=tasks).values_list('task_id', 'id'))
+        return [
+            (by_task[task.id], [str(AccessToken.for_user(users[2 * i])), str(AccessToken.for_user(users[2 * i + 1]))])
+            for i, task in enumerate(tasks)
+        ]
+
+    def cleanup(self, prefix):
+        Task.objects.filter(category__name=prefix).delete()
+        Category.objects.filter(name=prefix).delete()
+        get_user_model().objects.filter(username__startswith=f'{prefix}_').delete()
+
+    async def run(self, room_users, n_connections, n_messages, rate, timeout):
+        stats = {'latencies': [], 'acked': 0}
+        conns = [
+            _Connection(room_users[i % len(room_users)][0], room_users[i % len(room_users)][1][i // len(room_users) % 2],
+                        stats)
+            for i in range(n_connections)
+        ]
+        per_room = {}
+        for conn in conns:
+            per_room[conn.room_id] = per_room.get(conn.room_id, 0) + 1
+
+        started = time.perf_counter()
+        opened = await asyncio.gather(*(conn.open() for conn in conns))
+        stats['connect_seconds'] = time.perf_counter() - started
+        if not all(opened):
+            raise CommandError(f'{opened.count(False)} connections were rejected')
+
+        expected = 0
+        started = time.perf_counter()
+        for seq in range(n_messages):
+            conn = conns[seq % len(conns)]
+            conn.post(seq)
+            expected += per_room[conn.room_id]
+            if rate:
+                delay = started + (seq + 1) / rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif seq % 100 == 99:
+                await asyncio.sleep(0)
+
+        deadline = time.perf_counter() + timeout
+        while (len(stats['latencies']) < expected or stats['acked'] < n_messages) and time.perf_counter() < deadline:
+            await asyncio.sleep(0.05)
+        stats['elapsed'] = time.perf_counter() - started
+        stats.update(connections=n_connections, rooms=len(per_room), messages=n_messages, expected=expected)
+
+        await asyncio.gather(*(conn.close() for conn in conns))
+        return stats
+
+    def report(self, stats):
+        latencies = sorted(stats['latencies'])
+        delivered, elapsed = len(latencies), stats['elapsed']
+        self.stdout.write(
+            f"{stats['connections']} connections over {stats['rooms']} rooms "
+            f"opened in {stats['connect_seconds']:.2f}s"
+        )
+        self.stdout.write(
+            f"{stats['acked']}/{stats['messages']} messages persisted in {elapsed:.2f}s "
+            f"-> {stats['acked'] / elapsed:.1f} msgs/s"
+        )
+        self.stdout.write(
+            f"{delivered}/{stats['expected']} deliveries -> {delivered / elapsed:.1f} deliveries/s"
+        )
+        if latencies:
+            def pct(p):
+                return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+
+            self.stdout.write(
+                f'latency ms: p50 {pct(0.5):.1f}  p95 {pct(0.95):.1f}  p99 {pct(0.99):.1f}  '
+                f'max {latencies[-1] * 1000:.1f}  mean {statistics.fmean(latencies) * 1000:.1f}'
+            )
+        style = self.style.SUCCESS if delivered == stats['expected'] else self.style.WARNING
+        self.stdout.write(style(f"Lost deliveries: {stats['expected'] - delivered}"))
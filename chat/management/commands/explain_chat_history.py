@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from chat.history import explain_history_plans
+from chat.models import ChatMessage, ChatRoom
+from noti.inbox import uses_filesort
+
+
+class Command(BaseCommand):
+    help = ('EXPLAIN the chat history page queries (latest / before / after) and fail if any plan '
+            'falls back to a filesort')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--room', type=int, default=None,
+                            help='Room id to explain for (default: the room with the most messages)')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan, not only failures')
+
+    def handle(self, *args, **options):
+        room_id = options['room']
+        if room_id is None:
+            row = ChatMessage.objects.values('room_id').annotate(n=Count('id')).order_by('-n').first()
+            room_id = row['room_id'] if row else ChatRoom.objects.values_list('pk', flat=True).first()
+        if room_id is None:
+            raise CommandError('No chat rooms to explain the query for')
+
+        failures = []
+        for label, plan in explain_history_plans(room_id):
+            bad = uses_filesort(plan)
+            if bad:
+                failures.append(label)
+            if bad or options['verbose_plans']:
+                style = self.style.ERROR if bad else self.style.SUCCESS
+                self.stdout.write(style(f'[{"FILESORT" if bad else "ok"}] {label}'))
+                self.stdout.write(plan)
+            else:
+                self.stdout.write(self.style.SUCCESS(f'[ok] {label}'))
+
+        if failures:
+            raise CommandError(f'{len(failures)} chat history plan(s) use a filesort: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('All chat history plans read the (room, id) index in order'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from chat.utils import rebuild_rooms
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized last message and unread counts of chat rooms from the message table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', nargs='+', type=int, help='Only rebuild these room ids')
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size must be > 0')
+        processed = rebuild_rooms(room_ids=options['rooms'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {processed} chat rooms'))
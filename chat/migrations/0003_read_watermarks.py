@@ -0,0 +1,81 @@
+# Generated by Django 5.2.4 on 2026-10-19 04:28
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_watermarks(apps, schema_editor):
+    """Watermark của participant = id lớn nhất trong các tin người còn lại gửi đã is_read."""
+    ChatMessage = apps.get_model('chat', 'ChatMessage')
+    ChatReadState = apps.get_model('chat', 'ChatReadState')
+    rows = (
+        ChatMessage.objects.filter(is_read=True)
+        .values('room_id', 'sender_id', 'room__task__client_id', 'room__task__tasker_id')
+        .annotate(last=models.Max('id'))
+        .order_by()
+    )
+    states = {}
+    for row in rows.iterator(chunk_size=2000):
+        for reader_id in (row['room__task__client_id'], row['room__task__tasker_id']):
+            if reader_id is None or reader_id == row['sender_id']:
+                continue
+            key = (row['room_id'], reader_id)
+            states[key] = max(states.get(key, 0), row['last'])
+    ChatReadState.objects.bulk_create(
+        [ChatReadState(room_id=room_id, user_id=user_id, last_read_message_id=last)
+         for (room_id, user_id), last in states.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_room_denormalized_last_message'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatReadState',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('last_read_message_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Chat Read State',
+                'verbose_name_plural': 'Chat Read States',
+                'db_table': 'chat_read_state',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['room', 'id'], name='chat_msg_room_id_idx'),
+        ),
+        migrations.AddField(
+            model_name='chatreadstate',
+            name='room',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_states', to='chat.chatroom'),
+        ),
+        migrations.AddField(
+            model_name='chatreadstate',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chat_read_states', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='chatreadstate',
+            constraint=models.UniqueConstraint(fields=('room', 'user'), name='uniq_chat_read_state_room_user'),
+        ),
+        migrations.RunPython(backfill_watermarks, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='chatmessage',
+            name='is_read',
+        ),
+        migrations.RemoveField(
+            model_name='chatmessage',
+            name='read_at',
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-19 04:30
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0003_read_watermarks'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='chatmessage',
+            options={'ordering': ['id'], 'verbose_name': 'Chat Message', 'verbose_name_plural': 'Chat Messages'},
+        ),
+        migrations.RemoveIndex(
+            model_name='chatmessage',
+            name='chat_messag_room_id_5feac5_idx',
+        ),
+    ]
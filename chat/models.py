@@ -19,6 +19,22 @@ class ChatRoom(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Denormalize cho danh sách room (1 query, không đọc bảng message); cập nhật trong cùng
+    # transaction với tin nhắn (chat/utils.py) và khi đánh dấu đã đọc. Dữ liệu cũ / lệch:
+    # lệnh rebuild_chat_rooms. last_message không tạo FK constraint để tránh vòng
+    # room <-> message khi xoá.
+    last_message = models.ForeignKey(
+        "ChatMessage", null=True, blank=True, on_delete=models.SET_NULL, related_name="+", db_constraint=False
+    )
+    last_message_preview = models.CharField(max_length=255, blank=True, default="")
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    last_sender = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name="+"
+    )
+    # Số tin chưa đọc của từng participant (room 1-1: client và tasker của task)
+    client_unread = models.PositiveIntegerField(default=0)
+    tasker_unread = models.PositiveIntegerField(default=0)
+
     class Meta:
         db_table = "chat_room"
         verbose_name = "Chat Room"
@@ -27,6 +43,18 @@ class ChatRoom(models.Model):
     def __str__(self):
         return f"ChatRoom for Task#{self.task_id}"
 
+    def unread_field(self, user_id):
+        """Tên cột unread của participant; None nếu user không phải client/tasker của task."""
+        if user_id == self.task.client_id:
+            return "client_unread"
+        if user_id == self.task.tasker_id:
+            return "tasker_unread"
+        return None
+
+    def unread_for(self, user_id):
+        field = self.unread_field(user_id)
+        return getattr(self, field) if field else None
+
 
 class ChatMessage(models.Model):
     class MessageType(models.TextChoices):
@@ -54,21 +82,45 @@ class ChatMessage(models.Model):
     file = models.FileField(upload_to="chat/files/", blank=True, null=True)
     metadata = models.JSONField(default=dict, blank=True)
 
-    is_read = models.BooleanField(default=False)
-    read_at = models.DateTimeField(null=True, blank=True)
-
     created_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         db_table = "chat_message"
         verbose_name = "Chat Message"
         verbose_name_plural = "Chat Messages"
-        ordering = ["created_at"]
+        # id tăng theo thứ tự gửi: cùng thứ tự với created_at nhưng khớp index (room, id)
+        ordering = ["id"]
 
         indexes = [
-            models.Index(fields=["room", "created_at"]),
+            # Lịch sử (before/after id) và đếm chưa đọc theo watermark: room_id = ? AND id </> ?
+            models.Index(fields=["room", "id"], name="chat_msg_room_id_idx"),
             models.Index(fields=["sender"]),
         ]
 
     def __str__(self):
         return f"Msg#{self.id} in Room#{self.room_id} by {self.sender_id}"
+
+
+class ChatReadState(models.Model):
+    """
+    Watermark đã đọc của 1 participant trong 1 room: mọi tin có id <= last_read_message_id
+    (của người khác gửi) coi là đã đọc. Thay cho cờ is_read / read_at trên từng tin nhắn;
+    "đọc tới tin X" = 1 upsert (chat/utils.mark_read).
+    """
+    id = models.BigAutoField(primary_key=True)
+    room = models.ForeignKey(ChatRoom, on_delete=models.CASCADE, related_name="read_states")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="chat_read_states")
+    # Chỉ tăng; không FK vì tin nhắn có thể bị xoá
+    last_read_message_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "chat_read_state"
+        verbose_name = "Chat Read State"
+        verbose_name_plural = "Chat Read States"
+        constraints = [
+            models.UniqueConstraint(fields=["room", "user"], name="uniq_chat_read_state_room_user"),
+        ]
+
+    def __str__(self):
+        return f"User#{self.user_id} read Room#{self.room_id} up to Msg#{self.last_read_message_id}"
@@ -0,0 +1,117 @@
+# chat/realtime.py
+"""
+Chat real-time qua WebSocket (ASGI app, route trong Stackin/asgi.py).
+
+ws://.../ws/chat/?room=<room_id>&token=<JWT access>
+- Connect: xác thực JWT + kiểm tra IsRoomParticipant ĐÚNG 1 LẦN; sau đó kết nối được
+  subscribe vào kênh "chat:room:<id>" của broker (Stackin/realtime.py).
+- Client -> server:
+    {"type": "message", "content": "...", "client_id": "<tuỳ chọn, để khớp ack>"}
+    {"type": "ping"}
+- Server -> client:
+    {"type": "message", "message": {...}}         # mọi tin nhắn của room (kể cả gửi qua REST)
+    {"type": "ack", "client_id": ..., "id": <message id>}
+    {"type": "pong"} | {"type": "error", "error": "..."}
+- Tin nhắn được ghi DB (chat/utils.create_message) rồi mới fan-out sau commit, nên mọi
+  participant đang kết nối (trên mọi process nếu dùng broker liên process) đều nhận.
+Close code: 4400 thiếu room, 4401 token sai, 4403 không phải participant, 4404 không có room.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from types import SimpleNamespace
+from urllib.parse import parse_qs
+
+from Stackin.realtime import authenticate_scope, db_sync_to_async, get_broker
+
+from .models import ChatRoom
+from .permissions import IsRoomParticipant
+from .utils import create_message, room_channel
+
+MAX_CONTENT_LENGTH = 4000
+
+
+def _load_room(room_id):
+    return ChatRoom.objects.select_related("task").filter(pk=room_id).first()
+
+
+def _can_join(user, room) -> bool:
+    return IsRoomParticipant().has_object_permission(SimpleNamespace(user=user), None, room)
+
+
+def _scope_room_id(scope):
+    values = parse_qs(scope.get("query_string", b"").decode()).get("room")
+    try:
+        return int(values[0]) if values else None
+    except ValueError:
+        return None
+
+
+async def _relay(subscription, send_json):
+    while True:
+        _, payload = await subscription.get()
+        await send_json(payload)
+
+
+async def chat_websocket(scope, receive, send):
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+
+    async def close(code):
+        await send({"type": "websocket.close", "code": code})
+
+    room_id = _scope_room_id(scope)
+    if room_id is None:
+        return await close(4400)
+    user = await authenticate_scope(scope)
+    if user is None:
+        return await close(4401)
+    room = await db_sync_to_async(_load_room)(room_id)
+    if room is None:
+        return await close(4404)
+    if not await db_sync_to_async(_can_join)(user, room):
+        return await close(4403)
+
+    subscription = get_broker().subscribe(room_channel(room.id))
+    await send({"type": "websocket.accept"})
+
+    async def send_json(payload):
+        await send({"type": "websocket.send", "text": json.dumps(payload, default=str)})
+
+    relay = asyncio.ensure_future(_relay(subscription, send_json))
+    post = db_sync_to_async(create_message)
+    try:
+        while True:
+            message = await receive()
+            if message["type"] == "websocket.disconnect" or relay.done():
+                break
+            if message["type"] != "websocket.receive":
+                continue
+            try:
+                data = json.loads(message.get("text") or message.get("bytes") or "")
+            except ValueError:
+                await send_json({"type": "error", "error": "Invalid JSON"})
+                continue
+            if not isinstance(data, dict):
+                await send_json({"type": "error", "error": "Expected a JSON object"})
+                continue
+
+            kind = data.get("type")
+            if kind == "ping":
+                await send_json({"type": "pong"})
+            elif kind == "message":
+                content = data.get("content")
+                if not isinstance(content, str) or not content.strip():
+                    await send_json({"type": "error", "error": "content is required"})
+                elif len(content) > MAX_CONTENT_LENGTH:
+                    await send_json({"type": "error", "error": f"content exceeds {MAX_CONTENT_LENGTH} characters"})
+                else:
+                    msg = await post(room, user, content)
+                    await send_json({"type": "ack", "client_id": data.get("client_id"), "id": msg.id})
+            else:
+                await send_json({"type": "error", "error": f"Unknown message type '{kind}'"})
+    finally:
+        relay.cancel()
+        subscription.close()
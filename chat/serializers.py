@@ -1,8 +1,10 @@
 # chat/serializers.py
 from rest_framework import serializers
 from .models import ChatRoom, ChatMessage
+from user.models import User
 from user.serializers import UserSerializer  # tái sử dụng
 from task.serializers import TaskListSerializer
+from .utils import is_read_by_recipient
 
 
 class ChatMessageSerializer(serializers.ModelSerializer):
@@ -10,6 +12,8 @@ class ChatMessageSerializer(serializers.ModelSerializer):
     message_type_display = serializers.CharField(
         source="get_message_type_display", read_only=True
     )
+    # Suy ra từ watermark của người nhận (context["read_watermarks"] = chat.utils.read_watermarks(room))
+    is_read = serializers.SerializerMethodField()
 
     class Meta:
         model = ChatMessage
@@ -23,7 +27,6 @@ class ChatMessageSerializer(serializers.ModelSerializer):
             "file",
             "metadata",
             "is_read",
-            "read_at",
             "created_at",
         ]
         read_only_fields = [
@@ -32,16 +35,40 @@ class ChatMessageSerializer(serializers.ModelSerializer):
             "sender",
             "message_type_display",
             "is_read",
-            "read_at",
             "created_at",
         ]
 
+    def get_is_read(self, obj):
+        watermarks = self.context.get("read_watermarks")
+        return is_read_by_recipient(obj, watermarks) if watermarks else False
+
+
+class ChatUserSerializer(serializers.ModelSerializer):
+    """Bản gọn của user cho danh sách room (không lộ email / phone)."""
+    avatar_url = serializers.SerializerMethodField(read_only=True)
+
+    class Meta:
+        model = User
+        fields = ["id", "username", "first_name", "last_name", "avatar_url"]
+        read_only_fields = fields
+
+    def get_avatar_url(self, obj):
+        request = self.context.get("request")
+        if obj.avatar and request:
+            return request.build_absolute_uri(obj.avatar.url)
+        return None
+
 
 class ChatRoomSerializer(serializers.ModelSerializer):
+    """
+    last_message / unread_count lấy từ cột denormalize của room (không query bảng message).
+    Queryset cần select_related("task__client", "task__tasker", "task__category").
+    """
     task = TaskListSerializer(read_only=True)
     last_message = serializers.SerializerMethodField()
-    client = serializers.SerializerMethodField()
-    tasker = serializers.SerializerMethodField()
+    unread_count = serializers.SerializerMethodField()
+    client = ChatUserSerializer(source="task.client", read_only=True)
+    tasker = ChatUserSerializer(source="task.tasker", read_only=True)
 
     class Meta:
         model = ChatRoom
@@ -51,19 +78,22 @@ class ChatRoomSerializer(serializers.ModelSerializer):
             "client",
             "tasker",
             "last_message",
+            "unread_count",
             "created_at",
             "updated_at",
         ]
         read_only_fields = fields
 
     def get_last_message(self, obj):
-        msg = obj.messages.order_by("-created_at").first()
-        if msg:
-            return ChatMessageSerializer(msg).data
-        return None
-
-    def get_client(self, obj):
-        return UserSerializer(obj.task.client).data if obj.task.client else None
+        if not obj.last_message_id:
+            return None
+        return {
+            "id": obj.last_message_id,
+            "preview": obj.last_message_preview,
+            "sender_id": obj.last_sender_id,
+            "created_at": serializers.DateTimeField().to_representation(obj.last_message_at),
+        }
 
-    def get_tasker(self, obj):
-        return UserSerializer(obj.task.tasker).data if obj.task.tasker else None
+    def get_unread_count(self, obj):
+        request = self.context.get("request")
+        return obj.unread_for(request.user.id) if request else None
@@ -1,3 +1,40 @@
+from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-# Create your tests here.
+from noti.inbox import uses_filesort
+from task.models import Category, Task
+
+from .history import explain_history_plans
+from .models import ChatMessage, ChatRoom
+
+
+class HistoryPlanTests(TestCase):
+    """Mọi trang lịch sử tin nhắn phải là range trên index (room, id), không filesort."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        client = User.objects.create_user("chat_client", "chat_client@example.com", "pw")
+        tasker = User.objects.create_user("chat_tasker", "chat_tasker@example.com", "pw")
+        category = Category.objects.create(name="Chat test")
+        rooms = [
+            ChatRoom.objects.create(task=Task.objects.create(
+                client=client, tasker=tasker, category=category,
+                title=f"t{i}", description="d", price=100,
+            ))
+            for i in range(2)
+        ]
+        cls.room = rooms[0]
+        ChatMessage.objects.bulk_create([
+            ChatMessage(room=rooms[i % 2], sender=client if i % 3 else tasker, content=f"m{i}")
+            for i in range(300)
+        ])
+
+    def test_detector_flags_filesort(self):
+        plan = ChatMessage.objects.filter(room=self.room).order_by("content")[:20].explain()
+        self.assertTrue(uses_filesort(plan), plan)
+
+    def test_history_plans_do_not_filesort(self):
+        for label, plan in explain_history_plans(self.room.id):
+            with self.subTest(label):
+                self.assertFalse(uses_filesort(plan), plan)
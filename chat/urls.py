@@ -4,6 +4,7 @@ from .views import (
     # ChatRoom Views
     ChatRoomListView,
     ChatRoomDetailView,
+    ChatRoomMarkReadView,
 
     # ChatMessage Views
     ChatMessageListView,
@@ -17,6 +18,7 @@ urlpatterns = [
     # ===============================
     path("rooms/", ChatRoomListView.as_view(), name="chatroom-list"),
     path("rooms/<int:pk>/", ChatRoomDetailView.as_view(), name="chatroom-detail"),
+    path("rooms/<int:room_id>/read/", ChatRoomMarkReadView.as_view(), name="chatroom-mark-read"),
 
     # ===============================
     # ChatMessage Endpoints
@@ -0,0 +1,208 @@
+# chat/utils.py
+"""
+Ghi tin nhắn chat + side effect, dùng chung cho REST (ChatMessageCreateView) và WebSocket
+(chat/realtime.py).
+
+Mọi transaction đổi unread của room (gửi tin, mark_read) khoá dòng ChatRoom trước tiên
+(lock_room()), nên việc đếm tin chưa đọc và các lần +1 / -n được thực hiện tuần tự.
+
+message_posted() chạy trong transaction của tin nhắn:
+- cập nhật trạng thái denormalize của room: last_message / preview / thời điểm / người gửi
+  (chỉ khi tin mới hơn tin đang lưu) và +1 unread cho participant còn lại, bằng UPDATE
+  nguyên tử (F()), không đọc lại room,
+- notification cho người còn lại trong room (category "chat", được gộp theo task),
+- phát tin nhắn tới kênh pub/sub của room sau khi commit (mọi kết nối WebSocket của room).
+
+Trạng thái đã đọc là watermark theo (room, user) (ChatReadState): mark_read() nâng watermark
+bằng 1 upsert và trừ unread của room đúng số tin vừa được đọc; tin X đã được đọc nếu
+watermark của người nhận >= X.id (read_watermarks()).
+"""
+from django.db import transaction
+from django.db.models import F, Max, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from noti.models import Notification
+from noti.utils import push_notifications
+from Stackin.realtime import publish_on_commit
+
+from .models import ChatMessage, ChatReadState, ChatRoom
+
+
+def room_channel(room_id) -> str:
+    return f"chat:room:{room_id}"
+
+
+def message_payload(msg: ChatMessage, sender=None) -> dict:
+    """Bản gọn của tin nhắn để fan-out (không query thêm)."""
+    sender = sender or msg.sender
+    return {
+        "id": msg.id,
+        "room": msg.room_id,
+        "sender": {"id": sender.id, "username": sender.username},
+        "message_type": msg.message_type,
+        "content": msg.content,
+        "file": msg.file.url if msg.file else None,
+        "metadata": msg.metadata,
+        "created_at": msg.created_at.isoformat(),
+    }
+
+
+PREVIEW_LENGTH = 255
+
+
+def message_preview(msg: ChatMessage) -> str:
+    return (msg.content or "")[:PREVIEW_LENGTH] or ("[file]" if msg.file else "")
+
+
+def lock_room(room: ChatRoom):
+    """
+    SELECT ... FOR UPDATE dòng room, gọi đầu transaction, trước khi insert tin nhắn: insert
+    tin giữ shared lock của FK trên dòng room, khoá sau insert thì 2 người gửi cùng lúc deadlock.
+    """
+    list(ChatRoom.objects.select_for_update().filter(pk=room.pk).values_list("pk", flat=True))
+
+
+def message_posted(room: ChatRoom, msg: ChatMessage, sender):
+    """
+    Side effect sau khi tin nhắn đã được insert, trong cùng transaction đã lock_room().
+    room cần select_related("task").
+    """
+    recipients = {room.task.client_id, room.task.tasker_id} - {None, sender.id}
+    increments = {room.unread_field(uid): F(room.unread_field(uid)) + 1 for uid in recipients}
+    rooms = ChatRoom.objects.filter(pk=room.pk)
+    # Tin gửi đồng thời có thể commit lệch thứ tự: chỉ ghi đè last_* bằng tin có id lớn hơn
+    updated = rooms.filter(Q(last_message_id__isnull=True) | Q(last_message_id__lt=msg.id)).update(
+        last_message_id=msg.id,
+        last_message_preview=message_preview(msg),
+        last_message_at=msg.created_at,
+        last_sender_id=sender.id,
+        updated_at=msg.created_at,
+        **increments,
+    )
+    if not updated and increments:
+        rooms.update(**increments)
+
+    push_notifications(
+        recipients,
+        type=Notification.Type.TASK,
+        title=f"Tin nhắn mới từ {sender.username}",
+        message=message_preview(msg)[:200],
+        task=room.task_id,
+        metadata={"room_id": room.id, "message_id": msg.id},
+        category="chat",
+    )
+    publish_on_commit(room_channel(room.id), {"type": "message", "message": message_payload(msg, sender)})
+
+
+def create_message(room: ChatRoom, sender, content, message_type=ChatMessage.MessageType.TEXT, metadata=None):
+    """Tạo tin nhắn text (WebSocket). room cần select_related("task")."""
+    with transaction.atomic():
+        lock_room(room)
+        msg = ChatMessage.objects.create(
+            room=room,
+            sender=sender,
+            message_type=message_type,
+            content=content,
+            metadata=metadata or {},
+            created_at=timezone.now(),
+        )
+        message_posted(room, msg, sender)
+    return msg
+
+
+def read_watermarks(room: ChatRoom) -> dict:
+    """{user_id: last_read_message_id} của các participant (0 nếu chưa đọc gì); 1 query."""
+    watermarks = dict.fromkeys({room.task.client_id, room.task.tasker_id} - {None}, 0)
+    watermarks.update(
+        ChatReadState.objects.filter(room=room, user_id__in=list(watermarks))
+        .values_list("user_id", "last_read_message_id")
+    )
+    return watermarks
+
+
+def is_read_by_recipient(msg: ChatMessage, watermarks: dict) -> bool:
+    """Tin đã được (mọi) người nhận đọc chưa, theo watermark."""
+    others = [last for uid, last in watermarks.items() if uid != msg.sender_id]
+    return bool(others) and min(others) >= msg.id
+
+
+def unread_count(room: ChatRoom, user_id, after_id=0, up_to_id=None) -> int:
+    """Số tin người khác gửi trong (after_id, up_to_id] (range trên index (room, id))."""
+    qs = ChatMessage.objects.filter(room=room, id__gt=after_id).exclude(sender_id=user_id)
+    if up_to_id is not None:
+        qs = qs.filter(id__lte=up_to_id)
+    return qs.count()
+
+
+def mark_read(room: ChatRoom, user_id, message_id) -> int:
+    """
+    Đánh dấu user đã đọc tới message_id (tin thuộc room). Watermark chỉ tăng; gọi lại với id
+    cũ hơn là no-op. Trả về watermark hiện tại. room cần select_related("task").
+    """
+    with transaction.atomic():
+        # Khoá room trước: tin gửi cùng lúc phải được đếm ở đây hoặc được +1 sau khi trừ, không lệch
+        lock_room(room)
+        # Khoá dòng (hoặc khoảng trống nếu chưa có) để 2 request đồng thời không trừ unread 2 lần
+        previous = (
+            ChatReadState.objects.select_for_update()
+            .filter(room=room, user_id=user_id)
+            .values_list("last_read_message_id", flat=True)
+            .first()
+        ) or 0
+        if message_id <= previous:
+            return previous
+        n = unread_count(room, user_id, after_id=previous, up_to_id=message_id)
+        ChatReadState.objects.bulk_create(
+            [ChatReadState(room=room, user_id=user_id, last_read_message_id=message_id, updated_at=timezone.now())],
+            update_conflicts=True,
+            unique_fields=["room", "user"],
+            update_fields=["last_read_message_id", "updated_at"],
+        )
+        field = room.unread_field(user_id)
+        if field and n:
+            ChatRoom.objects.filter(pk=room.pk).update(**{field: Greatest(F(field) - n, 0)})
+    return message_id
+
+
+def rebuild_rooms(room_ids=None, chunk_size=500) -> int:
+    """Tính lại last_message / unread của room từ bảng message + watermark (keyset theo id room)."""
+    qs = ChatRoom.objects.select_related("task")
+    if room_ids is not None:
+        qs = qs.filter(pk__in=room_ids)
+    processed = 0
+    last_pk = 0
+    while True:
+        rooms = list(qs.filter(pk__gt=last_pk).order_by("pk")[:chunk_size])
+        if not rooms:
+            return processed
+        ids = [room.pk for room in rooms]
+        latest = {}
+        for msg in ChatMessage.objects.filter(
+            pk__in=ChatMessage.objects.filter(room_id__in=ids).values("room_id").annotate(last=Max("id")).values("last")
+        ):
+            latest[msg.room_id] = msg
+        watermarks = {
+            (room_id, user_id): last
+            for room_id, user_id, last in ChatReadState.objects.filter(room_id__in=ids)
+            .values_list("room_id", "user_id", "last_read_message_id")
+        }
+
+        with transaction.atomic():
+            for room in rooms:
+                msg = latest.get(room.pk)
+                room.last_message = msg
+                room.last_message_preview = message_preview(msg) if msg else ""
+                room.last_message_at = msg.created_at if msg else None
+                room.last_sender_id = msg.sender_id if msg else None
+                room.client_unread = room.tasker_unread = 0
+                for user_id in {room.task.client_id, room.task.tasker_id} - {None}:
+                    if msg:
+                        count = unread_count(room, user_id, after_id=watermarks.get((room.pk, user_id), 0))
+                        setattr(room, room.unread_field(user_id), count)
+            ChatRoom.objects.bulk_update(rooms, [
+                "last_message", "last_message_preview", "last_message_at", "last_sender",
+                "client_unread", "tasker_unread",
+            ])
+        processed += len(rooms)
+        last_pk = ids[-1]
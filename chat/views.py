@@ -1,6 +1,7 @@
 # chat/views.py
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import Q
 
 from rest_framework import generics, permissions, status
@@ -9,7 +10,9 @@ from rest_framework.response import Response
 
 from .models import ChatRoom, ChatMessage
 from .serializers import ChatRoomSerializer, ChatMessageSerializer
+from .history import MessageHistoryPagination
 from .permissions import IsRoomParticipant
+from .utils import lock_room, mark_read, message_posted, read_watermarks
 
 
 # ================================
@@ -25,7 +28,8 @@ class ChatRoomListView(generics.ListAPIView):
 
     def get_queryset(self):
         user = self.request.user
-        return ChatRoom.objects.select_related("task__client", "task__tasker").filter(
+        # last_message / unread đã denormalize trên room -> 1 query cho cả danh sách
+        return ChatRoom.objects.select_related("task__client", "task__tasker", "task__category").filter(
             Q(task__client=user) | Q(task__tasker=user)
         ).order_by("-updated_at")
 
@@ -34,12 +38,12 @@ class ChatRoomDetailView(generics.RetrieveAPIView):
     """
     Xem chi tiết 1 chat room (bao gồm last_message, client, tasker).
     """
-    queryset = ChatRoom.objects.select_related("task__client", "task__tasker")
+    queryset = ChatRoom.objects.select_related("task__client", "task__tasker", "task__category")
     serializer_class = ChatRoomSerializer
     permission_classes = [permissions.IsAuthenticated, IsRoomParticipant]
 
     def get_object(self):
-        obj = get_object_or_404(ChatRoom, pk=self.kwargs["pk"])
+        obj = get_object_or_404(self.get_queryset(), pk=self.kwargs["pk"])
         self.check_object_permissions(self.request, obj)
         return obj
 
@@ -49,16 +53,25 @@ class ChatRoomDetailView(generics.RetrieveAPIView):
 # ================================
 class ChatMessageListView(generics.ListAPIView):
     """
-    Danh sách tin nhắn trong 1 room.
-    Hỗ trợ phân trang (limit/offset hoặc page).
+    Lịch sử tin nhắn trong 1 room, phân trang theo id: ?limit=&before=<id> (cũ hơn) /
+    ?after=<id> (mới hơn); mặc định là các tin mới nhất. results theo thứ tự cũ -> mới.
     """
     serializer_class = ChatMessageSerializer
     permission_classes = [permissions.IsAuthenticated, IsRoomParticipant]
+    pagination_class = MessageHistoryPagination
 
     def get_queryset(self):
-        room = get_object_or_404(ChatRoom, pk=self.kwargs["room_id"])
-        self.check_object_permissions(self.request, room)
-        return room.messages.select_related("sender").order_by("-created_at")
+        self.room = get_object_or_404(ChatRoom.objects.select_related("task"), pk=self.kwargs["room_id"])
+        self.check_object_permissions(self.request, self.room)
+        # Thứ tự do MessageHistoryPagination quyết định (range trên index (room, id))
+        return self.room.messages.select_related("sender")
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        # is_read của từng tin suy ra từ watermark của người nhận (1 query cho cả trang)
+        if hasattr(self, "room"):
+            context["read_watermarks"] = read_watermarks(self.room)
+        return context
 
 
 class ChatMessageCreateView(generics.CreateAPIView):
@@ -71,37 +84,66 @@ class ChatMessageCreateView(generics.CreateAPIView):
     permission_classes = [permissions.IsAuthenticated, IsRoomParticipant]
 
     def perform_create(self, serializer):
-        room = get_object_or_404(ChatRoom, pk=self.kwargs["room_id"])
+        room = get_object_or_404(ChatRoom.objects.select_related("task"), pk=self.kwargs["room_id"])
         self.check_object_permissions(self.request, room)
 
-        msg = serializer.save(
-            room=room,
-            sender=self.request.user,
-            created_at=timezone.now(),
-        )
-
-        # Cập nhật updated_at cho room
-        room.updated_at = timezone.now()
-        room.save(update_fields=["updated_at"])
-
-        # TODO: push Notification cho người kia
+        with transaction.atomic():
+            lock_room(room)
+            msg = serializer.save(
+                room=room,
+                sender=self.request.user,
+                created_at=timezone.now(),
+            )
+            # updated_at của room, notification cho người còn lại, fan-out WebSocket
+            message_posted(room, msg, self.request.user)
         return msg
 
 
 class ChatMessageMarkReadView(APIView):
     """
-    Đánh dấu 1 message là đã đọc.
+    Đánh dấu đã đọc tới (và gồm) message này: nâng watermark của user trong room.
     """
     permission_classes = [permissions.IsAuthenticated, IsRoomParticipant]
 
     def post(self, request, pk):
-        msg = get_object_or_404(ChatMessage, pk=pk)
+        msg = get_object_or_404(ChatMessage.objects.select_related("room__task"), pk=pk)
         self.check_object_permissions(request, msg.room)
 
         if msg.sender_id == request.user.id:
             return Response({"error": "Cannot mark your own message as read"}, status=status.HTTP_400_BAD_REQUEST)
 
-        msg.is_read = True
-        msg.read_at = timezone.now()
-        msg.save(update_fields=["is_read", "read_at"])
-        return Response({"message": "Marked as read"}, status=status.HTTP_200_OK)
+        last_read = mark_read(msg.room, request.user.id, msg.id)
+        msg.room.refresh_from_db(fields=["client_unread", "tasker_unread"])
+        return Response({
+            "message": "Marked as read",
+            "last_read_message_id": last_read,
+            "unread_count": msg.room.unread_for(request.user.id),
+        }, status=status.HTTP_200_OK)
+
+
+class ChatRoomMarkReadView(APIView):
+    """
+    Đánh dấu đã đọc tới message_id (body, tuỳ chọn); mặc định là tin mới nhất của room.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsRoomParticipant]
+
+    def post(self, request, room_id):
+        room = get_object_or_404(ChatRoom.objects.select_related("task"), pk=room_id)
+        self.check_object_permissions(request, room)
+
+        message_id = request.data.get("message_id") or room.last_message_id
+        if message_id:
+            try:
+                message_id = int(message_id)
+            except (TypeError, ValueError):
+                return Response({"error": "message_id must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+            if not room.messages.filter(pk=message_id).exists():
+                return Response({"error": "Message not found in this room"}, status=status.HTTP_404_NOT_FOUND)
+            last_read = mark_read(room, request.user.id, message_id)
+            room.refresh_from_db(fields=["client_unread", "tasker_unread"])
+        else:
+            last_read = 0
+        return Response({
+            "last_read_message_id": last_read,
+            "unread_count": room.unread_for(request.user.id),
+        }, status=status.HTTP_200_OK)
@@ -1,3 +1,44 @@
 from django.contrib import admin
+from .models import (
+    BroadcastJob, NotificationArchive, NotificationCounter, NotificationDelivery, NotificationPreference,
+)
 
-# Register your models here.
+
+@admin.register(NotificationCounter)
+class NotificationCounterAdmin(admin.ModelAdmin):
+    list_display = ("id", "user", "category", "unread", "updated_at")
+    search_fields = ("user__username", "category")
+    raw_id_fields = ("user",)
+
+
+@admin.register(BroadcastJob)
+class BroadcastJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "segment", "title", "status", "sent_count", "total_estimate", "attempts", "created_at")
+    list_filter = ("status", "segment")
+    search_fields = ("title",)
+    raw_id_fields = ("created_by", "task", "payment")
+    readonly_fields = ("last_user_id", "sent_count", "total_estimate", "attempts", "heartbeat_at",
+                       "last_error", "started_at", "finished_at")
+
+
+@admin.register(NotificationDelivery)
+class NotificationDeliveryAdmin(admin.ModelAdmin):
+    list_display = ("id", "channel", "user", "title", "status", "attempts", "available_at", "sent_at")
+    list_filter = ("channel", "status")
+    search_fields = ("user__username", "title", "provider_ref")
+    raw_id_fields = ("notification", "user")
+    readonly_fields = ("attempts", "last_error", "provider_ref", "sent_at", "created_at", "updated_at")
+
+
+@admin.register(NotificationArchive)
+class NotificationArchiveAdmin(admin.ModelAdmin):
+    list_display = ("id", "user_id", "type", "title", "category", "created_at", "archived_at")
+    list_filter = ("type",)
+    search_fields = ("=user_id", "title")
+
+
+@admin.register(NotificationPreference)
+class NotificationPreferenceAdmin(admin.ModelAdmin):
+    list_display = ("user", "muted_categories", "muted_channels", "updated_at")
+    search_fields = ("user__username",)
+    raw_id_fields = ("user",)
@@ -0,0 +1,176 @@
+# noti/broadcast.py
+"""
+Engine fan-out cho BroadcastJob.
+
+- Audience được duyệt theo keyset trên user id (WHERE id > cursor ORDER BY id LIMIT chunk),
+  không dựng list user trong bộ nhớ và không dùng OFFSET. Không dùng .iterator() vì
+  driver MySQL buffer toàn bộ kết quả phía client; keyset cũng cho luôn điểm resume.
+- Mỗi chunk = 1 transaction: bulk_create Notification + bộ đếm unread + cập nhật
+  cursor/sent_count/heartbeat của job. Tuỳ chọn tắt notification của cả chunk được đọc
+  bằng 1 query (preferences.load_masks) rồi lọc trong bộ nhớ.
+- claim_job() lấy job PENDING hoặc RUNNING đã mất heartbeat quá LEASE_SECONDS
+  (worker trước chết) bằng SELECT ... FOR UPDATE SKIP LOCKED, nên nhiều worker chạy song song được.
+"""
+from __future__ import annotations
+
+import bisect
+import logging
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import BroadcastJob, Notification
+from .preferences import filter_notifications, load_masks
+from .utils import bulk_insert, notifications_created
+
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = 60
+MAX_ATTEMPTS = 5
+
+
+def audience_queryset(job: BroadcastJob):
+    """Queryset user (chỉ dùng cho segment, không dùng cho user_ids tường minh)."""
+    User = get_user_model()
+    if job.segment == BroadcastJob.Segment.APPROVED_TASKERS:
+        qs = User.objects.filter(is_active=True, taskerregistration__status="approved")
+        if job.segment_category_id:
+            qs = qs.filter(tasker_skills__category_id=job.segment_category_id)
+        return qs
+    if job.segment == BroadcastJob.Segment.ALL_USERS:
+        return User.objects.filter(is_active=True)
+    raise ValueError(f"Unknown segment '{job.segment}'")
+
+
+def next_recipients(job: BroadcastJob, after_id: int, limit: int) -> list:
+    """Tối đa limit user id > after_id (tăng dần) thuộc audience của job."""
+    if job.segment == BroadcastJob.Segment.USER_IDS:
+        ids = job.user_ids  # đã sắp xếp lúc tạo job
+        start = bisect.bisect_right(ids, after_id)
+        candidates = ids[start:start + limit]
+        if not candidates:
+            return []
+        # Bỏ id không tồn tại / user bị khoá, nhưng vẫn tiến cursor qua cả chunk ứng viên
+        existing = set(
+            get_user_model().objects.filter(pk__in=candidates, is_active=True).values_list("pk", flat=True)
+        )
+        return [(uid, uid in existing) for uid in candidates]
+    ids = list(
+        audience_queryset(job).filter(pk__gt=after_id).order_by("pk").values_list("pk", flat=True)[:limit]
+    )
+    return [(uid, True) for uid in ids]
+
+
+def estimate_total(job: BroadcastJob) -> int:
+    if job.segment == BroadcastJob.Segment.USER_IDS:
+        return len(job.user_ids)
+    return audience_queryset(job).count()
+
+
+def build_notification(job: BroadcastJob, user_id, now) -> Notification:
+    return Notification(
+        user_id=user_id,
+        type=job.type,
+        title=job.title,
+        message=job.message,
+        task_id=job.task_id,
+        payment_id=job.payment_id,
+        category=job.category,
+        priority=job.priority,
+        channel=job.channel,
+        metadata={**job.metadata, "broadcast_job": job.id},
+        created_at=now,
+        updated_at=now,
+    )
+
+
+def claim_job(job_id=None):
+    """Lấy quyền chạy 1 job (hoặc job_id cụ thể). Trả về job đã chuyển RUNNING, hoặc None."""
+    now = timezone.now()
+    stale = now - timedelta(seconds=LEASE_SECONDS)
+    with transaction.atomic():
+        qs = BroadcastJob.objects.select_for_update(skip_locked=True).filter(
+            Q(status=BroadcastJob.Status.PENDING)
+            | Q(status=BroadcastJob.Status.RUNNING, heartbeat_at__lt=stale)
+        )
+        if job_id is not None:
+            qs = qs.filter(pk=job_id)
+        job = qs.order_by("id").first()
+        if job is None:
+            return None
+        job.attempts += 1
+        job.status = BroadcastJob.Status.RUNNING
+        job.heartbeat_at = now
+        job.started_at = job.started_at or now
+        if job.total_estimate is None:
+            job.total_estimate = estimate_total(job)
+        job.save(update_fields=["attempts", "status", "heartbeat_at", "started_at", "total_estimate", "updated_at"])
+        return job
+
+
+def _write_chunk(job: BroadcastJob) -> bool:
+    """Ghi 1 chunk. Trả về False khi đã hết audience (hoặc job bị huỷ)."""
+    with transaction.atomic():
+        locked = BroadcastJob.objects.select_for_update().get(pk=job.pk)
+        if locked.status != BroadcastJob.Status.RUNNING:
+            return False  # bị huỷ từ admin
+        batch = next_recipients(locked, locked.last_user_id, locked.chunk_size)
+        if not batch:
+            return False
+
+        now = timezone.now()
+        user_ids = [uid for uid, active in batch if active]
+        notifs = filter_notifications(
+            [build_notification(locked, uid, now) for uid in user_ids], masks=load_masks(user_ids)
+        )
+        if notifs:
+            bulk_insert(notifs, batch_size=locked.chunk_size)
+            notifications_created(notifs)
+
+        locked.last_user_id = batch[-1][0]
+        locked.sent_count += len(notifs)
+        locked.heartbeat_at = now
+        locked.save(update_fields=["last_user_id", "sent_count", "heartbeat_at", "updated_at"])
+        job.last_user_id, job.sent_count = locked.last_user_id, locked.sent_count
+        return True
+
+
+def run_job(job: BroadcastJob, progress=None, max_chunks=None) -> BroadcastJob:
+    """
+    Chạy job đã claim tới khi xong. progress(job) được gọi sau mỗi chunk.
+    max_chunks: dừng sớm (job vẫn RUNNING, lần sau resume từ cursor).
+    """
+    chunks = 0
+    finished = False
+    try:
+        while max_chunks is None or chunks < max_chunks:
+            if not _write_chunk(job):
+                finished = True
+                break
+            chunks += 1
+            if progress:
+                progress(job)
+    except Exception as exc:
+        logger.exception("BroadcastJob #%s failed at user id %s", job.pk, job.last_user_id)
+        status = BroadcastJob.Status.FAILED if job.attempts >= MAX_ATTEMPTS else BroadcastJob.Status.PENDING
+        BroadcastJob.objects.filter(pk=job.pk).update(status=status, last_error=str(exc), updated_at=timezone.now())
+        job.status = status
+        return job
+    if not finished:
+        return job
+
+    now = timezone.now()
+    BroadcastJob.objects.filter(pk=job.pk, status=BroadcastJob.Status.RUNNING).update(
+        status=BroadcastJob.Status.DONE, finished_at=now, heartbeat_at=now, updated_at=now
+    )
+    job.refresh_from_db()
+    return job
+
+
+def create_job(created_by=None, user_ids=None, **fields) -> BroadcastJob:
+    if user_ids is not None:
+        fields["user_ids"] = sorted({int(uid) for uid in user_ids})
+    return BroadcastJob.objects.create(created_by=created_by, **fields)
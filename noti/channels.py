@@ -0,0 +1,133 @@
+# noti/channels.py
+"""
+Adapter gửi NotificationDelivery ra từng kênh ngoài.
+
+Mỗi kênh cấu hình trong setting NOTIFICATION_CHANNELS:
+    "email": {"BACKEND": "noti.channels.EmailChannel", "BATCH_SIZE": 50, "CONCURRENCY": 4, "MAX_ATTEMPTS": 6}
+BACKEND là dotted path tới class kế thừa ChannelAdapter, các key còn lại (viết thường)
+được truyền vào __init__. Kênh mới (FCM, nhà mạng SMS...) chỉ cần thêm class + cấu hình.
+
+send_batch(deliveries, users) gửi cả lô và trả về {delivery_id: DeliveryError} cho các
+delivery lỗi; delivery không có trong dict coi như đã gửi (adapter có thể gán provider_ref).
+Exception bay ra khỏi send_batch = cả lô lỗi tạm thời (vd không kết nối được SMTP).
+"""
+from __future__ import annotations
+
+import logging
+import random
+import smtplib
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class DeliveryError(Exception):
+    """Lỗi của 1 delivery. permanent=True: không retry (vd user không có email)."""
+
+    def __init__(self, message, permanent=False):
+        super().__init__(message)
+        self.permanent = permanent
+
+
+class ChannelAdapter:
+    # Field của User dùng làm địa chỉ nhận (None = gửi theo user id, vd push)
+    address_field = None
+
+    def __init__(self, channel, batch_size=100, concurrency=2, max_attempts=5, **options):
+        self.channel = channel
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.options = options
+
+    def address(self, user):
+        if self.address_field is None:
+            return user.pk if user is not None else None
+        return getattr(user, self.address_field, None) if user is not None else None
+
+    def send_batch(self, deliveries, users) -> dict:
+        raise NotImplementedError
+
+
+class EmailChannel(ChannelAdapter):
+    """
+    Gửi qua SMTP (EMAIL_HOST / EMAIL_PORT). Cả lô dùng chung 1 kết nối SMTP.
+    Dev: chạy `python manage.py smtp_debug_server` rồi để EMAIL_HOST=localhost, EMAIL_PORT=1025.
+    """
+    address_field = "email"
+
+    def __init__(self, channel, from_email=None, backend=None, **kwargs):
+        super().__init__(channel, **kwargs)
+        self.from_email = from_email or settings.DEFAULT_FROM_EMAIL
+        self.backend = backend
+
+    def send_batch(self, deliveries, users):
+        failures = {}
+        messages = []
+        for delivery in deliveries:
+            to = self.address(users.get(delivery.user_id))
+            if not to:
+                failures[delivery.id] = DeliveryError("User has no email address", permanent=True)
+                continue
+            messages.append((delivery, EmailMessage(delivery.title, delivery.message, self.from_email, [to])))
+        if not messages:
+            return failures
+
+        with get_connection(backend=self.backend, fail_silently=False) as connection:
+            for delivery, email in messages:
+                try:
+                    connection.send_messages([email])
+                except smtplib.SMTPRecipientsRefused as exc:
+                    failures[delivery.id] = DeliveryError(str(exc), permanent=True)
+                except smtplib.SMTPServerDisconnected:
+                    raise  # mất kết nối: retry cả lô
+                except smtplib.SMTPException as exc:
+                    failures[delivery.id] = DeliveryError(str(exc))
+        return failures
+
+
+class StubChannel(ChannelAdapter):
+    """
+    Kênh giả lập cho SMS / push khi chưa tích hợp nhà cung cấp: chỉ ghi log.
+    Tuỳ chọn: latency (giây / lô) và fail_rate (0..1) để thử concurrency và retry.
+    """
+
+    def __init__(self, channel, address_field=None, latency=0, fail_rate=0, **kwargs):
+        super().__init__(channel, **kwargs)
+        self.address_field = address_field
+        self.latency = float(latency)
+        self.fail_rate = float(fail_rate)
+
+    def send_batch(self, deliveries, users):
+        if self.latency:
+            time.sleep(self.latency)
+        failures = {}
+        for delivery in deliveries:
+            to = self.address(users.get(delivery.user_id))
+            if not to:
+                failures[delivery.id] = DeliveryError(f"User has no {self.address_field}", permanent=True)
+            elif self.fail_rate and random.random() < self.fail_rate:
+                failures[delivery.id] = DeliveryError(f"Simulated {self.channel} provider error")
+            else:
+                delivery.provider_ref = f"stub-{self.channel}-{delivery.id}"
+                logger.info("[%s] -> %s: %s", self.channel, to, delivery.title)
+        return failures
+
+
+_adapters = None
+
+
+def get_adapters() -> dict:
+    """{channel: ChannelAdapter} theo setting NOTIFICATION_CHANNELS (khởi tạo 1 lần)."""
+    global _adapters
+    if _adapters is None:
+        adapters = {}
+        for channel, config in getattr(settings, "NOTIFICATION_CHANNELS", {}).items():
+            options = {key.lower(): value for key, value in config.items() if key != "BACKEND"}
+            adapters[channel] = import_string(config["BACKEND"])(channel, **options)
+        _adapters = adapters
+    return _adapters
@@ -0,0 +1,100 @@
+# noti/coalesce.py
+"""
+Gộp notification gần giống nhau (vd nhiều tin nhắn chat / review của cùng 1 task).
+
+Quy tắc: setting NOTIFICATION_COALESCE_WINDOWS = {category: số giây}. Notification mới có
+category trong đó và có task được gộp vào notification CHƯA ĐỌC cùng (user, category, task)
+tạo trong cửa sổ đó: thay vì INSERT, dòng cũ được UPDATE title/message mới nhất,
+metadata["count"] += n và created_at = now (nổi lên đầu danh sách; cửa sổ trượt theo
+tin mới nhất). Dòng cũ vốn đã chưa đọc nên bộ đếm unread không đổi, cũng không tạo
+thêm delivery kênh ngoài.
+
+Trong cùng 1 lô, các notification trùng key cũng được gộp trước khi tra DB.
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .counters import counts_unread
+from .models import Notification
+
+
+def windows() -> dict:
+    return getattr(settings, "NOTIFICATION_COALESCE_WINDOWS", {})
+
+
+def coalesce_key(notif: Notification, rules: dict):
+    if notif.category in rules and notif.task_id is not None and counts_unread(notif):
+        return notif.user_id, notif.category, notif.task_id
+    return None
+
+
+def _merge(target: Notification, latest: Notification, n: int, now):
+    metadata = dict(target.metadata or {})
+    metadata.setdefault("first_at", (target.created_at or now).isoformat())
+    metadata.update(latest.metadata or {})
+    metadata["count"] = (target.metadata or {}).get("count", 1) + n
+    target.title = latest.title
+    target.message = latest.message
+    target.metadata = metadata
+    target.created_at = now
+    target.updated_at = now
+
+
+def coalesce(notifs) -> tuple[list, list]:
+    """
+    Tách lô notification thành (cần INSERT, đã gộp vào dòng có sẵn).
+    Dòng có sẵn được khoá (SELECT ... FOR UPDATE) và bulk_update ngay; gọi trong transaction.
+    """
+    rules = windows()
+    if not rules:
+        return list(notifs), []
+
+    now = timezone.now()
+    passthrough = []
+    groups = {}  # key -> [notif...] theo thứ tự tạo
+    for notif in notifs:
+        key = coalesce_key(notif, rules)
+        if key is None:
+            passthrough.append(notif)
+        else:
+            groups.setdefault(key, []).append(notif)
+    if not groups:
+        return passthrough, []
+
+    oldest = now - timedelta(seconds=max(rules[category] for _, category, _ in groups))
+    candidates = (
+        Notification.objects.select_for_update()
+        .filter(
+            user_id__in={uid for uid, _, _ in groups},
+            category__in={category for _, category, _ in groups},
+            task_id__in={task_id for _, _, task_id in groups},
+            is_read=False, is_archived=False, created_at__gte=oldest,
+        )
+        .order_by("id")
+    )
+    existing = {}
+    for row in candidates:
+        key = (row.user_id, row.category, row.task_id)
+        if key in groups and row.created_at >= now - timedelta(seconds=rules[row.category]):
+            existing[key] = row  # id tăng dần -> giữ dòng mới nhất
+
+    to_insert, updated = list(passthrough), []
+    for key, group in groups.items():
+        latest = group[-1]
+        target = existing.get(key)
+        if target is not None:
+            _merge(target, latest, len(group), now)
+            updated.append(target)
+        elif len(group) > 1:
+            latest.metadata = {**(latest.metadata or {}), "count": len(group),
+                               "first_at": (group[0].created_at or now).isoformat()}
+            to_insert.append(latest)
+        else:
+            to_insert.append(latest)
+    if updated:
+        Notification.objects.bulk_update(updated, ["title", "message", "metadata", "created_at", "updated_at"])
+    return to_insert, updated
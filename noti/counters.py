@@ -0,0 +1,140 @@
+# noti/counters.py
+"""
+Bộ đếm notification chưa đọc theo user (tổng + theo category).
+
+- Mọi thay đổi ảnh hưởng unread (tạo, mark-read, bulk mark-read, archive, broadcast)
+  gọi apply_deltas() trong CÙNG transaction: UPDATE ... SET unread = unread + n
+  gộp theo (category, n), key sắp xếp để lock theo thứ tự cố định.
+- Đọc: get_unread() đọc thẳng các dòng NotificationCounter của user (vài dòng trên
+  unique (user, category), không COUNT(*) trên bảng Notification). Không cache: settings
+  không có cache dùng chung, cache theo process sẽ trả số cũ ở process khác sau khi
+  relay / broadcast / digest / retention đổi bộ đếm.
+- rebuild(): đếm lại từ Notification theo lô user, sửa lệch số.
+"""
+from __future__ import annotations
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import Notification, NotificationCounter
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def counts_unread(notif: Notification) -> bool:
+    return not notif.is_read and not notif.is_archived
+
+
+def apply_deltas(deltas: dict):
+    """
+    deltas: {(user_id, category | None): +/-n}. Gọi bên trong transaction của thay đổi Notification.
+    Các key cùng (category, n) được gộp thành 1 UPDATE ... WHERE user_id IN (...), nên 1 chunk
+    broadcast hàng nghìn user chỉ tốn 2 query: INSERT IGNORE các dòng còn thiếu + 1 UPDATE.
+    """
+    merged = {}
+    for (user_id, category), n in deltas.items():
+        key = (user_id, category or "")  # NULL và "" dùng chung 1 dòng đếm
+        merged[key] = merged.get(key, 0) + n
+    merged = {key: n for key, n in merged.items() if n}
+    if not merged:
+        return
+
+    # Đảm bảo dòng đếm tồn tại trước khi cộng (không race: trùng thì bỏ qua)
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=uid, category=category, unread=0)
+         for (uid, category), n in sorted(merged.items()) if n > 0],
+        ignore_conflicts=True, batch_size=DEFAULT_CHUNK_SIZE,
+    )
+    groups = {}
+    for (uid, category), n in merged.items():
+        groups.setdefault((category, n), []).append(uid)
+    # Thứ tự cố định để các transaction đồng thời lock dòng theo cùng thứ tự
+    for (category, n), user_ids in sorted(groups.items()):
+        NotificationCounter.objects.filter(category=category, user_id__in=sorted(user_ids)).update(
+            unread=Greatest(F("unread") + n, 0)
+        )
+
+
+def record_created(notifs):
+    deltas = {}
+    for notif in notifs:
+        if counts_unread(notif):
+            key = (notif.user_id, notif.category)
+            deltas[key] = deltas.get(key, 0) + 1
+    apply_deltas(deltas)
+
+
+def record_change(notif: Notification, was_unread: bool):
+    """notif đã đổi is_read / is_archived; was_unread = trạng thái trước khi đổi."""
+    now_unread = counts_unread(notif)
+    if now_unread != was_unread:
+        apply_deltas({(notif.user_id, notif.category): 1 if now_unread else -1})
+
+
+def bulk_mark_read(qs, read_at) -> int:
+    """
+    Đánh dấu đã đọc cho queryset notification chưa đọc (đã lọc is_read=False).
+    UPDATE theo từng category để biết chính xác số dòng đổi -> delta bộ đếm đúng
+    kể cả khi có request mark-read khác chạy song song.
+    """
+    with transaction.atomic():
+        updated = qs.filter(is_archived=True).update(is_read=True, read_at=read_at)  # archived không được đếm
+        active = qs.filter(is_archived=False)
+        deltas = {}
+        pairs = active.order_by().values_list("user_id", "category").distinct()
+        for user_id, category in pairs:
+            n = active.filter(user_id=user_id, category=category).update(is_read=True, read_at=read_at)
+            deltas[(user_id, category)] = deltas.get((user_id, category), 0) - n
+            updated += n
+        apply_deltas(deltas)
+    return updated
+
+
+def get_unread_many(user_ids) -> dict:
+    """{user_id: {"total": n, "by_category": {category: n}}}; 1 query cho cả lô."""
+    result = {uid: {"total": 0, "by_category": {}} for uid in user_ids}
+    if not result:
+        return result
+    rows = NotificationCounter.objects.filter(user_id__in=list(result), unread__gt=0).values_list(
+        "user_id", "category", "unread"
+    )
+    for uid, category, unread in rows:
+        result[uid]["by_category"][category] = unread
+        result[uid]["total"] += unread
+    return result
+
+
+def get_unread(user_id) -> dict:
+    return get_unread_many([user_id])[user_id]
+
+
+def rebuild(user_ids=None, chunk_size=DEFAULT_CHUNK_SIZE) -> int:
+    """Đếm lại NotificationCounter từ Notification theo lô user (keyset). Trả về số user đã xử lý."""
+    qs = get_user_model().objects.all()
+    if user_ids is not None:
+        qs = qs.filter(pk__in=user_ids)
+
+    processed = 0
+    last_pk = 0
+    while True:
+        ids = list(qs.filter(pk__gt=last_pk).order_by("pk").values_list("pk", flat=True)[:chunk_size])
+        if not ids:
+            return processed
+        with transaction.atomic():
+            counts = {}
+            grouped = (
+                Notification.objects.filter(user_id__in=ids, is_read=False, is_archived=False)
+                .values("user_id", "category").annotate(n=Count("id")).values_list("user_id", "category", "n")
+            )
+            for uid, category, n in grouped:
+                key = (uid, category or "")  # NULL và "" dùng chung 1 dòng đếm
+                counts[key] = counts.get(key, 0) + n
+            NotificationCounter.objects.filter(user_id__in=ids).delete()
+            NotificationCounter.objects.bulk_create([
+                NotificationCounter(user_id=uid, category=category, unread=n)
+                for (uid, category), n in counts.items()
+            ], batch_size=DEFAULT_CHUNK_SIZE)
+        processed += len(ids)
+        last_pk = ids[-1]
@@ -0,0 +1,118 @@
+# noti/digest.py
+"""
+Digest cho notification ưu tiên thấp (lệnh build_notification_digests, chạy định kỳ).
+
+Notification priority=low, in-app, chưa đọc, chưa archive, cũ hơn cutoff được gộp thành
+1 notification tóm tắt / user (category "digest", metadata: count, by_category, vài tiêu đề
+gần nhất, khoảng thời gian). Các dòng gốc bị xoá -> bảng nhỏ lại; bộ đếm unread được chỉnh
+trong cùng transaction (-n theo category gốc, +1 cho digest). User đã tắt category
+"digest" (NotificationPreference) được bỏ qua, notification gốc của họ giữ nguyên.
+
+Duyệt user theo keyset (user_id tăng dần), mỗi lô user = 1 transaction.
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .counters import apply_deltas
+from .models import Notification
+from .preferences import filter_notifications
+from .realtime import publish_created
+from .utils import bulk_insert
+
+DIGEST_CATEGORY = "digest"
+DEFAULT_DELAY_MINUTES = 60
+DEFAULT_MIN_ITEMS = 2
+DEFAULT_CHUNK_SIZE = 500
+MAX_TITLES = 5
+
+
+def foldable_queryset(cutoff):
+    return Notification.objects.filter(
+        priority=Notification.Priority.LOW,
+        channel=Notification.Channel.IN_APP,
+        is_read=False,
+        is_archived=False,
+        created_at__lt=cutoff,
+    ).exclude(category=DIGEST_CATEGORY)
+
+
+def build_digest(user_id, rows, now) -> Notification:
+    """rows: [(id, category, title, created_at)] theo created_at giảm dần."""
+    by_category = {}
+    for _, category, _, _ in rows:
+        key = category or ""
+        by_category[key] = by_category.get(key, 0) + 1
+    return Notification(
+        user_id=user_id,
+        type=Notification.Type.SYSTEM,
+        title=f"Bạn có {len(rows)} thông báo mới",
+        message="; ".join(title for _, _, title, _ in rows[:MAX_TITLES]),
+        category=DIGEST_CATEGORY,
+        priority=Notification.Priority.LOW,
+        metadata={
+            "count": len(rows),
+            "by_category": by_category,
+            "from": rows[-1][3].isoformat(),
+            "to": rows[0][3].isoformat(),
+        },
+        created_at=now,
+        updated_at=now,
+    )
+
+
+def _fold_chunk(user_ids, cutoff, min_items) -> tuple[int, int]:
+    now = timezone.now()
+    with transaction.atomic():
+        rows = (
+            foldable_queryset(cutoff).select_for_update().filter(user_id__in=user_ids)
+            .order_by("user_id", "-created_at", "-id")
+            .values_list("id", "user_id", "category", "title", "created_at")
+        )
+        per_user = {}
+        for pk, uid, category, title, created_at in rows:
+            per_user.setdefault(uid, []).append((pk, category, title, created_at))
+
+        # User đã tắt category "digest" không nhận digest; dòng gốc của họ được giữ nguyên
+        digests = filter_notifications(
+            build_digest(uid, items, now) for uid, items in per_user.items() if len(items) >= min_items
+        )
+        folded_ids, deltas = [], {}
+        for digest in digests:
+            uid, items = digest.user_id, per_user[digest.user_id]
+            folded_ids.extend(pk for pk, _, _, _ in items)
+            for _, category, _, _ in items:
+                deltas[(uid, category)] = deltas.get((uid, category), 0) - 1
+            deltas[(uid, DIGEST_CATEGORY)] = deltas.get((uid, DIGEST_CATEGORY), 0) + 1
+        if not digests:
+            return 0, 0
+
+        Notification.objects.filter(pk__in=folded_ids).delete()
+        bulk_insert(digests, batch_size=DEFAULT_CHUNK_SIZE)
+        apply_deltas(deltas)
+        publish_created(digests)  # kèm unread count mới
+    return len(digests), len(folded_ids)
+
+
+def build_digests(delay_minutes=DEFAULT_DELAY_MINUTES, min_items=DEFAULT_MIN_ITEMS,
+                  chunk_size=DEFAULT_CHUNK_SIZE, progress=None) -> tuple[int, int]:
+    """Trả về (số digest đã tạo, số notification đã gộp)."""
+    cutoff = timezone.now() - timedelta(minutes=delay_minutes)
+    created = folded = 0
+    last_user_id = 0
+    while True:
+        user_ids = list(
+            foldable_queryset(cutoff).filter(user_id__gt=last_user_id)
+            .order_by("user_id").values_list("user_id", flat=True).distinct()[:chunk_size]
+        )
+        if not user_ids:
+            return created, folded
+        n_digests, n_folded = _fold_chunk(user_ids, cutoff, min_items)
+        created += n_digests
+        folded += n_folded
+        last_user_id = user_ids[-1]
+        if progress:
+            progress(last_user_id, created, folded)
@@ -0,0 +1,194 @@
+# noti/dispatch.py
+"""
+Dispatcher gửi notification ra kênh ngoài (email / sms / push).
+
+- enqueue_deliveries() được gọi từ notifications_created(): ghi NotificationDelivery PENDING
+  trong CÙNG transaction với notification. Request chỉ tốn thêm 1 INSERT, không bao giờ
+  chờ SMTP / nhà cung cấp SMS / push.
+- Dispatcher (lệnh dispatch_notifications) chạy thread pool. Với mỗi kênh, thread chính
+  lấy lô BATCH_SIZE delivery bằng SELECT ... FOR UPDATE SKIP LOCKED, chuyển SENDING kèm lease
+  (available_at = now + LEASE_SECONDS) rồi giao cho thread gửi. Số lô đang gửi đồng thời
+  của mỗi kênh <= CONCURRENCY, kênh chậm không chiếm hết worker của kênh khác.
+- Worker chết giữa chừng: hết lease thì lô được lấy lại (attempts đã tăng lúc claim).
+- Lỗi tạm thời: retry với exponential backoff; quá MAX_ATTEMPTS hoặc lỗi vĩnh viễn -> FAILED.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .channels import DeliveryError, get_adapters
+from .models import Notification, NotificationDelivery
+
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = 120
+BASE_BACKOFF_SECONDS = 5
+MAX_BACKOFF_SECONDS = 3600
+
+
+def enqueue_deliveries(notifs) -> list:
+    """Tạo delivery cho các notification có kênh ngoài đã cấu hình (in_app thì bỏ qua)."""
+    adapters = get_adapters()
+    deliveries = [
+        NotificationDelivery(
+            notification_id=notif.pk,
+            user_id=notif.user_id,
+            channel=notif.channel,
+            title=notif.title,
+            message=notif.message,
+        )
+        for notif in notifs
+        if notif.channel != Notification.Channel.IN_APP and notif.channel in adapters
+    ]
+    if deliveries:
+        NotificationDelivery.objects.bulk_create(deliveries, batch_size=500)
+    return deliveries
+
+
+def backoff_seconds(attempts: int) -> int:
+    return min(BASE_BACKOFF_SECONDS * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS)
+
+
+def claim_batch(channel: str, limit: int) -> list:
+    """Lấy tối đa limit delivery tới hạn của kênh và chuyển SENDING (lease)."""
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            NotificationDelivery.objects.select_for_update(skip_locked=True)
+            .filter(
+                channel=channel,
+                status__in=[NotificationDelivery.Status.PENDING, NotificationDelivery.Status.SENDING],
+                available_at__lte=now,
+            )
+            .order_by("available_at", "id")[:limit]
+        )
+        if not batch:
+            return []
+        lease_until = now + timedelta(seconds=LEASE_SECONDS)
+        NotificationDelivery.objects.filter(pk__in=[d.id for d in batch]).update(
+            status=NotificationDelivery.Status.SENDING, attempts=F("attempts") + 1,
+            available_at=lease_until, updated_at=now,
+        )
+    for delivery in batch:
+        delivery.status = NotificationDelivery.Status.SENDING
+        delivery.attempts += 1
+        delivery.available_at = lease_until
+    return batch
+
+
+def deliver_batch(adapter, batch) -> dict:
+    """Gửi 1 lô đã claim và ghi kết quả. Trả về {"sent", "retry", "failed"}."""
+    users = get_user_model().objects.only("id", "email", "phone").in_bulk({d.user_id for d in batch})
+    try:
+        failures = adapter.send_batch(batch, users)
+    except Exception as exc:
+        logger.exception("Channel %s failed for a batch of %s deliveries", adapter.channel, len(batch))
+        failures = {d.id: DeliveryError(f"{type(exc).__name__}: {exc}") for d in batch}
+    return record_results(adapter, batch, failures)
+
+
+def record_results(adapter, batch, failures) -> dict:
+    now = timezone.now()
+    stats = {"sent": 0, "retry": 0, "failed": 0}
+    for delivery in batch:
+        error = failures.get(delivery.id)
+        if error is None:
+            delivery.status = NotificationDelivery.Status.SENT
+            delivery.sent_at = now
+            delivery.last_error = ""
+            stats["sent"] += 1
+        elif error.permanent or delivery.attempts >= adapter.max_attempts:
+            delivery.status = NotificationDelivery.Status.FAILED
+            delivery.last_error = str(error)
+            stats["failed"] += 1
+        else:
+            delivery.status = NotificationDelivery.Status.PENDING
+            delivery.available_at = now + timedelta(seconds=backoff_seconds(delivery.attempts))
+            delivery.last_error = str(error)
+            stats["retry"] += 1
+        delivery.updated_at = now
+    NotificationDelivery.objects.bulk_update(
+        batch, ["status", "sent_at", "available_at", "last_error", "provider_ref", "updated_at"], batch_size=500
+    )
+    return stats
+
+
+class Dispatcher:
+    """
+    Vòng lặp gửi: thread chính claim lô, thread pool gửi.
+    Mỗi kênh có semaphore CONCURRENCY slot; claim chỉ khi còn slot trống.
+    """
+
+    def __init__(self, channels=None, progress=None):
+        adapters = get_adapters()
+        unknown = set(channels or ()) - set(adapters)
+        if unknown:
+            raise ValueError(f"Unknown notification channel(s): {', '.join(sorted(unknown))}")
+        self.adapters = {c: a for c, a in adapters.items() if not channels or c in channels}
+        self.slots = {c: threading.BoundedSemaphore(a.concurrency) for c, a in self.adapters.items()}
+        self.progress = progress
+        self.stats = {"sent": 0, "retry": 0, "failed": 0}
+        self._stats_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, sum(a.concurrency for a in self.adapters.values())),
+            thread_name_prefix="noti-dispatch",
+        )
+        self._inflight = set()
+
+    def _deliver(self, channel, batch):
+        try:
+            stats = deliver_batch(self.adapters[channel], batch)
+            with self._stats_lock:
+                for key, n in stats.items():
+                    self.stats[key] += n
+            if self.progress:
+                self.progress(channel, stats)
+        finally:
+            self.slots[channel].release()
+            connections.close_all()  # connection của thread này
+
+    def fill(self) -> int:
+        """Claim lô cho mọi slot đang trống. Trả về số lô vừa giao cho thread pool."""
+        submitted = 0
+        for channel, adapter in self.adapters.items():
+            slot = self.slots[channel]
+            while slot.acquire(blocking=False):
+                try:
+                    batch = claim_batch(channel, adapter.batch_size)
+                except Exception:
+                    slot.release()
+                    raise
+                if not batch:
+                    slot.release()
+                    break
+                self._inflight.add(self._executor.submit(self._deliver, channel, batch))
+                submitted += 1
+        return submitted
+
+    def run(self, loop=False, interval=1.0) -> dict:
+        """Gửi tới khi hết delivery tới hạn (loop=True: chạy mãi, nghỉ interval giây khi rảnh)."""
+        try:
+            while True:
+                submitted = self.fill()
+                if self._inflight:
+                    done, self._inflight = wait(self._inflight, timeout=interval, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()  # lỗi ghi DB -> dừng worker, lease sẽ hết và lô được lấy lại
+                    continue
+                if submitted:
+                    continue
+                if not loop:
+                    break
+                time.sleep(interval)
+        finally:
+            self._executor.shutdown(wait=True)
+        return self.stats
@@ -0,0 +1,171 @@
+# noti/inbox.py
+"""
+Query danh sách notification của 1 user (NotificationListView) + keyset pagination.
+
+- Thứ tự cố định (-created_at, -id); mỗi tổ hợp filter có index composite bắt đầu bằng
+  user và kết thúc bằng (-created_at, -id) (xem Notification.Meta.indexes), nên MySQL
+  đọc index theo thứ tự rồi dừng ở LIMIT, không filesort dù inbox lớn.
+- Trang sau lấy bằng cursor (created_at, id) của dòng cuối trang trước:
+  created_at <= ts AND (created_at < ts OR id < pk) -> range trên index, không OFFSET.
+- explain_inbox_plans(): EXPLAIN các tổ hợp filter; lệnh explain_notification_list dùng
+  để phát hiện plan bị lùi về filesort.
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .models import Notification
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# Các tổ hợp filter thực tế của NotificationListView (dùng cho EXPLAIN)
+FILTER_COMBINATIONS = [
+    {},
+    {"is_archived": False},
+    {"is_read": False},
+    {"is_read": False, "is_archived": False},
+    {"is_archived": True},
+    {"category": "chat"},
+    {"category": "chat", "is_archived": False},
+    {"priority": Notification.Priority.HIGH},
+]
+
+
+def inbox_queryset(user_id, is_read=None, is_archived=None, category=None, priority=None):
+    qs = Notification.objects.filter(user_id=user_id)
+    if is_read is not None:
+        qs = qs.filter(is_read=is_read)
+    if is_archived is not None:
+        qs = qs.filter(is_archived=is_archived)
+    if category:
+        qs = qs.filter(category=category)
+    if priority:
+        qs = qs.filter(priority=priority)
+    return qs.order_by("-created_at", "-id")
+
+
+def after_cursor(qs, created_at, pk):
+    """Các dòng đứng sau (created_at, pk) theo thứ tự (-created_at, -id)."""
+    return qs.filter(Q(created_at__lte=created_at) & (Q(created_at__lt=created_at) | Q(id__lt=pk)))
+
+
+def newer_than(qs, since_id, updated_ids=()):
+    """
+    Các dòng có id > since_id, cũ -> mới (long-poll ?since=), cộng các dòng updated_ids.
+    Mốc theo id chứ không theo created_at: created_at được gán lúc tạo object (flush theo lô,
+    digest...), có thể sớm hơn nhiều so với lúc commit nên dòng commit muộn sẽ nằm sau mốc.
+    Dòng được gộp (noti/coalesce.py) giữ id cũ nên không bao giờ > since_id: người gọi truyền id
+    của chúng (lấy từ message "notification" vừa nhận) qua updated_ids.
+    """
+    cond = Q(id__gt=since_id)
+    if updated_ids:
+        cond |= Q(id__in=updated_ids)
+    return qs.filter(cond).order_by("id")
+
+
+def encode_since(pk) -> str:
+    return base64.urlsafe_b64encode(str(pk).encode()).decode().rstrip("=")
+
+
+def decode_since(value: str) -> int:
+    """id trong cursor ?since=; nhận cả cursor cũ dạng (created_at, id) của app bản cũ."""
+    try:
+        raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)).decode()
+        return int(raw.rsplit("|", 1)[-1])
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValidationError({"since": "Invalid cursor."})
+
+
+def encode_position(created_at, pk) -> str:
+    raw = f"{created_at.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def encode_cursor(notif: Notification) -> str:
+    return encode_position(notif.created_at, notif.pk)
+
+
+def decode_cursor(value: str):
+    try:
+        raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)).decode()
+        created_at, pk = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValidationError({"cursor": "Invalid cursor."})
+
+
+class InboxKeysetPagination(BasePagination):
+    """
+    ?limit=<1..100>&cursor=<opaque>. Response: {"next": <url|null>, "results": [...]}.
+    Queryset phải đã order_by("-created_at", "-id") (inbox_queryset()).
+    """
+    limit_query_param = "limit"
+    cursor_query_param = "cursor"
+
+    def get_limit(self, request) -> int:
+        raw = request.query_params.get(self.limit_query_param)
+        if raw is None:
+            return DEFAULT_LIMIT
+        try:
+            limit = int(raw)
+        except ValueError:
+            raise ValidationError({"limit": "Must be an integer."})
+        return max(1, min(limit, MAX_LIMIT))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        limit = self.get_limit(request)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = after_cursor(queryset, *decode_cursor(cursor))
+        rows = list(queryset[:limit + 1])
+        self.has_next = len(rows) > limit
+        rows = rows[:limit]
+        self.next_cursor = encode_cursor(rows[-1]) if self.has_next else None
+        return rows
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+def explain_inbox_plans(user_id, limit=DEFAULT_LIMIT) -> list:
+    """[(mô tả tổ hợp, text EXPLAIN)] cho mọi tổ hợp filter, trang đầu và trang có cursor."""
+    plans = []
+    for filters in FILTER_COMBINATIONS:
+        qs = inbox_queryset(user_id, **filters)
+        label = ", ".join(f"{k}={v}" for k, v in filters.items()) or "(no filter)"
+        plans.append((label, qs[:limit + 1].explain()))
+        cursor_qs = after_cursor(qs, timezone.now(), 2 ** 62)
+        plans.append((f"{label} + cursor", cursor_qs[:limit + 1].explain()))
+    return plans
+
+
+def uses_filesort(plan: str) -> bool:
+    """MySQL: 'Using filesort'; SQLite (dev): 'USE TEMP B-TREE FOR ORDER BY'."""
+    text = plan.lower()
+    return "filesort" in text or "temp b-tree for order by" in text
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from noti.digest import DEFAULT_CHUNK_SIZE, DEFAULT_DELAY_MINUTES, DEFAULT_MIN_ITEMS, build_digests
+
+
+class Command(BaseCommand):
+    help = 'Fold unread low-priority in-app notifications into one digest notification per user (run periodically)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delay-minutes', type=int, default=DEFAULT_DELAY_MINUTES,
+                            help='Only fold notifications older than this')
+        parser.add_argument('--min-items', type=int, default=DEFAULT_MIN_ITEMS,
+                            help='Leave users with fewer foldable notifications untouched')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Users per transaction')
+
+    def handle(self, *args, **options):
+        if options['delay_minutes'] < 0:
+            raise CommandError('--delay-minutes must be >= 0')
+        if options['min_items'] < 2:
+            raise CommandError('--min-items must be >= 2')
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size must be > 0')
+
+        def progress(last_user_id, created, folded):
+            self.stdout.write(f'Up to user id {last_user_id}: {created} digests, {folded} notifications folded')
+
+        created, folded = build_digests(
+            options['delay_minutes'], options['min_items'], options['chunk_size'], progress=progress
+        )
+        self.stdout.write(self.style.SUCCESS(f'Created {created} digests from {folded} notifications'))
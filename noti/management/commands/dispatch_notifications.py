@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from noti.dispatch import Dispatcher
+
+
+class Command(BaseCommand):
+    help = 'Deliver email/sms/push notifications through the configured channel adapters (thread pool worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--channel', action='append', dest='channels', default=None,
+                            help='Only dispatch this channel (repeatable)')
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting when idle')
+        parser.add_argument('--interval', type=float, default=1.0, help='Sleep between polls when idle (seconds)')
+
+    def handle(self, *args, **options):
+        if options['interval'] <= 0:
+            raise CommandError('--interval must be > 0')
+
+        def progress(channel, stats):
+            self.stdout.write(f'[{channel}] sent {stats["sent"]}, retry {stats["retry"]}, failed {stats["failed"]}')
+
+        try:
+            dispatcher = Dispatcher(options['channels'], progress=progress)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        stats = dispatcher.run(loop=options['loop'], interval=options['interval'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Dispatched: {stats["sent"]} sent, {stats["retry"]} scheduled for retry, {stats["failed"]} failed'
+        ))
@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from noti.inbox import explain_inbox_plans, uses_filesort
+from noti.models import Notification
+
+
+class Command(BaseCommand):
+    help = ('EXPLAIN the notification list query for every filter combination and fail if any plan '
+            'falls back to a filesort (run in CI / after index changes, against realistic data)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, default=None,
+                            help='User id to explain for (default: the user with the most notifications)')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan, not only failures')
+
+    def handle(self, *args, **options):
+        user_id = options['user']
+        if user_id is None:
+            row = Notification.objects.values('user_id').annotate(n=Count('id')).order_by('-n').first()
+            user_id = row['user_id'] if row else get_user_model().objects.values_list('pk', flat=True).first()
+        if user_id is None:
+            raise CommandError('No users to explain the query for')
+
+        failures = []
+        for label, plan in explain_inbox_plans(user_id):
+            bad = uses_filesort(plan)
+            if bad:
+                failures.append(label)
+            if bad or options['verbose_plans']:
+                style = self.style.ERROR if bad else self.style.SUCCESS
+                self.stdout.write(style(f'[{"FILESORT" if bad else "ok"}] {label}'))
+                self.stdout.write(plan)
+            else:
+                self.stdout.write(self.style.SUCCESS(f'[ok] {label}'))
+
+        if failures:
+            raise CommandError(f'{len(failures)} notification list plan(s) use a filesort: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('All notification list plans read the index in order'))
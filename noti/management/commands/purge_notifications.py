@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from noti.retention import MODES, get_policy, purge
+
+
+class Command(BaseCommand):
+    help = 'Apply the notification retention policy: hard-delete or cold-archive old notifications in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=MODES, default=None, help='Override NOTIFICATION_RETENTION MODE')
+        parser.add_argument('--read-days', type=int, default=None)
+        parser.add_argument('--archived-days', type=int, default=None)
+        parser.add_argument('--unread-days', type=int, default=None,
+                            help='Also purge unread notifications older than this (adjusts unread counters)')
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--sleep', type=float, default=0, help='Pause between batches (seconds)')
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after this many batches')
+        parser.add_argument('--dry-run', action='store_true', help='Count matching rows without deleting')
+
+    def handle(self, *args, **options):
+        for key in ('read_days', 'archived_days', 'unread_days'):
+            if options[key] is not None and options[key] < 0:
+                raise CommandError(f'--{key.replace("_", "-")} must be >= 0')
+        if options['batch_size'] is not None and options['batch_size'] <= 0:
+            raise CommandError('--batch-size must be > 0')
+
+        policy = get_policy(
+            MODE=options['mode'], READ_DAYS=options['read_days'], ARCHIVED_DAYS=options['archived_days'],
+            UNREAD_DAYS=options['unread_days'], BATCH_SIZE=options['batch_size'],
+        )
+        result = purge(policy, dry_run=options['dry_run'], sleep=options['sleep'],
+                       max_batches=options['max_batches'])
+
+        verb = 'Would purge' if options['dry_run'] else ('Archived' if policy['MODE'] == 'archive' else 'Deleted')
+        for name, n in result.items():
+            self.stdout.write(f'{name}: {n}')
+        self.stdout.write(self.style.SUCCESS(f'{verb} {sum(result.values())} notifications'))
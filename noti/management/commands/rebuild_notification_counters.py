@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from noti.counters import rebuild, DEFAULT_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Recount unread notification counters (total and per category) from the Notification table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', nargs='+', type=int, help='Only rebuild these user ids')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size must be > 0')
+        processed = rebuild(user_ids=options['users'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt unread counters for {processed} users'))
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from noti.broadcast import claim_job, run_job
+from noti.models import BroadcastJob
+
+
+class Command(BaseCommand):
+    help = 'Run pending notification broadcast jobs in chunks (resumes crashed jobs from their cursor)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--job', type=int, default=None, help='Only run this job id')
+        parser.add_argument('--max-chunks', type=int, default=None,
+                            help='Stop a job after this many chunks (it stays resumable)')
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting when idle')
+        parser.add_argument('--interval', type=float, default=2.0, help='Sleep between polls when idle (seconds)')
+
+    def handle(self, *args, **options):
+        if options['max_chunks'] is not None and options['max_chunks'] <= 0:
+            raise CommandError('--max-chunks must be > 0')
+
+        def progress(job):
+            total = job.total_estimate or '?'
+            self.stdout.write(f'Job #{job.pk}: {job.sent_count}/{total} sent (cursor user id {job.last_user_id})')
+
+        ran = 0
+        while True:
+            job = claim_job(options['job'])
+            if job is None:
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+                continue
+            started = time.perf_counter()
+            job = run_job(job, progress=progress, max_chunks=options['max_chunks'])
+            elapsed = time.perf_counter() - started
+            ran += 1
+            style = self.style.SUCCESS if job.status == BroadcastJob.Status.DONE else self.style.WARNING
+            error = f' ({job.last_error})' if job.status != BroadcastJob.Status.DONE and job.last_error else ''
+            self.stdout.write(style(
+                f'Job #{job.pk} {job.status}: {job.sent_count} notifications in {elapsed:.2f}s{error}'
+            ))
+            if options['job'] is not None:
+                break
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {ran} broadcast jobs'))
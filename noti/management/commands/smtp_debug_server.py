@@ -0,0 +1,77 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Run a local SMTP sink that prints every received message (dev target for the email channel)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='localhost')
+        parser.add_argument('--port', type=int, default=1025)
+
+    def handle(self, *args, **options):
+        self.received = 0
+        try:
+            asyncio.run(self.serve(options['host'], options['port']))
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'Stopped after {self.received} messages'))
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.session, host, port)
+        self.stdout.write(f'SMTP debug server listening on {host}:{port}')
+        async with server:
+            await server.serve_forever()
+
+    async def session(self, reader, writer):
+        """Tập lệnh SMTP tối thiểu đủ cho smtplib: EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT."""
+        def reply(line):
+            writer.write(f'{line}\r\n'.encode())
+
+        reply('220 stackin-debug ESMTP')
+        sender, recipients = None, []
+        try:
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    break
+                command = raw.decode(errors='replace').strip()
+                verb = command[:4].upper()
+                if verb == 'EHLO':
+                    reply('250-stackin-debug')
+                    reply('250 8BITMIME')
+                elif verb == 'HELO':
+                    reply('250 stackin-debug')
+                elif verb == 'MAIL':
+                    sender, recipients = command[10:].strip(), []
+                    reply('250 OK')
+                elif verb == 'RCPT':
+                    recipients.append(command[8:].strip())
+                    reply('250 OK')
+                elif verb == 'DATA':
+                    reply('354 End data with <CR><LF>.<CR><LF>')
+                    await writer.drain()
+                    lines = []
+                    while True:
+                        line = (await reader.readline()).decode(errors='replace').rstrip('\r\n')
+                        if line == '.':
+                            break
+                        lines.append(line[1:] if line.startswith('..') else line)
+                    self.received += 1
+                    self.stdout.write(f'---------- message #{self.received} from {sender} to {", ".join(recipients)}')
+                    self.stdout.write('\n'.join(lines))
+                    reply('250 OK: queued')
+                elif verb in ('RSET', 'NOOP'):
+                    if verb == 'RSET':
+                        sender, recipients = None, []
+                    reply('250 OK')
+                elif verb == 'QUIT':
+                    reply('221 Bye')
+                    await writer.drain()
+                    break
+                else:
+                    reply('502 Command not implemented')
+                await writer.drain()
+        finally:
+            writer.close()
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.4 on 2026-10-19 04:07
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('noti', '0003_notification_counter'),
+        ('payment', '0006_webhook_raw_payload'),
+        ('task', '0002_taskqr'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BroadcastJob',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('DONE', 'Done'), ('FAILED', 'Failed'), ('CANCELED', 'Canceled')], default='PENDING', max_length=16)),
+                ('segment', models.CharField(choices=[('user_ids', 'Explicit user ids'), ('approved_taskers', 'Approved taskers (optionally in a category)'), ('all_users', 'All active users')], default='user_ids', max_length=32)),
+                ('user_ids', models.JSONField(blank=True, default=list)),
+                ('type', models.CharField(choices=[('TASK', 'Task'), ('PAYMENT', 'Payment'), ('SYSTEM', 'System')], default='SYSTEM', max_length=16)),
+                ('title', models.CharField(max_length=255)),
+                ('message', models.TextField(blank=True, default='')),
+                ('category', models.CharField(blank=True, max_length=50, null=True)),
+                ('priority', models.CharField(choices=[('low', 'Low'), ('normal', 'Normal'), ('high', 'High')], default='normal', max_length=10)),
+                ('channel', models.CharField(choices=[('in_app', 'In-App'), ('email', 'Email'), ('sms', 'SMS'), ('push', 'Push')], default='in_app', max_length=20)),
+                ('metadata', models.JSONField(blank=True, default=dict)),
+                ('chunk_size', models.PositiveIntegerField(default=1000)),
+                ('last_user_id', models.BigIntegerField(default=0)),
+                ('sent_count', models.PositiveIntegerField(default=0)),
+                ('total_estimate', models.PositiveIntegerField(blank=True, null=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='broadcast_jobs', to=settings.AUTH_USER_MODEL)),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='payment.payment')),
+                ('segment_category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='broadcast_jobs', to='task.category')),
+                ('task', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='task.task')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'heartbeat_at'], name='noti_broadc_status_b6fb7a_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-19 04:13
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('noti', '0004_broadcast_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationDelivery',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('channel', models.CharField(choices=[('in_app', 'In-App'), ('email', 'Email'), ('sms', 'SMS'), ('push', 'Push')], max_length=20)),
+                ('title', models.CharField(max_length=255)),
+                ('message', models.TextField(blank=True, default='')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('SENDING', 'Sending (leased by a worker)'), ('SENT', 'Sent'), ('FAILED', 'Failed (max attempts reached or permanent error)')], default='PENDING', max_length=16)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Chưa gửi trước thời điểm này (backoff / lease)')),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('provider_ref', models.CharField(blank=True, default='', max_length=128)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('notification', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='noti.notification')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_deliveries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['channel', 'status', 'available_at'], name='noti_notifi_channel_980dd4_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.4 on 2026-10-19 04:16
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('noti', '0005_notification_delivery'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('user_id', models.BigIntegerField()),
+                ('type', models.CharField(choices=[('TASK', 'Task'), ('PAYMENT', 'Payment'), ('SYSTEM', 'System')], max_length=16)),
+                ('title', models.CharField(max_length=255)),
+                ('message', models.TextField()),
+                ('task_id', models.BigIntegerField(blank=True, null=True)),
+                ('payment_id', models.BigIntegerField(blank=True, null=True)),
+                ('category', models.CharField(blank=True, max_length=50, null=True)),
+                ('priority', models.CharField(choices=[('low', 'Low'), ('normal', 'Normal'), ('high', 'High')], max_length=10)),
+                ('channel', models.CharField(choices=[('in_app', 'In-App'), ('email', 'Email'), ('sms', 'SMS'), ('push', 'Push')], max_length=20)),
+                ('metadata', models.JSONField(blank=True, default=dict)),
+                ('is_read', models.BooleanField(default=False)),
+                ('is_archived', models.BooleanField(default=False)),
+                ('read_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='noti_notifi_type_8b4995_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='noti_notifi_priorit_f698bd_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='noti_notifi_categor_c83f13_idx',
+        ),
+        migrations.AddIndex(
+            model_name='notificationarchive',
+            index=models.Index(fields=['user_id', 'created_at'], name='noti_notifi_user_id_c199c9_idx'),
+        ),
+    ]
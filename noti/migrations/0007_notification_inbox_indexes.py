@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-19 04:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('noti', '0006_notification_retention'),
+        ('payment', '0006_webhook_raw_payload'),
+        ('task', '0002_taskqr'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='noti_notifi_user_id_a274e5_idx',
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='noti_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'is_read', '-created_at', '-id'], name='noti_user_read_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'is_archived', '-created_at', '-id'], name='noti_user_arch_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'category', '-created_at', '-id'], name='noti_user_cat_created_idx'),
+        ),
+    ]
@@ -2,7 +2,7 @@
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
-from task.models import Task
+from task.models import Task, Category
 from payment.models import Payment
 
 class Notification(models.Model):
@@ -45,14 +45,205 @@ class Notification(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
+        # Inbox (noti/inbox.py) luôn lọc user trước và sắp xếp (-created_at, -id): mỗi tổ hợp
+        # filter thực tế có 1 index kết thúc bằng thứ tự đó -> không filesort, dừng ở LIMIT.
+        # (user, is_read, ...) cũng phục vụ mark-all-read; created_at cho retention.
+        # Không index đơn cột type / priority / category: độ chọn lọc thấp, query nào cũng có
+        # user_id nên planner không dùng, chỉ tốn ghi ở mỗi INSERT.
         indexes = [
-            models.Index(fields=["user", "is_read"]),
+            models.Index(fields=["user", "-created_at", "-id"], name="noti_user_created_idx"),
+            models.Index(fields=["user", "is_read", "-created_at", "-id"], name="noti_user_read_created_idx"),
+            models.Index(fields=["user", "is_archived", "-created_at", "-id"], name="noti_user_arch_created_idx"),
+            models.Index(fields=["user", "category", "-created_at", "-id"], name="noti_user_cat_created_idx"),
             models.Index(fields=["created_at"]),
-            models.Index(fields=["type"]),
-            models.Index(fields=["priority"]),
-            models.Index(fields=["category"]),
         ]
         ordering = ["-created_at"]
 
     def __str__(self):
         return f"Noti#{self.id} to {self.user.username} {self.type} {self.title}"
+
+
+class NotificationArchive(models.Model):
+    """
+    Kho lạnh cho notification đã hết hạn lưu (noti/retention.py, mode "archive").
+    Giữ nguyên id gốc; không FK (user/task/payment chỉ là id) và chỉ 1 index,
+    để ghi rẻ và không bị cascade khi xoá user/task.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user_id = models.BigIntegerField()
+    type = models.CharField(max_length=16, choices=Notification.Type.choices)
+    title = models.CharField(max_length=255)
+    message = models.TextField()
+    task_id = models.BigIntegerField(null=True, blank=True)
+    payment_id = models.BigIntegerField(null=True, blank=True)
+    category = models.CharField(max_length=50, null=True, blank=True)
+    priority = models.CharField(max_length=10, choices=Notification.Priority.choices)
+    channel = models.CharField(max_length=20, choices=Notification.Channel.choices)
+    metadata = models.JSONField(default=dict, blank=True)
+    is_read = models.BooleanField(default=False)
+    is_archived = models.BooleanField(default=False)
+    read_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user_id", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"NotiArchive#{self.id} user {self.user_id} {self.title}"
+
+
+class NotificationPreference(models.Model):
+    """
+    Tuỳ chọn tắt notification của user, dạng bitmask (bit theo noti/preferences.py
+    CATEGORY_BITS / CHANNEL_BITS; chỉ được thêm bit mới, không đổi thứ tự).
+    Không có dòng = không tắt gì.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, primary_key=True, on_delete=models.CASCADE, related_name="notification_preference"
+    )
+    muted_categories = models.PositiveIntegerField(default=0)
+    muted_channels = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"NotiPreference(user={self.user_id}) categories={self.muted_categories:b} channels={self.muted_channels:b}"
+
+
+class NotificationCounter(models.Model):
+    """
+    Số notification chưa đọc (is_read=False, is_archived=False) theo (user, category).
+    category "" = notification không có category. Tổng của user = tổng các dòng.
+    Được cập nhật trong cùng transaction với thay đổi Notification (noti/counters.py);
+    lệch số thì chạy lệnh rebuild_notification_counters.
+    """
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="notification_counters")
+    category = models.CharField(max_length=50, blank=True, default="")
+    unread = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "category"], name="uniq_notification_counter"),
+        ]
+
+    def __str__(self):
+        return f"NotiCounter(user={self.user_id}, {self.category or '-'}) unread={self.unread}"
+
+
+class BroadcastJob(models.Model):
+    """
+    Job broadcast notification chạy nền (noti/broadcast.py, lệnh run_broadcasts).
+
+    Audience: danh sách user_ids tường minh hoặc 1 segment (vd tasker đã duyệt trong category X).
+    Worker duyệt audience theo keyset (user id tăng dần) và ghi từng chunk trong 1 transaction,
+    cập nhật cursor (last_user_id) + sent_count CÙNG transaction đó -> crash giữa chừng thì
+    chạy lại tiếp từ cursor, không gửi trùng/thiếu.
+    """
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        RUNNING = "RUNNING", "Running"
+        DONE = "DONE", "Done"
+        FAILED = "FAILED", "Failed"
+        CANCELED = "CANCELED", "Canceled"
+
+    class Segment(models.TextChoices):
+        USER_IDS = "user_ids", "Explicit user ids"
+        APPROVED_TASKERS = "approved_taskers", "Approved taskers (optionally in a category)"
+        ALL_USERS = "all_users", "All active users"
+
+    id = models.BigAutoField(primary_key=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name="broadcast_jobs"
+    )
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING)
+
+    # Audience
+    segment = models.CharField(max_length=32, choices=Segment.choices, default=Segment.USER_IDS)
+    user_ids = models.JSONField(default=list, blank=True)  # segment=user_ids, lưu đã sắp xếp
+    segment_category = models.ForeignKey(
+        Category, null=True, blank=True, on_delete=models.SET_NULL, related_name="broadcast_jobs"
+    )
+
+    # Nội dung notification
+    type = models.CharField(max_length=16, choices=Notification.Type.choices, default=Notification.Type.SYSTEM)
+    title = models.CharField(max_length=255)
+    message = models.TextField(blank=True, default="")
+    task = models.ForeignKey(Task, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    payment = models.ForeignKey(Payment, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    category = models.CharField(max_length=50, null=True, blank=True)
+    priority = models.CharField(max_length=10, choices=Notification.Priority.choices, default=Notification.Priority.NORMAL)
+    channel = models.CharField(max_length=20, choices=Notification.Channel.choices, default=Notification.Channel.IN_APP)
+    metadata = models.JSONField(default=dict, blank=True)
+
+    # Tiến độ
+    chunk_size = models.PositiveIntegerField(default=1000)
+    last_user_id = models.BigIntegerField(default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    total_estimate = models.PositiveIntegerField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "heartbeat_at"]),
+        ]
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"BroadcastJob#{self.id} {self.segment} {self.status} {self.sent_count}/{self.total_estimate or '?'}"
+
+    @property
+    def progress(self) -> float | None:
+        if not self.total_estimate:
+            return None
+        return round(min(1.0, self.sent_count / self.total_estimate), 4)
+
+
+class NotificationDelivery(models.Model):
+    """
+    1 lần gửi notification ra kênh ngoài (email / sms / push), do noti/dispatch.py tạo
+    trong CÙNG transaction với Notification và worker dispatch_notifications gửi đi.
+
+    Lưu sẵn user + nội dung (không chỉ FK notification) để worker gửi không cần join
+    bảng Notification.
+    """
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        SENDING = "SENDING", "Sending (leased by a worker)"
+        SENT = "SENT", "Sent"
+        FAILED = "FAILED", "Failed (max attempts reached or permanent error)"
+
+    id = models.BigAutoField(primary_key=True)
+    notification = models.ForeignKey(
+        Notification, null=True, blank=True, on_delete=models.CASCADE, related_name="deliveries"
+    )
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="notification_deliveries")
+    channel = models.CharField(max_length=20, choices=Notification.Channel.choices)
+    title = models.CharField(max_length=255)
+    message = models.TextField(blank=True, default="")
+
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now, help_text="Chưa gửi trước thời điểm này (backoff / lease)")
+    last_error = models.TextField(blank=True, default="")
+    provider_ref = models.CharField(max_length=128, blank=True, default="")
+    sent_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["channel", "status", "available_at"]),
+        ]
+
+    def __str__(self):
+        return f"Delivery#{self.id} {self.channel} -> user {self.user_id} {self.status}"
@@ -0,0 +1,103 @@
+# noti/preferences.py
+"""
+Tuỳ chọn tắt notification theo category / kênh (NotificationPreference, dạng bitmask).
+
+- Category bị tắt: notification không được tạo (trừ priority=high và category không
+  có trong CATEGORY_BITS, vd "payment" luôn được gửi).
+- Kênh ngoài bị tắt (email / sms / push): notification vẫn lưu in-app nhưng không gửi ra ngoài.
+- Mask của 1 user = (muted_categories, muted_channels), đọc theo PK (get_mask); lô nhiều
+  user đọc 1 query cho cả lô (load_masks) rồi lọc bằng phép AND bit (filter_notifications).
+  Không cache: settings không có cache dùng chung, cache theo process sẽ giữ tuỳ chọn cũ ở
+  các process khác (relay, broadcast) sau khi user đổi.
+"""
+from __future__ import annotations
+
+from django.db import transaction
+
+from .models import Notification, NotificationPreference
+
+# Chỉ thêm vào cuối, không đổi bit đã dùng (dữ liệu lưu theo bit)
+CATEGORY_BITS = {
+    "chat": 1 << 0,
+    "review": 1 << 1,
+    "report": 1 << 2,
+    "task": 1 << 3,
+    "system": 1 << 4,
+    "digest": 1 << 5,
+    "promo": 1 << 6,
+}
+CHANNEL_BITS = {
+    Notification.Channel.EMAIL: 1 << 0,
+    Notification.Channel.SMS: 1 << 1,
+    Notification.Channel.PUSH: 1 << 2,
+}
+NO_MASK = (0, 0)
+
+
+def to_mask(names, bits: dict) -> int:
+    mask = 0
+    for name in names:
+        mask |= bits[name]
+    return mask
+
+
+def from_mask(mask: int, bits: dict) -> list:
+    return [name for name, bit in bits.items() if mask & bit]
+
+
+def load_masks(user_ids) -> dict:
+    """{user_id: (muted_categories, muted_channels)} cho user có tuỳ chọn; 1 query cho cả lô."""
+    user_ids = list(set(user_ids))
+    if not user_ids:
+        return {}
+    rows = NotificationPreference.objects.filter(user_id__in=user_ids).exclude(
+        muted_categories=0, muted_channels=0
+    ).values_list("user_id", "muted_categories", "muted_channels")
+    return {uid: (categories, channels) for uid, categories, channels in rows}
+
+
+def get_mask(user_id) -> tuple:
+    """Mask của 1 user (NO_MASK nếu không có tuỳ chọn)."""
+    return load_masks([user_id]).get(user_id, NO_MASK)
+
+
+def is_muted(notif: Notification, mask) -> bool:
+    muted_categories, _ = mask
+    if not muted_categories or notif.priority == Notification.Priority.HIGH:
+        return False
+    return bool(muted_categories & CATEGORY_BITS.get(notif.category, 0))
+
+
+def filter_notifications(notifs, masks=None) -> list:
+    """
+    Bỏ notification thuộc category user đã tắt; kênh ngoài bị tắt thì chuyển về in-app.
+    masks: kết quả load_masks() nếu đã có; không truyền thì đọc 1 query cho mọi user trong lô.
+    """
+    notifs = list(notifs)
+    if masks is None:
+        masks = load_masks(notif.user_id for notif in notifs)
+    if not masks:
+        return notifs
+
+    kept = []
+    for notif in notifs:
+        mask = masks.get(notif.user_id, NO_MASK)
+        if is_muted(notif, mask):
+            continue
+        if mask[1] & CHANNEL_BITS.get(notif.channel, 0):
+            notif.channel = Notification.Channel.IN_APP
+        kept.append(notif)
+    return kept
+
+
+def save_preferences(user_id, muted_categories, muted_channels) -> NotificationPreference:
+    """Lưu tuỳ chọn (list tên category / kênh)."""
+    with transaction.atomic():
+        pref, _ = NotificationPreference.objects.update_or_create(
+            user_id=user_id,
+            defaults={
+                "muted_categories": to_mask(muted_categories, CATEGORY_BITS),
+                "muted_channels": to_mask(muted_channels, CHANNEL_BITS),
+            },
+        )
+    return pref
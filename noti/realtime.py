@@ -0,0 +1,248 @@
+# noti/realtime.py
+"""
+Push notification real-time qua ASGI (thay cho việc client poll unread/count & list).
+
+- Channel theo user: "noti:user:<id>".
+- Message:
+    {"type": "notification", "notification": {...}}   # notification mới
+    {"type": "unread_count", "unread": <int>, "by_category": {...}}   # số chưa đọc thay đổi
+- publish_created() / publish_unread() được gọi ở mọi chỗ tạo / đổi trạng thái notification,
+  phát sau khi transaction commit (transaction.on_commit).
+- notifications_websocket: ASGI app cho ws://.../ws/notifications/?token=<JWT access>.
+- notification_stream: SSE fallback (GET /api/noti/stream/), chỉ stream được khi chạy ASGI
+  (dưới WSGI Django gom cả async iterator vào bộ nhớ).
+- notification_wait: long-poll (GET /api/noti/wait/?since=<cursor>) cho app bản cũ: request được
+  "đỗ" trên subscription của broker (không giữ thread, không query lặp) tới khi có notification
+  mới hoặc hết timeout. Cursor là id notification lớn nhất client đã nhận.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import ValidationError
+
+from Stackin.realtime import (
+    db_sync_to_async, get_broker, authenticate_scope, publish, user_from_token,
+)
+
+from .counters import get_unread, get_unread_many
+from .inbox import decode_since, encode_since, newer_than
+from .models import Notification
+from .serializers import NotificationSerializer
+
+SSE_HEARTBEAT_SECONDS = 15
+LONG_POLL_DEFAULT_TIMEOUT = 25
+LONG_POLL_MAX_TIMEOUT = 55
+LONG_POLL_LIMIT = 100
+
+
+def user_channel(user_id) -> str:
+    return f"noti:user:{user_id}"
+
+
+def notification_message(notif: Notification) -> dict:
+    """Bản gọn của NotificationSerializer (không query thêm)."""
+    return {
+        "type": "notification",
+        "notification": {
+            "id": notif.pk,
+            "type": notif.type,
+            "title": notif.title,
+            "message": notif.message,
+            "task": notif.task_id,
+            "payment": notif.payment_id,
+            "category": notif.category,
+            "priority": notif.priority,
+            "channel": notif.channel,
+            "metadata": notif.metadata,
+            "created_at": notif.created_at.isoformat() if notif.created_at else None,
+        },
+    }
+
+
+def unread_message(counts: dict) -> dict:
+    return {"type": "unread_count", "unread": counts["total"], "by_category": counts["by_category"]}
+
+
+def _send_unread(user_ids):
+    for uid, counts in get_unread_many(user_ids).items():
+        publish(user_channel(uid), unread_message(counts))
+
+
+def publish_unread(user_ids):
+    """Phát số chưa đọc mới cho các user sau khi transaction commit."""
+    user_ids = sorted(set(user_ids))
+    if user_ids:
+        transaction.on_commit(lambda: _send_unread(user_ids))
+
+
+def publish_created(notifs):
+    """Phát các notification mới (+ unread count) tới user nhận, sau khi transaction commit."""
+    notifs = list(notifs)
+    if not notifs:
+        return
+
+    def send():
+        for notif in notifs:
+            publish(user_channel(notif.user_id), notification_message(notif))
+        _send_unread(sorted({notif.user_id for notif in notifs}))
+
+    transaction.on_commit(send)
+
+
+async def _relay(subscription, send_message):
+    while True:
+        _, payload = await subscription.get()
+        await send_message(payload)
+
+
+async def notifications_websocket(scope, receive, send):
+    """
+    ASGI app WebSocket. Xác thực JWT 1 lần lúc connect, gửi unread count hiện tại,
+    sau đó đẩy mọi message của channel user cho tới khi client ngắt kết nối.
+    """
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+    user = await authenticate_scope(scope)
+    if user is None:
+        await send({"type": "websocket.close", "code": 4401})
+        return
+
+    subscription = get_broker().subscribe(user_channel(user.id))
+    await send({"type": "websocket.accept"})
+
+    async def send_message(payload):
+        await send({"type": "websocket.send", "text": json.dumps(payload, default=str)})
+
+    relay = None
+    try:
+        counts = await db_sync_to_async(get_unread)(user.id)
+        await send_message(unread_message(counts))
+        relay = asyncio.ensure_future(_relay(subscription, send_message))
+        while True:
+            message = await receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if relay.done():
+                break
+    finally:
+        if relay is not None:
+            relay.cancel()
+        subscription.close()
+
+
+def _sse(payload) -> str:
+    return f"event: {payload['type']}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+
+def _unauthorized():
+    return JsonResponse({"detail": "Authentication credentials were not provided or are invalid."}, status=401)
+
+
+async def _request_user(request):
+    """JWT từ header Authorization: Bearer <access> hoặc ?token=<access> (EventSource không gửi header)."""
+    auth = request.headers.get("Authorization", "").split()
+    token = request.GET.get("token") or (auth[1] if len(auth) == 2 and auth[0].lower() == "bearer" else None)
+    return await db_sync_to_async(user_from_token)(token)
+
+
+async def notification_stream(request):
+    """
+    SSE fallback cho client không dùng được WebSocket.
+    Auth: header Authorization: Bearer <JWT access> hoặc ?token=<JWT access>.
+    """
+    user = await _request_user(request)
+    if user is None:
+        return _unauthorized()
+
+    async def events():
+        subscription = get_broker().subscribe(user_channel(user.id))
+        try:
+            counts = await db_sync_to_async(get_unread)(user.id)
+            yield _sse(unread_message(counts))
+            while True:
+                item = await subscription.get(timeout=SSE_HEARTBEAT_SECONDS)
+                yield ": keepalive\n\n" if item is None else _sse(item[1])
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def _latest_id(user_id):
+    """id notification mới nhất của user; chưa có thì 0."""
+    return Notification.objects.filter(user_id=user_id).order_by("-id").values_list("id", flat=True).first() or 0
+
+
+def _newer_notifications(user_id, since_id, updated_ids=()):
+    """
+    (list notification có id > since_id hoặc thuộc updated_ids đã serialize - mới nhất trước,
+    cursor mới | None).
+    """
+    qs = newer_than(Notification.objects.filter(user_id=user_id), since_id, updated_ids)
+    rows = list(qs[:LONG_POLL_LIMIT])
+    if not rows:
+        return [], None
+    cursor = encode_since(max(since_id, rows[-1].pk))
+    rows.sort(key=lambda notif: (notif.created_at, notif.pk), reverse=True)
+    return NotificationSerializer(rows, many=True).data, cursor
+
+
+async def notification_wait(request):
+    """
+    Long-poll: GET /api/noti/wait/?since=<cursor>&timeout=<giây, mặc định 25, tối đa 55>.
+    - Có notification mới hơn since -> trả về ngay {"results": [...mới nhất trước], "cursor": ...};
+      quá LONG_POLL_LIMIT thì trả các dòng cũ nhất trước, lần gọi sau lấy tiếp.
+    - Không có -> chờ message "notification" trên channel của user (publish_created sau commit),
+      trả về cả dòng cũ vừa được gộp (coalesce) theo id trong message;
+      hết timeout -> {"results": [], "cursor": since}. Client gọi lại với cursor trả về.
+    - Không có since: mốc = notification mới nhất hiện tại, rồi chờ như trên.
+    Chỉ 1 query lúc vào và 1 query mỗi lần được đánh thức; user rảnh không tạo query lặp.
+    """
+    user = await _request_user(request)
+    if user is None:
+        return _unauthorized()
+    try:
+        timeout = float(request.GET.get("timeout", LONG_POLL_DEFAULT_TIMEOUT))
+    except ValueError:
+        return JsonResponse({"timeout": "Must be a number."}, status=400)
+    timeout = max(0.0, min(timeout, LONG_POLL_MAX_TIMEOUT))
+    raw_since = request.GET.get("since")
+    try:
+        since = decode_since(raw_since) if raw_since else None
+    except ValidationError as exc:
+        return JsonResponse(exc.detail, status=400)
+
+    # Subscribe trước khi query: notification commit giữa 2 bước vẫn đánh thức request
+    subscription = get_broker().subscribe(user_channel(user.id))
+    try:
+        if since is None:
+            since = await db_sync_to_async(_latest_id)(user.id)
+        else:
+            results, cursor = await db_sync_to_async(_newer_notifications)(user.id, since)
+            if results:
+                return JsonResponse({"results": results, "cursor": cursor})
+
+        updated_ids = set()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while (remaining := deadline - loop.time()) > 0:
+            item = await subscription.get(timeout=remaining)
+            if item is None:
+                break
+            if item[1].get("type") != "notification":
+                continue  # unread_count...
+            # Dòng được gộp giữ id cũ (<= since): lấy lại theo id trong message
+            updated_ids.add(item[1]["notification"]["id"])
+            results, cursor = await db_sync_to_async(_newer_notifications)(user.id, since, updated_ids)
+            if results:
+                return JsonResponse({"results": results, "cursor": cursor})
+        return JsonResponse({"results": [], "cursor": encode_since(since)})
+    finally:
+        subscription.close()
@@ -0,0 +1,121 @@
+# noti/retention.py
+"""
+Chính sách lưu giữ cho bảng Notification (lệnh purge_notifications, chạy định kỳ).
+
+Quy tắc (setting NOTIFICATION_RETENTION, số ngày tính theo created_at; None = không áp dụng):
+- READ_DAYS: notification đã đọc.
+- ARCHIVED_DAYS: notification user đã archive (đã ẩn khỏi danh sách).
+- UNREAD_DAYS: notification chưa đọc quá cũ (mặc định tắt); bộ đếm unread được trừ
+  trong cùng transaction.
+MODE: "delete" xoá hẳn, "archive" chép sang NotificationArchive rồi xoá.
+
+Xoá theo lô nhỏ: duyệt keyset (created_at, id) trên index created_at, mỗi lô 1 transaction
+ngắn (lock ít dòng, binlog nhỏ, replica không bị trễ); tuỳ chọn nghỉ giữa các lô.
+Điều kiện được kiểm tra lại lúc khoá lô nên dòng vừa đổi trạng thái không bị xoá nhầm.
+"""
+from __future__ import annotations
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .counters import apply_deltas, counts_unread
+from .models import Notification, NotificationArchive
+from .realtime import publish_unread
+
+MODE_DELETE = "delete"
+MODE_ARCHIVE = "archive"
+MODES = (MODE_DELETE, MODE_ARCHIVE)
+
+DEFAULTS = {
+    "MODE": MODE_DELETE,
+    "READ_DAYS": 90,
+    "ARCHIVED_DAYS": 30,
+    "UNREAD_DAYS": None,
+    "BATCH_SIZE": 1000,
+}
+
+ARCHIVE_FIELDS = (
+    "id", "user_id", "type", "title", "message", "task_id", "payment_id", "category", "priority",
+    "channel", "metadata", "is_read", "is_archived", "read_at", "created_at",
+)
+
+
+def get_policy(**overrides) -> dict:
+    policy = {**DEFAULTS, **getattr(settings, "NOTIFICATION_RETENTION", {})}
+    policy.update({key: value for key, value in overrides.items() if value is not None})
+    if policy["MODE"] not in MODES:
+        raise ValueError(f"Unknown retention mode '{policy['MODE']}'")
+    return policy
+
+
+def rules(policy, now=None) -> list:
+    """[(tên, Q)] cho các quy tắc đang bật."""
+    now = now or timezone.now()
+
+    def older_than(days):
+        return Q(created_at__lt=now - timedelta(days=days))
+
+    result = []
+    if policy["READ_DAYS"] is not None:
+        result.append(("read", Q(is_read=True, is_archived=False) & older_than(policy["READ_DAYS"])))
+    if policy["ARCHIVED_DAYS"] is not None:
+        result.append(("archived", Q(is_archived=True) & older_than(policy["ARCHIVED_DAYS"])))
+    if policy["UNREAD_DAYS"] is not None:
+        result.append(("unread", Q(is_read=False, is_archived=False) & older_than(policy["UNREAD_DAYS"])))
+    return result
+
+
+def _purge_batch(ids, condition, mode) -> int:
+    with transaction.atomic():
+        rows = list(
+            Notification.objects.select_for_update().filter(condition, pk__in=ids)
+            .order_by("id").only(*ARCHIVE_FIELDS)
+        )
+        if not rows:
+            return 0
+        if mode == MODE_ARCHIVE:
+            NotificationArchive.objects.bulk_create(
+                [NotificationArchive(**{field: getattr(row, field) for field in ARCHIVE_FIELDS}) for row in rows],
+                ignore_conflicts=True,  # lô trước chạy dở: dòng đã có trong kho
+            )
+        deltas = {}
+        for row in rows:
+            if counts_unread(row):
+                deltas[(row.user_id, row.category)] = deltas.get((row.user_id, row.category), 0) - 1
+        Notification.objects.filter(pk__in=[row.id for row in rows]).delete()
+        if deltas:
+            apply_deltas(deltas)
+            publish_unread([uid for uid, _ in deltas])
+    return len(rows)
+
+
+def purge(policy=None, dry_run=False, sleep=0, max_batches=None, progress=None) -> dict:
+    """Áp dụng các quy tắc; trả về {tên quy tắc: số dòng đã xoá (dry_run: sẽ xoá)}."""
+    policy = policy or get_policy()
+    batch_size = policy["BATCH_SIZE"]
+    result = {}
+    batches = 0
+    for name, condition in rules(policy):
+        result[name] = 0
+        cursor = None
+        while max_batches is None or batches < max_batches:
+            qs = Notification.objects.filter(condition)
+            if cursor is not None:
+                qs = qs.filter(Q(created_at__gt=cursor[1]) | Q(created_at=cursor[1], id__gt=cursor[0]))
+            page = list(qs.order_by("created_at", "id").values_list("id", "created_at")[:batch_size])
+            if not page:
+                break
+            cursor = page[-1]
+            n = len(page) if dry_run else _purge_batch([pk for pk, _ in page], condition, policy["MODE"])
+            result[name] += n
+            batches += 1
+            if progress:
+                progress(name, result[name])
+            if sleep and not dry_run:
+                time.sleep(sleep)
+    return result
@@ -1,6 +1,7 @@
 # noti/serializers.py
 from rest_framework import serializers
-from .models import Notification
+from .models import BroadcastJob, Notification
+from .preferences import CATEGORY_BITS, CHANNEL_BITS
 
 class NotificationSerializer(serializers.ModelSerializer):
     type_display = serializers.CharField(source="get_type_display", read_only=True)
@@ -62,3 +63,64 @@ class NotificationStatusUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notification
         fields = ["is_read", "is_archived"]
+
+
+class NotificationPreferenceSerializer(serializers.Serializer):
+    """Tuỳ chọn tắt notification, hiển thị dạng list tên thay cho bitmask."""
+    muted_categories = serializers.ListField(child=serializers.ChoiceField(choices=list(CATEGORY_BITS)), default=list)
+    muted_channels = serializers.ListField(
+        child=serializers.ChoiceField(choices=[str(channel) for channel in CHANNEL_BITS]), default=list
+    )
+
+
+class BroadcastJobSerializer(serializers.ModelSerializer):
+    """
+    Tạo / xem BroadcastJob. Audience: user_ids (list) hoặc segment (+ segment_category).
+    """
+    user_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, write_only=True)
+    recipients = serializers.SerializerMethodField()
+    progress = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = BroadcastJob
+        fields = [
+            "id", "status", "segment", "user_ids", "segment_category", "recipients",
+            "type", "title", "message", "task", "payment", "category", "priority", "channel", "metadata",
+            "chunk_size", "sent_count", "total_estimate", "progress", "last_user_id", "attempts",
+            "last_error", "started_at", "finished_at", "created_at",
+        ]
+        read_only_fields = [
+            "id", "status", "recipients", "sent_count", "total_estimate", "progress", "last_user_id",
+            "attempts", "last_error", "started_at", "finished_at", "created_at",
+        ]
+        extra_kwargs = {"segment": {"required": False}}
+
+    def get_recipients(self, obj):
+        if obj.segment == BroadcastJob.Segment.USER_IDS:
+            return len(obj.user_ids)
+        return obj.total_estimate
+
+    def validate_chunk_size(self, value):
+        if not 1 <= value <= 5000:
+            raise serializers.ValidationError("chunk_size phải trong khoảng 1..5000")
+        return value
+
+    def validate(self, attrs):
+        segment = attrs.get("segment")
+        if segment is None:
+            segment = BroadcastJob.Segment.USER_IDS if "user_ids" in attrs else None
+        if segment is None:
+            raise serializers.ValidationError("Cần user_ids hoặc segment")
+        if segment == BroadcastJob.Segment.USER_IDS and not attrs.get("user_ids"):
+            raise serializers.ValidationError({"user_ids": "user_ids must be a non-empty list"})
+        if segment != BroadcastJob.Segment.USER_IDS and attrs.get("user_ids"):
+            raise serializers.ValidationError({"user_ids": "Chỉ dùng với segment=user_ids"})
+        if attrs.get("segment_category") and segment != BroadcastJob.Segment.APPROVED_TASKERS:
+            raise serializers.ValidationError({"segment_category": "Chỉ dùng với segment=approved_taskers"})
+        attrs["segment"] = segment
+        return attrs
+
+    def create(self, validated_data):
+        from .broadcast import create_job
+
+        return create_job(**validated_data)
@@ -1,3 +1,87 @@
-from django.test import TestCase
+import asyncio
+import json
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from task.models import Category, Task
+
+from .inbox import encode_since, explain_inbox_plans, uses_filesort
+from .models import Notification
+from .realtime import notification_wait
+from .utils import push_notification
+
+
+class InboxPlanTests(TestCase):
+    """Danh sách notification phải đọc index theo thứ tự (không filesort) với mọi tổ hợp filter."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user("inbox", "inbox@example.com", "pw")
+        other = User.objects.create_user("inbox_other", "inbox_other@example.com", "pw")
+        categories = ["chat", "review", "task", None]
+        Notification.objects.bulk_create([
+            Notification(
+                user=cls.user if i % 3 else other,
+                type=Notification.Type.SYSTEM,
+                title=f"n{i}",
+                message="m",
+                category=categories[i % len(categories)],
+                priority=Notification.Priority.HIGH if i % 7 == 0 else Notification.Priority.NORMAL,
+                is_read=i % 2 == 0,
+                is_archived=i % 5 == 0,
+            )
+            for i in range(300)
+        ])
+
+    def test_detector_flags_filesort(self):
+        plan = Notification.objects.filter(user=self.user).order_by("title")[:20].explain()
+        self.assertTrue(uses_filesort(plan), plan)
+
+    def test_inbox_plans_do_not_filesort(self):
+        for label, plan in explain_inbox_plans(self.user.id):
+            with self.subTest(label):
+                self.assertFalse(uses_filesort(plan), plan)
+
+
+@override_settings(NOTIFICATION_COALESCE_WINDOWS={"chat": 600})
+class LongPollCoalesceTests(TransactionTestCase):
+    """Long-poll phải trả về dòng cũ được gộp (giữ id cũ, id <= since) khi bị đánh thức."""
+
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user("poll", "poll@example.com", "pw")
+        tasker = User.objects.create_user("poll_tasker", "poll_tasker@example.com", "pw")
+        category = Category.objects.create(name="Long-poll test")
+        self.task = Task.objects.create(
+            client=self.user, tasker=tasker, category=category, title="t", description="d", price=100,
+        )
+        self.first = self._push("m1")
+
+    def _push(self, message):
+        return push_notification(
+            self.user, Notification.Type.TASK, "Tin nhắn mới", message, task=self.task, category="chat",
+        )
+
+    async def test_wait_returns_coalesced_row(self):
+        request = AsyncRequestFactory().get(
+            "/api/noti/wait/",
+            {"since": encode_since(self.first.pk), "timeout": 5},
+            headers={"Authorization": f"Bearer {AccessToken.for_user(self.user)}"},
+        )
+        waiting = asyncio.ensure_future(notification_wait(request))
+        await asyncio.sleep(0.2)  # request đã subscribe và query lần đầu (chưa có gì mới)
+        self.assertFalse(waiting.done())
+
+        merged = await sync_to_async(self._push)("m2")
+        self.assertEqual(merged.pk, self.first.pk)
+
+        response = await asyncio.wait_for(waiting, timeout=5)
+        body = json.loads(response.content)
+        self.assertEqual([row["id"] for row in body["results"]], [self.first.pk])
+        self.assertEqual(body["results"][0]["message"], "m2")
+        self.assertEqual(body["results"][0]["metadata"]["count"], 2)
+        self.assertEqual(body["cursor"], encode_since(self.first.pk))
@@ -6,9 +6,13 @@ from .views import (
     NotificationArchiveView,
     NotificationBulkMarkReadView,
     NotificationUnreadCountView,
+    NotificationPreferenceView,
     NotificationCreateView,
     NotificationBroadcastView,
+    BroadcastJobDetailView,
+    BroadcastJobCancelView,
 )
+from .realtime import notification_stream, notification_wait
 
 urlpatterns = [
     # ----- USER SCOPE -----
@@ -20,8 +24,16 @@ urlpatterns = [
     path("<int:pk>/archive/", NotificationArchiveView.as_view(), name="notification-archive"),
     path("bulk/mark-read/", NotificationBulkMarkReadView.as_view(), name="notification-bulk-mark-read"),
     path("unread/count/", NotificationUnreadCountView.as_view(), name="notification-unread-count"),
+    path("preferences/", NotificationPreferenceView.as_view(), name="notification-preferences"),
+
+    # Push real-time: SSE fallback (WebSocket ở /ws/notifications/, xem Stackin/asgi.py)
+    path("stream/", notification_stream, name="notification-stream"),
+    # Long-poll cho app bản cũ chưa dùng WebSocket
+    path("wait/", notification_wait, name="notification-wait"),
 
     # ----- ADMIN / SYSTEM SCOPE -----
     path("admin/create/", NotificationCreateView.as_view(), name="notification-create"),
     path("admin/broadcast/", NotificationBroadcastView.as_view(), name="notification-broadcast"),
+    path("admin/broadcast/<int:pk>/", BroadcastJobDetailView.as_view(), name="notification-broadcast-detail"),
+    path("admin/broadcast/<int:pk>/cancel/", BroadcastJobCancelView.as_view(), name="notification-broadcast-cancel"),
 ]
@@ -1,16 +1,169 @@
 # noti/utils.py
+"""
+API tạo notification cho các app khác (report, chat, review, task...).
+
+- push_notification(): 1 notification. Nếu đang ở trong notification_batch() thì chỉ
+  được gom lại, chưa insert.
+- push_notifications(): cùng nội dung cho nhiều user (vd mọi admin) -> 1 bulk_create.
+- notification_batch(): gom mọi notification phát sinh trong 1 action, khi ra khỏi block
+  thì flush bằng 1 bulk_create + cập nhật bộ đếm unread, trong CÙNG transaction với action
+  (rollback thì không có notification nào). Batch lồng nhau dùng chung batch ngoài cùng.
+- channel email / sms / push: notification được lưu in-app như thường, kèm 1 NotificationDelivery
+  để worker dispatch_notifications gửi ra ngoài (noti/dispatch.py); caller không chờ gửi.
+- Tuỳ chọn tắt của user (noti/preferences.py) được áp dụng trước khi ghi: category bị tắt thì
+  bỏ, kênh ngoài bị tắt thì chỉ lưu in-app. Lô nhiều user đọc tuỳ chọn bằng 1 query.
+- Insert hàng loạt đi qua bulk_insert(): MySQL không trả pk sau bulk_create, nên pk được đọc
+  lại (range id > MAX(id) trước insert, khớp theo (user, created_at)) để delivery, sự kiện
+  real-time và digest luôn có id notification.
+- Lúc flush, notification thuộc category có cửa sổ gộp (NOTIFICATION_COALESCE_WINDOWS) được gộp
+  vào dòng chưa đọc cùng (user, category, task) thay vì INSERT (noti/coalesce.py).
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connection, transaction
+from django.db.models import Max
+
+from .coalesce import coalesce
+from .counters import record_created
+from .dispatch import enqueue_deliveries
 from .models import Notification
+from .preferences import filter_notifications
+from .realtime import publish_created
+
+_current_batch = ContextVar("noti_batch", default=None)
 
-def push_notification(user, type, title, message, task=None, payment=None, metadata=None):
+
+def notifications_created(notifs):
     """
-    Helper để tạo notification nhanh từ các app khác (report, chat, task...).
+    Gọi ngay sau khi insert notification (cùng transaction): cập nhật bộ đếm unread,
+    xếp hàng gửi kênh ngoài và phát real-time sau commit.
     """
-    Notification.objects.create(
-        user=user,
+    record_created(notifs)
+    enqueue_deliveries(notifs)
+    publish_created(notifs)
+
+
+def bulk_insert(notifs, batch_size=500) -> list:
+    """
+    bulk_create + gán pk cho từng instance kể cả khi backend không trả về (MySQL).
+    Phải gọi trong transaction: các dòng vừa insert được đọc lại trong cùng transaction.
+    """
+    if not notifs:
+        return notifs
+    if connection.features.can_return_rows_from_bulk_insert:
+        return Notification.objects.bulk_create(notifs, batch_size=batch_size)
+
+    floor = Notification.objects.aggregate(last=Max("id"))["last"] or 0
+    Notification.objects.bulk_create(notifs, batch_size=batch_size)
+    # id auto-increment tăng theo thứ tự dòng trong INSERT; dòng của transaction khác
+    # trùng đúng (user, created_at) tới micro giây thì coi như không xảy ra
+    pending = {}
+    for notif in notifs:
+        pending.setdefault((notif.user_id, notif.created_at), []).append(notif)
+    rows = (
+        Notification.objects.filter(id__gt=floor, user_id__in={notif.user_id for notif in notifs})
+        .order_by("id").values_list("id", "user_id", "created_at")
+    )
+    for pk, user_id, created_at in rows.iterator(chunk_size=2000):
+        queue = pending.get((user_id, created_at))
+        if queue:
+            queue.pop(0).pk = pk
+    return notifs
+
+
+def _build(user, type, title, message, task=None, payment=None, metadata=None, category=None, priority=None,
+           channel=None):
+    fields = dict(
         type=type,
         title=title,
         message=message,
-        task=task,
-        payment=payment,
+        task_id=getattr(task, "pk", task),
+        payment_id=getattr(payment, "pk", payment),
         metadata=metadata or {},
+        category=category,
     )
+    if priority:
+        fields["priority"] = priority
+    if channel:
+        fields["channel"] = channel
+    return Notification(user_id=getattr(user, "pk", user), **fields)
+
+
+class NotificationBatch:
+    """Bộ gom notification; flush() = gộp theo quy tắc coalesce + 1 bulk_create cho phần còn lại."""
+
+    def __init__(self):
+        self.pending = []
+
+    def add(self, notif: Notification):
+        self.pending.append(notif)
+
+    def flush(self) -> list:
+        """Trả về các notification đã ghi: dòng mới + dòng có sẵn được gộp vào."""
+        notifs, self.pending = self.pending, []
+        notifs = filter_notifications(notifs)
+        if not notifs:
+            return []
+        notifs, coalesced = coalesce(notifs)
+        if notifs:
+            bulk_insert(notifs)
+            notifications_created(notifs)
+        if coalesced:
+            publish_created(coalesced)  # client cập nhật dòng cũ theo id; unread không đổi
+        return notifs + coalesced
+
+
+@contextmanager
+def notification_batch():
+    outer = _current_batch.get()
+    if outer is not None:
+        yield outer
+        return
+
+    batch = NotificationBatch()
+    token = _current_batch.set(batch)
+    try:
+        with transaction.atomic():
+            yield batch
+            batch.flush()
+    finally:
+        _current_batch.reset(token)
+
+
+def push_notification(user, type, title, message, task=None, payment=None, metadata=None,
+                      category=None, priority=None, channel=None):
+    """
+    Helper để tạo notification nhanh từ các app khác (report, chat, task...).
+    user / task / payment nhận instance hoặc id.
+    Ngoài notification_batch(): trả về notification đã ghi (có thể là dòng cũ được gộp vào),
+    None nếu user đã tắt category này.
+    """
+    notif = _build(user, type, title, message, task, payment, metadata, category, priority, channel)
+    batch = _current_batch.get()
+    if batch is not None:
+        batch.add(notif)
+        return notif
+    if not filter_notifications([notif]):  # 1 query theo PK tuỳ chọn của user
+        return None
+    with transaction.atomic():
+        notifs, coalesced = coalesce([notif])
+        if coalesced:
+            publish_created(coalesced)
+            return coalesced[0]
+        notif.save(force_insert=True)
+        notifications_created([notif])
+    return notif
+
+
+def push_notifications(users, type, title, message, task=None, payment=None, metadata=None,
+                       category=None, priority=None, channel=None) -> list:
+    """Cùng 1 notification cho nhiều user (instance hoặc id): 1 bulk_insert dù bao nhiêu người nhận."""
+    with notification_batch() as batch:
+        notifs = [
+            _build(user, type, title, message, task, payment, metadata, category, priority, channel)
+            for user in users
+        ]
+        for notif in notifs:
+            batch.add(notif)
+    return notifs
@@ -2,19 +2,27 @@
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.db.models import Q
 
 from rest_framework import generics, permissions, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 
-from .models import Notification
+from .models import BroadcastJob, Notification
 from .serializers import (
+    BroadcastJobSerializer,
     NotificationSerializer,
     NotificationCreateSerializer,
+    NotificationPreferenceSerializer,
     NotificationStatusUpdateSerializer,
 )
 from .permissions import IsOwnerOfNotification, IsSystemOrAdmin
+from .inbox import InboxKeysetPagination, inbox_queryset
+from .counters import bulk_mark_read, counts_unread, get_unread, record_change
+from .preferences import CATEGORY_BITS, CHANNEL_BITS, from_mask, get_mask, save_preferences
+from .realtime import publish_unread
+from .utils import notifications_created
 
 
 def _parse_bool(value, default=None):
@@ -41,32 +49,22 @@ class NotificationListView(generics.ListAPIView):
       - is_archived=[true|false]
       - category=<slug/enum>
       - priority=[low|normal|high]
-    Mặc định: sắp xếp -created_at (mới nhất trước).
+    Sắp xếp (-created_at, -id), keyset pagination: ?limit=<1..100>&cursor=<next của trang trước>
+    (noti/inbox.py). Response: {"next": <url|null>, "results": [...]}.
     """
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = InboxKeysetPagination
 
     def get_queryset(self):
-        qs = Notification.objects.select_related("user").filter(user=self.request.user)
-
-        # Filters
-        is_read = _parse_bool(self.request.query_params.get("is_read"))
-        if is_read is not None:
-            qs = qs.filter(is_read=is_read)
-
-        is_archived = _parse_bool(self.request.query_params.get("is_archived"))
-        if is_archived is not None:
-            qs = qs.filter(is_archived=is_archived)
-
-        category = self.request.query_params.get("category")
-        if category:
-            qs = qs.filter(category=category)
-
-        priority = self.request.query_params.get("priority")
-        if priority:
-            qs = qs.filter(priority=priority)
-
-        return qs.order_by("-created_at")
+        params = self.request.query_params
+        return inbox_queryset(
+            self.request.user.id,
+            is_read=_parse_bool(params.get("is_read")),
+            is_archived=_parse_bool(params.get("is_archived")),
+            category=params.get("category"),
+            priority=params.get("priority"),
+        )
 
 
 class NotificationDetailView(generics.RetrieveAPIView):
@@ -90,16 +88,21 @@ class NotificationMarkReadView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsOwnerOfNotification]
 
     def post(self, request, pk):
-        notif = get_object_or_404(Notification, pk=pk)
-        self.check_object_permissions(request, notif)
-
         read = _parse_bool(request.data.get("read"))
         if read is None:
             return Response({"error": "Missing or invalid 'read' flag"}, status=status.HTTP_400_BAD_REQUEST)
 
-        notif.is_read = bool(read)
-        notif.read_at = timezone.now() if notif.is_read else None
-        notif.save(update_fields=["is_read", "read_at", "updated_at"])
+        with transaction.atomic():
+            # Lock dòng để trạng thái trước/sau (-> delta bộ đếm) không bị request song song làm lệch
+            notif = get_object_or_404(Notification.objects.select_for_update(), pk=pk)
+            self.check_object_permissions(request, notif)
+
+            was_unread = counts_unread(notif)
+            notif.is_read = bool(read)
+            notif.read_at = timezone.now() if notif.is_read else None
+            notif.save(update_fields=["is_read", "read_at", "updated_at"])
+            record_change(notif, was_unread)
+            publish_unread([notif.user_id])
         return Response({"message": "Updated", "is_read": notif.is_read}, status=status.HTTP_200_OK)
 
 
@@ -108,15 +111,19 @@ class NotificationArchiveView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsOwnerOfNotification]
 
     def post(self, request, pk):
-        notif = get_object_or_404(Notification, pk=pk)
-        self.check_object_permissions(request, notif)
-
         archived = _parse_bool(request.data.get("archived"))
         if archived is None:
             return Response({"error": "Missing or invalid 'archived' flag"}, status=status.HTTP_400_BAD_REQUEST)
 
-        notif.is_archived = bool(archived)
-        notif.save(update_fields=["is_archived", "updated_at"])
+        with transaction.atomic():
+            notif = get_object_or_404(Notification.objects.select_for_update(), pk=pk)
+            self.check_object_permissions(request, notif)
+
+            was_unread = counts_unread(notif)
+            notif.is_archived = bool(archived)
+            notif.save(update_fields=["is_archived", "updated_at"])
+            record_change(notif, was_unread)
+            publish_unread([notif.user_id])
         return Response({"message": "Updated", "is_archived": notif.is_archived}, status=status.HTTP_200_OK)
 
 
@@ -140,7 +147,9 @@ class NotificationBulkMarkReadView(APIView):
         if category:
             qs = qs.filter(category=category)
 
-        updated = qs.update(is_read=True, read_at=timezone.now())
+        updated = bulk_mark_read(qs, timezone.now())
+        if updated:
+            publish_unread([request.user.id])
         return Response({"updated": updated}, status=status.HTTP_200_OK)
 
 
@@ -148,15 +157,41 @@ class NotificationUnreadCountView(APIView):
     """
     Đếm số notification chưa đọc (mặc định bỏ qua archived).
     Query param: include_archived=true|false (default: false)
+    Mặc định đọc từ bộ đếm NotificationCounter, kèm số theo category;
+    include_archived=true không có bộ đếm riêng nên vẫn COUNT trên DB.
     """
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
         include_archived = _parse_bool(request.query_params.get("include_archived"), default=False)
-        qs = Notification.objects.filter(user=request.user, is_read=False)
-        if not include_archived:
-            qs = qs.filter(is_archived=False)
-        return Response({"unread": qs.count()}, status=status.HTTP_200_OK)
+        if include_archived:
+            count = Notification.objects.filter(user=request.user, is_read=False).count()
+            return Response({"unread": count}, status=status.HTTP_200_OK)
+        counts = get_unread(request.user.id)
+        return Response({"unread": counts["total"], "by_category": counts["by_category"]}, status=status.HTTP_200_OK)
+
+
+class NotificationPreferenceView(APIView):
+    """
+    Tuỳ chọn tắt notification của chính mình.
+    GET  -> {"muted_categories": [...], "muted_channels": [...]}
+    PUT  -> cùng format; category tắt thì không nhận notification đó (trừ priority high),
+            kênh tắt (email/sms/push) thì chỉ nhận in-app.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        muted_categories, muted_channels = get_mask(request.user.id)
+        return Response({
+            "muted_categories": from_mask(muted_categories, CATEGORY_BITS),
+            "muted_channels": from_mask(muted_channels, CHANNEL_BITS),
+        }, status=status.HTTP_200_OK)
+
+    def put(self, request):
+        serializer = NotificationPreferenceSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        save_preferences(request.user.id, **serializer.validated_data)
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
 
 # =========================
@@ -170,12 +205,20 @@ class NotificationCreateView(generics.CreateAPIView):
     serializer_class = NotificationCreateSerializer
     permission_classes = [permissions.IsAuthenticated, IsSystemOrAdmin]
 
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            notifications_created([serializer.save()])
 
-class NotificationBroadcastView(APIView):
+
+class NotificationBroadcastView(generics.ListCreateAPIView):
     """
+    Tạo BroadcastJob (chạy nền bằng lệnh run_broadcasts) thay vì insert toàn bộ notification
+    trong request. Trả về 202 + job; theo dõi tiến độ qua GET admin/broadcast/<id>/.
     Body:
     {
-      "user_ids": [1,2,3],
+      "user_ids": [1,2,3],                       # hoặc
+      "segment": "approved_taskers|all_users",
+      "segment_category": <category_id?>,        # chỉ với approved_taskers
       "title": "...",
       "message": "...",
       "category": "task|payment|system|...",
@@ -183,47 +226,38 @@ class NotificationBroadcastView(APIView):
       "priority": "low|normal|high",
       "metadata": {...},
       "task": <task_id?>,
-      "payment": <payment_id?>
+      "payment": <payment_id?>,
+      "chunk_size": 1000
     }
+    GET: danh sách job gần đây.
     """
+    queryset = BroadcastJob.objects.all()
+    serializer_class = BroadcastJobSerializer
     permission_classes = [permissions.IsAuthenticated, IsSystemOrAdmin]
 
-    def post(self, request):
-        payload = request.data or {}
-        user_ids = payload.get("user_ids")
-        if not isinstance(user_ids, list) or not user_ids:
-            return Response({"error": "user_ids must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
-
-        proto_data = {
-            key: payload.get(key)
-            for key in ["type", "title", "message", "task", "payment", "category", "priority", "channel", "metadata"]
-            if key in payload
-        }
-        # Validate shared fields with serializer (without user)
-        proto = NotificationCreateSerializer(data=proto_data)
-        proto.is_valid(raise_exception=True)
-        vd = proto.validated_data
-
-        notifs = []
-        now = timezone.now()
-        for uid in user_ids:
-            notifs.append(
-                Notification(
-                    user_id=uid,
-                    type=vd.get("type", Notification.Type.SYSTEM),
-                    title=vd["title"],
-                    message=vd.get("message", ""),
-                    task=vd.get("task"),
-                    payment=vd.get("payment"),
-                    category=vd.get("category"),
-                    channel=vd.get("channel", Notification.Channel.IN_APP),
-                    priority=vd.get("priority", Notification.Priority.NORMAL),
-                    metadata=vd.get("metadata", {}),
-                    created_at=now,
-                    updated_at=now,
-                )
-            )
-
-        Notification.objects.bulk_create(notifs, batch_size=500)
-        return Response({"created": len(notifs)}, status=status.HTTP_201_CREATED)
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(created_by=request.user)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
 
+
+class BroadcastJobDetailView(generics.RetrieveAPIView):
+    """Tiến độ 1 BroadcastJob."""
+    queryset = BroadcastJob.objects.all()
+    serializer_class = BroadcastJobSerializer
+    permission_classes = [permissions.IsAuthenticated, IsSystemOrAdmin]
+
+
+class BroadcastJobCancelView(APIView):
+    """Huỷ job chưa xong; worker dừng ở chunk kế tiếp, các chunk đã ghi giữ nguyên."""
+    permission_classes = [permissions.IsAuthenticated, IsSystemOrAdmin]
+
+    def post(self, request, pk):
+        updated = BroadcastJob.objects.filter(
+            pk=pk, status__in=[BroadcastJob.Status.PENDING, BroadcastJob.Status.RUNNING]
+        ).update(status=BroadcastJob.Status.CANCELED, updated_at=timezone.now())
+        if not updated:
+            get_object_or_404(BroadcastJob, pk=pk)
+            return Response({"error": "Job đã kết thúc"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"message": "Canceled"}, status=status.HTTP_200_OK)
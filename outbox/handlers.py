@@ -0,0 +1,66 @@
+# outbox/handlers.py
+"""
+Registry handler theo topic cho relay worker.
+
+Mỗi handler nhận list payload (cùng topic, theo thứ tự id) và xử lý cả lô,
+ví dụ 1 bulk_create cho nhiều notification. Handler phải idempotent ở mức
+"chạy lại cả lô không gây hại nghiêm trọng" vì relay retry khi lỗi.
+
+Tích hợp mới chỉ cần:
+    from outbox.handlers import register
+
+    @register("my.topic")
+    def handle_my_topic(payloads): ...
+"""
+HANDLERS = {}
+
+TOPIC_NOTIFICATION = "noti.create"
+TOPIC_TASK_EVENT = "task.event"
+
+
+def register(topic):
+    def decorator(func):
+        HANDLERS[topic] = func
+        return func
+    return decorator
+
+
+@register(TOPIC_NOTIFICATION)
+def create_notifications(payloads):
+    """payload: {"user", "title", "message", "type"?, "task"?, "payment"?, "category"?, "priority"?, "channel"?, "metadata"?}"""
+    from noti.models import Notification
+    from noti.utils import notification_batch
+
+    with notification_batch() as batch:  # 1 bulk_create + gộp theo quy tắc coalesce (vd review)
+        for p in payloads:
+            batch.add(Notification(
+                user_id=p["user"],
+                type=p.get("type", Notification.Type.SYSTEM),
+                title=p["title"],
+                message=p.get("message", ""),
+                task_id=p.get("task"),
+                payment_id=p.get("payment"),
+                category=p.get("category"),
+                priority=p.get("priority", Notification.Priority.NORMAL),
+                channel=p.get("channel", Notification.Channel.IN_APP),
+                metadata=p.get("metadata") or {},
+            ))
+
+
+@register(TOPIC_TASK_EVENT)
+def create_task_events(payloads):
+    """payload: {"task", "event", "actor"?, "from_status"?, "to_status"?, "note"?, "metadata"?}"""
+    from task.models import TaskEvent
+
+    TaskEvent.objects.bulk_create([
+        TaskEvent(
+            task_id=p["task"],
+            actor_id=p.get("actor"),
+            event=p["event"],
+            from_status=p.get("from_status", ""),
+            to_status=p.get("to_status", ""),
+            note=p.get("note", ""),
+            metadata=p.get("metadata") or {},
+        )
+        for p in payloads
+    ], batch_size=500)
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from outbox.relay import DEFAULT_BATCH_SIZE, MAX_ATTEMPTS, drain_once
+
+
+class Command(BaseCommand):
+    help = 'Drain the transactional outbox in batches (notifications, task events, integrations)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS)
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting when empty')
+        parser.add_argument('--interval', type=float, default=1.0, help='Sleep between polls when idle (seconds)')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size must be > 0')
+
+        total_done = total_failed = 0
+        while True:
+            done, failed = drain_once(options['batch_size'], options['max_attempts'])
+            total_done += done
+            total_failed += failed
+            if done or failed:
+                self.stdout.write(f'Relayed {done} events ({failed} failed)')
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Outbox drained: {total_done} done, {total_failed} failed'))
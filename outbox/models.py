@@ -0,0 +1,38 @@
+# outbox/models.py
+from django.db import models
+from django.utils import timezone
+
+
+class OutboxEvent(models.Model):
+    """
+    Transactional outbox.
+    Side-effect (notification, TaskEvent, tích hợp ngoài...) được ghi thành 1 dòng ở đây
+    trong CÙNG transaction với thay đổi trạng thái chính, nên không bị mất nếu process
+    chết ngay sau commit. Relay worker (lệnh relay_outbox) đọc theo lô và thực thi
+    qua handler đã đăng ký theo topic (outbox/handlers.py).
+    """
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        DONE = "DONE", "Done"
+        FAILED = "FAILED", "Failed (max attempts reached)"
+
+    id = models.BigAutoField(primary_key=True)
+    topic = models.CharField(max_length=64)
+    payload = models.JSONField(default=dict)
+
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now, help_text="Chưa xử lý trước thời điểm này (backoff)")
+    last_error = models.TextField(blank=True, null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "available_at"]),
+            models.Index(fields=["topic"]),
+        ]
+
+    def __str__(self):
+        return f"Outbox#{self.id} {self.topic} {self.status}"
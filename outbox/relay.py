@@ -0,0 +1,93 @@
+# outbox/relay.py
+"""
+Relay worker: rút OutboxEvent PENDING theo lô và chạy handler theo topic.
+
+- Lấy lô bằng SELECT ... FOR UPDATE SKIP LOCKED để nhiều worker chạy song song
+  không xử lý trùng.
+- Các event cùng topic được gom lại, handler chạy 1 lần cho cả nhóm.
+- Nếu cả nhóm lỗi -> chạy lại từng event để cô lập event lỗi; event lỗi được
+  retry với exponential backoff, quá max_attempts thì chuyển FAILED.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .handlers import HANDLERS
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+MAX_ATTEMPTS = 8
+BASE_BACKOFF_SECONDS = 5
+
+
+def _run(topic, events):
+    handler = HANDLERS.get(topic)
+    if handler is None:
+        raise LookupError(f"No outbox handler registered for topic '{topic}'")
+    with transaction.atomic():
+        handler([e.payload for e in events])
+
+
+def drain_once(batch_size=DEFAULT_BATCH_SIZE, max_attempts=MAX_ATTEMPTS):
+    """Xử lý 1 lô. Trả về (số event thành công, số event lỗi)."""
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxEvent.Status.PENDING, available_at__lte=now)
+            .order_by("id")[:batch_size]
+        )
+        if not events:
+            return 0, 0
+
+        groups = {}
+        for event in events:
+            groups.setdefault(event.topic, []).append(event)
+
+        done, failed = [], []
+        for topic, group in groups.items():
+            try:
+                _run(topic, group)
+                done.extend(group)
+                continue
+            except Exception:
+                if len(group) == 1:
+                    logger.exception("Outbox event #%s (%s) failed", group[0].id, topic)
+                    failed.append((group[0], _last_error()))
+                    continue
+                logger.warning("Outbox batch for topic %s failed, retrying events one by one", topic)
+
+            for event in group:
+                try:
+                    _run(topic, [event])
+                    done.append(event)
+                except Exception:
+                    logger.exception("Outbox event #%s (%s) failed", event.id, topic)
+                    failed.append((event, _last_error()))
+
+        finished_at = timezone.now()
+        if done:
+            OutboxEvent.objects.filter(pk__in=[e.id for e in done]).update(
+                status=OutboxEvent.Status.DONE, processed_at=finished_at, last_error=None
+            )
+        for event, error in failed:
+            event.attempts += 1
+            event.last_error = error
+            if event.attempts >= max_attempts:
+                event.status = OutboxEvent.Status.FAILED
+            else:
+                event.available_at = finished_at + timedelta(seconds=BASE_BACKOFF_SECONDS * 2 ** (event.attempts - 1))
+        if failed:
+            OutboxEvent.objects.bulk_update(
+                [e for e, _ in failed], ["attempts", "last_error", "status", "available_at"]
+            )
+    return len(done), len(failed)
+
+
+def _last_error():
+    return traceback.format_exc(limit=5)
@@ -0,0 +1,16 @@
+# outbox/utils.py
+from .models import OutboxEvent
+
+
+def enqueue(topic, payload):
+    """
+    Ghi 1 side-effect vào outbox. Gọi bên trong transaction của thay đổi trạng thái
+    để side-effect chỉ tồn tại khi thay đổi đó commit.
+    """
+    return OutboxEvent.objects.create(topic=topic, payload=payload)
+
+
+def enqueue_many(topic, payloads, batch_size=500):
+    """Giống enqueue nhưng 1 bulk_create cho nhiều payload (dùng trong batch processor)."""
+    events = [OutboxEvent(topic=topic, payload=payload) for payload in payloads]
+    return OutboxEvent.objects.bulk_create(events, batch_size=batch_size)
@@ -1,3 +1,13 @@
 from django.contrib import admin
+from .models import FeeRule
 
-# Register your models here.
+
+@admin.register(FeeRule)
+class FeeRuleAdmin(admin.ModelAdmin):
+    list_display = (
+        "id", "name", "category", "tasker_level", "promotion_code",
+        "min_amount", "max_amount", "percent", "priority", "is_active", "valid_from", "valid_until",
+    )
+    list_filter = ("is_active", "tasker_level", "category")
+    search_fields = ("name", "promotion_code")
+    ordering = ("-priority", "id")
@@ -0,0 +1,278 @@
+# payment/batch.py
+"""
+Xử lý escrow theo lô (batch).
+
+Thay vì gọi Payment.mark_released() cho từng payment (2 lần save Payment +
+get_or_create ví + insert transaction cho mỗi payment), engine ở đây xử lý
+hàng nghìn payment HELD trong 1 lượt:
+  - Chia payment thành các chunk, mỗi chunk chạy trong 1 transaction ngắn.
+  - Lock ví theo thứ tự id tăng dần (deterministic) để tránh deadlock giữa các worker.
+  - Cộng dồn số tiền theo ví -> mỗi ví chỉ update 1 lần/chunk.
+  - bulk_create WalletTransaction (mỗi payment vẫn có bút toán riêng để audit).
+
+Refund (HELD -> REFUNDED, hoàn toàn bộ amount vào ví client, bút toán REFUND) dùng
+cùng cơ chế; Payment.mark_refunded() gọi lại apply_refunds() cho 1 payment.
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from outbox.handlers import TOPIC_NOTIFICATION
+from outbox.utils import enqueue_many
+
+from .models import Payment, Wallet, WalletTransaction
+from .rollups import record_transitions
+
+CENT = Decimal("0.01")
+DEFAULT_CHUNK_SIZE = 500
+
+
+@dataclass
+class BatchResult:
+    processed: int = 0
+    transactions_created: int = 0
+    wallets_touched: int = 0
+    skipped: list = field(default_factory=list)  # [(payment_id, reason)]
+    elapsed: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Số payment xử lý được mỗi giây."""
+        return self.processed / self.elapsed if self.elapsed > 0 else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "processed": self.processed,
+            "transactions_created": self.transactions_created,
+            "wallets_touched": self.wallets_touched,
+            "skipped": [{"payment": pid, "reason": reason} for pid, reason in self.skipped],
+            "elapsed_seconds": round(self.elapsed, 4),
+            "payments_per_second": round(self.throughput, 2),
+        }
+
+
+def lock_wallets(user_ids, include_platform: bool = False) -> dict:
+    """
+    Đảm bảo các ví tồn tại rồi lock (SELECT ... FOR UPDATE) theo thứ tự id.
+    Trả về dict {user_id: Wallet}; ví platform có key None.
+    Phải được gọi bên trong transaction.atomic().
+    """
+    user_ids = sorted(set(user_ids))
+    existing = set(Wallet.objects.filter(user_id__in=user_ids).values_list("user_id", flat=True))
+    missing = [uid for uid in user_ids if uid not in existing]
+    if missing:
+        Wallet.objects.bulk_create([Wallet(user_id=uid) for uid in missing], ignore_conflicts=True)
+
+    condition = Q(user_id__in=user_ids)
+    platform_id = None
+    if include_platform:
+        platform_id = Wallet.get_or_create_platform_wallet().pk
+        condition |= Q(pk=platform_id)
+
+    wallets = {}
+    for wallet in Wallet.objects.select_for_update().filter(condition).order_by("id"):
+        if wallet.user_id is None:
+            if wallet.pk == platform_id:
+                wallets[None] = wallet
+            continue
+        wallets[wallet.user_id] = wallet
+    return wallets
+
+
+def apply_credits(wallets: dict, credits: dict) -> list:
+    """
+    Cộng dồn credits ({wallet_key: Decimal}) vào các ví đã lock và ghi 1 lần bằng bulk_update.
+    Trả về danh sách ví đã thay đổi.
+    """
+    now = timezone.now()
+    touched = []
+    for key, delta in credits.items():
+        wallet = wallets[key]
+        wallet.available_balance = (wallet.available_balance + delta).quantize(CENT)
+        wallet.updated_at = now
+        touched.append(wallet)
+    if touched:
+        Wallet.objects.bulk_update(touched, ["available_balance", "updated_at"])
+    return touched
+
+
+def _release_chunk(payment_ids, result: BatchResult):
+    with transaction.atomic():
+        payments = list(
+            Payment.objects.select_for_update()
+            .filter(pk__in=payment_ids, status=Payment.Status.HELD)
+            .order_by("id")
+            .only("id", "task_id", "tasker_id", "amount", "currency", "platform_fee_amount", "status")
+        )
+
+        releasable = []
+        for payment in payments:
+            if not payment.tasker_id:
+                result.skipped.append((payment.id, "Cannot release without assigned tasker"))
+                continue
+            net = (payment.amount - payment.platform_fee_amount).quantize(CENT)
+            if net < Decimal("0.00"):
+                result.skipped.append((payment.id, "Net to tasker negative"))
+                continue
+            releasable.append((payment, net))
+
+        if not releasable:
+            return
+
+        has_fee = any(p.platform_fee_amount > Decimal("0.00") for p, _ in releasable)
+        wallets = lock_wallets([p.tasker_id for p, _ in releasable], include_platform=has_fee)
+
+        credits = {}
+        txns = []
+        for payment, net in releasable:
+            fee = payment.platform_fee_amount
+            credits[payment.tasker_id] = credits.get(payment.tasker_id, Decimal("0.00")) + net
+            txns.append(WalletTransaction(
+                wallet=wallets[payment.tasker_id],
+                type=WalletTransaction.Type.ESCROW_RELEASE,
+                amount=net,
+                ref_task_id=payment.task_id,
+                ref_payment_id=payment.id,
+                memo=f"Release from task #{payment.task_id}",
+            ))
+            if fee > Decimal("0.00"):
+                credits[None] = credits.get(None, Decimal("0.00")) + fee
+                txns.append(WalletTransaction(
+                    wallet=wallets[None],
+                    type=WalletTransaction.Type.PLATFORM_FEE,
+                    amount=fee,
+                    ref_task_id=payment.task_id,
+                    ref_payment_id=payment.id,
+                    memo=f"Platform fee for task #{payment.task_id}",
+                ))
+
+        touched = apply_credits(wallets, credits)
+        WalletTransaction.objects.bulk_create(txns, batch_size=DEFAULT_CHUNK_SIZE)
+        now = timezone.now()
+        Payment.objects.filter(pk__in=[p.id for p, _ in releasable]).update(
+            status=Payment.Status.RELEASED, updated_at=now
+        )
+        record_transitions(
+            (now, p.currency, Payment.Status.RELEASED, p.amount, p.platform_fee_amount) for p, _ in releasable
+        )
+        enqueue_many(TOPIC_NOTIFICATION, [p.release_notification_payload() for p, _ in releasable])
+
+        result.processed += len(releasable)
+        result.transactions_created += len(txns)
+        result.wallets_touched += len(touched)
+
+
+REFUND_LOCK_FIELDS = ("id", "task_id", "client_id", "amount", "currency", "platform_fee_amount", "status")
+
+
+def apply_refunds(payments, result: BatchResult):
+    """
+    Hoàn tiền cho các payment HELD đã được lock (select_for_update), sắp theo id:
+    cộng amount vào ví client, bulk_create bút toán REFUND, chuyển REFUNDED,
+    ghi rollup và outbox notification. Phải được gọi bên trong transaction.atomic().
+    """
+    if not payments:
+        return
+
+    wallets = lock_wallets([p.client_id for p in payments])
+    credits = {}
+    txns = []
+    for payment in payments:
+        credits[payment.client_id] = credits.get(payment.client_id, Decimal("0.00")) + payment.amount
+        txns.append(WalletTransaction(
+            wallet=wallets[payment.client_id],
+            type=WalletTransaction.Type.REFUND,
+            amount=payment.amount,
+            ref_task_id=payment.task_id,
+            ref_payment_id=payment.id,
+            memo=f"Refund for task #{payment.task_id}",
+        ))
+
+    touched = apply_credits(wallets, credits)
+    WalletTransaction.objects.bulk_create(txns, batch_size=DEFAULT_CHUNK_SIZE)
+    now = timezone.now()
+    Payment.objects.filter(pk__in=[p.id for p in payments]).update(
+        status=Payment.Status.REFUNDED, updated_at=now
+    )
+    record_transitions(
+        (now, p.currency, Payment.Status.REFUNDED, p.amount, p.platform_fee_amount) for p in payments
+    )
+    enqueue_many(TOPIC_NOTIFICATION, [p.refund_notification_payload() for p in payments])
+
+    result.processed += len(payments)
+    result.transactions_created += len(txns)
+    result.wallets_touched += len(touched)
+
+
+def _refund_chunk(payment_ids, result: BatchResult):
+    with transaction.atomic():
+        payments = list(
+            Payment.objects.select_for_update()
+            .filter(pk__in=payment_ids, status=Payment.Status.HELD)
+            .order_by("id")
+            .only(*REFUND_LOCK_FIELDS)
+        )
+        apply_refunds(payments, result)
+
+
+def held_payment_ids(payment_ids=None, task_statuses=None, limit=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                     category_ids=None):
+    """
+    Duyệt id các payment HELD theo keyset (id tăng dần), trả về từng chunk id.
+    Không giữ toàn bộ danh sách trong bộ nhớ.
+    """
+    qs = Payment.objects.filter(status=Payment.Status.HELD)
+    if payment_ids is not None:
+        qs = qs.filter(pk__in=payment_ids)
+    if task_statuses:
+        qs = qs.filter(task__status__in=task_statuses)
+    if category_ids:
+        qs = qs.filter(task__category_id__in=category_ids)
+
+    last_id = 0
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = chunk_size if remaining is None else min(chunk_size, remaining)
+        ids = list(qs.filter(pk__gt=last_id).order_by("id").values_list("id", flat=True)[:size])
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+        if remaining is not None:
+            remaining -= len(ids)
+
+
+def release_held_payments(payment_ids=None, task_statuses=None, limit=None,
+                          chunk_size=DEFAULT_CHUNK_SIZE) -> BatchResult:
+    """
+    Release hàng loạt payment HELD -> RELEASED.
+    - payment_ids: giới hạn theo danh sách id (None = không giới hạn).
+    - task_statuses: chỉ release payment có task ở các trạng thái này.
+    - limit: tối đa số payment được xét trong lượt chạy.
+    """
+    result = BatchResult()
+    started = time.perf_counter()
+    for ids in held_payment_ids(payment_ids, task_statuses, limit, chunk_size):
+        _release_chunk(ids, result)
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def refund_held_payments(payment_ids=None, task_statuses=None, category_ids=None, limit=None,
+                         chunk_size=DEFAULT_CHUNK_SIZE) -> BatchResult:
+    """
+    Refund hàng loạt payment HELD -> REFUNDED (vd huỷ hàng loạt do sự cố 1 category).
+    Bộ lọc giống release_held_payments, thêm category_ids.
+    """
+    result = BatchResult()
+    started = time.perf_counter()
+    for ids in held_payment_ids(payment_ids, task_statuses, limit, chunk_size, category_ids=category_ids):
+        _refund_chunk(ids, result)
+    result.elapsed = time.perf_counter() - started
+    return result
@@ -0,0 +1,156 @@
+# payment/exports.py
+"""
+Export dữ liệu ví/payment dạng stream (CSV hoặc JSONL).
+
+Không đi qua DRF serializer và không dựng list lớn trong bộ nhớ:
+  - Dữ liệu đọc theo keyset chunk (values_list, không khởi tạo model instance).
+    Lưu ý: với MySQL, QuerySet.iterator() vẫn buffer toàn bộ result set ở phía
+    client driver, nên ở đây dùng keyset (WHERE (created_at, id) > (...) LIMIT n)
+    để mỗi chunk là 1 index range scan ngắn và bộ nhớ chỉ phụ thuộc chunk_size.
+  - Mỗi dòng được encode ngay và đẩy ra StreamingHttpResponse. Chạy dưới ASGI, Django
+    đọc iterator đồng bộ bằng sync_to_async(list) (dựng cả file trong bộ nhớ trước byte
+    đầu tiên), nên khi request là ASGI thì bọc thành async iterator: mỗi lần lấy 1 chunk
+    dòng (kèm query keyset) trong sync_to_async rồi gửi ngay.
+  - Cột amount quy đổi (amount_<reporting currency>) được tính khi stream,
+    theo tỷ giá hiệu lực tại created_at của dòng, dùng bảng tỷ giá nạp 1 lần (payment/fx.py).
+"""
+from __future__ import annotations
+
+import csv
+import json
+from datetime import datetime, time
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import fx
+from .models import Payment, WalletTransaction
+from .reconcile import keyset_chunks
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson; charset=utf-8",
+}
+
+STATEMENT_FIELDS = [
+    "id", "created_at", "type", "amount", "ref_payment__currency", "ref_task_id", "ref_payment_id", "memo",
+]
+STATEMENT_HEADER = [
+    "id", "created_at", "type", "amount", "currency", "ref_task_id", "ref_payment_id", "memo",
+]
+
+PAYMENT_EXPORT_FIELDS = [
+    "id", "task_id", "task__title", "client_id", "tasker_id", "amount", "currency", "status",
+    "platform_fee_percent", "platform_fee_amount", "created_at", "updated_at",
+]
+PAYMENT_EXPORT_HEADER = [f.replace("__", "_") for f in PAYMENT_EXPORT_FIELDS]
+
+
+def with_converted_column(header, rows, amount_field, currency_field, date_field="created_at", target=None):
+    """Nối cột amount_<target> (tỷ giá tại ngày date_field) vào header và từng dòng. Trả về (header, rows)."""
+    target = target or fx.reporting_currency()
+    rows = fx.convert_rows(
+        rows, header.index(amount_field), header.index(currency_field), target, header.index(date_field)
+    )
+    return header + [f"amount_{target.lower()}"], rows
+
+
+class _Echo:
+    """Pseudo-buffer cho csv.writer: trả về luôn dòng vừa ghi thay vì lưu lại."""
+
+    def write(self, value):
+        return value
+
+
+def parse_export_datetime(value, end_of_day=False):
+    """
+    Nhận '2025-09-01' hoặc ISO datetime. Trả về datetime aware, None nếu rỗng.
+    Raise ValueError nếu sai định dạng.
+    """
+    if not value:
+        return None
+    dt = parse_datetime(value)
+    if dt is None:
+        d = parse_date(value)
+        if d is None:
+            raise ValueError(f"Invalid date: {value}")
+        dt = datetime.combine(d, time.max if end_of_day else time.min)
+    if timezone.is_naive(dt):
+        try:
+            dt = timezone.make_aware(dt)
+        except OverflowError:
+            raise ValueError(f"Invalid date: {value}")
+    return dt
+
+
+def iter_wallet_statement(wallet_id, start=None, end=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Duyệt giao dịch của 1 ví theo (created_at, id) tăng dần.
+    Mỗi chunk dùng index (wallet, created_at) -> 1 index range scan.
+    """
+    qs = WalletTransaction.objects.filter(wallet_id=wallet_id)
+    if start:
+        qs = qs.filter(created_at__gte=start)
+    if end:
+        qs = qs.filter(created_at__lte=end)
+
+    cursor = None
+    while True:
+        page = qs
+        if cursor:
+            created_at, pk = cursor
+            page = page.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+        rows = list(page.order_by("created_at", "id").values_list(*STATEMENT_FIELDS)[:chunk_size])
+        if not rows:
+            return
+        yield from rows
+        cursor = (rows[-1][1], rows[-1][0])
+
+
+def iter_payments(filters=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Duyệt Payment theo keyset trên pk (dùng cho admin export)."""
+    qs = Payment.objects.filter(**(filters or {}))
+    for rows in keyset_chunks(qs, PAYMENT_EXPORT_FIELDS[1:], chunk_size):
+        yield from rows
+
+
+def _csv_stream(fields, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _jsonl_stream(fields, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+
+async def _async_stream(stream, chunk_size=EXPORT_CHUNK_SIZE):
+    """Async iterator cho ASGI: mỗi chunk_size dòng chạy (và query DB) trong 1 lần sync_to_async."""
+    next_chunk = sync_to_async(lambda: "".join(islice(stream, chunk_size)))
+    while True:
+        chunk = await next_chunk()
+        if not chunk:
+            return
+        yield chunk
+
+
+def export_response(fields, rows, output, filename, request=None) -> StreamingHttpResponse:
+    """
+    Bọc iterator rows thành StreamingHttpResponse theo định dạng output (csv|jsonl).
+    request: để chọn iterator async (ASGI) hay sync (WSGI).
+    """
+    stream = _csv_stream(fields, rows) if output == "csv" else _jsonl_stream(fields, rows)
+    if isinstance(getattr(request, "_request", request), ASGIRequest):
+        stream = _async_stream(stream)
+    response = StreamingHttpResponse(stream, content_type=EXPORT_FORMATS[output])
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{output}"'
+    return response
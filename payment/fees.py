@@ -0,0 +1,146 @@
+# payment/fees.py
+"""
+Fee policy engine.
+
+FeeRule trong DB được compile thành bảng tra cứu trong bộ nhớ:
+    {(category_id | None, tasker_level | "", promotion_code | ""): [luật đã sắp xếp]}
+Đánh giá 1 payment = tối đa 8 lần tra dict (kết hợp cụ thể/wildcard của 3 chiều)
+rồi lọc theo khoảng amount/thời gian -> vài micro giây, không query DB.
+
+Cache:
+  - Bảng compile giữ ở mức process.
+  - Phiên bản luật đọc từ DB (rules_version(): số luật + id lớn nhất + updated_at mới nhất,
+    1 query aggregate), nên mọi process / worker đều thấy luật đổi; mỗi process kiểm tra
+    version tối đa 1 lần/FEE_RULES_CHECK_INTERVAL giây. Signal trên FeeRule bỏ bảng compile
+    của process vừa sửa luật ngay lập tức.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import FeeRule
+
+CENT = Decimal("0.01")
+FEE_RULES_CHECK_INTERVAL = 1.0
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    rule_id: int
+    priority: int
+    specificity: int
+    percent: Decimal
+    min_amount: Decimal | None
+    max_amount: Decimal | None
+    valid_from: object
+    valid_until: object
+
+    def matches(self, amount, at) -> bool:
+        if self.min_amount is not None and (amount is None or amount < self.min_amount):
+            return False
+        if self.max_amount is not None and (amount is None or amount > self.max_amount):
+            return False
+        if self.valid_from is not None and at < self.valid_from:
+            return False
+        if self.valid_until is not None and at >= self.valid_until:
+            return False
+        return True
+
+
+_lock = threading.Lock()
+_state = {"table": None, "version": None, "checked_at": 0.0}
+
+
+def default_percent() -> Decimal:
+    return Decimal(str(getattr(settings, "PLATFORM_FEE_PERCENT_DEFAULT", "10.00")))
+
+
+def invalidate():
+    """Gọi khi FeeRule thay đổi: bỏ bảng compile của process hiện tại (process khác thấy qua rules_version)."""
+    with _lock:
+        _state["table"] = None
+
+
+def rules_version() -> tuple:
+    """Phiên bản luật trong DB: đổi khi có luật được tạo / sửa / xoá."""
+    row = FeeRule.objects.aggregate(count=Count("id"), last_id=Max("id"), last_updated=Max("updated_at"))
+    return row["count"], row["last_id"], row["last_updated"]
+
+
+def compile_rules() -> dict:
+    table = {}
+    for rule in FeeRule.objects.filter(is_active=True).order_by("id"):
+        key = (rule.category_id, rule.tasker_level or "", rule.promotion_code or "")
+        specificity = sum(1 for part in key if part not in (None, ""))
+        table.setdefault(key, []).append(CompiledRule(
+            rule_id=rule.id,
+            priority=rule.priority,
+            specificity=specificity,
+            percent=rule.percent,
+            min_amount=rule.min_amount,
+            max_amount=rule.max_amount,
+            valid_from=rule.valid_from,
+            valid_until=rule.valid_until,
+        ))
+    for rules in table.values():
+        rules.sort(key=lambda r: (r.priority, r.specificity, r.rule_id), reverse=True)
+    return table
+
+
+def decision_table() -> dict:
+    now = time.monotonic()
+    if _state["table"] is not None and now - _state["checked_at"] < FEE_RULES_CHECK_INTERVAL:
+        return _state["table"]
+    with _lock:
+        version = rules_version()
+        if _state["table"] is None or version != _state["version"]:
+            _state["table"] = compile_rules()
+            _state["version"] = version
+        _state["checked_at"] = now
+        return _state["table"]
+
+
+def _lookup(table, category_id, tasker_level, promotion, amount, at):
+    best = None
+    for cat in (category_id, None) if category_id is not None else (None,):
+        for level in (tasker_level, "") if tasker_level else ("",):
+            for promo in (promotion, "") if promotion else ("",):
+                for rule in table.get((cat, level, promo), ()):
+                    if not rule.matches(amount, at):
+                        continue
+                    if best is None or (rule.priority, rule.specificity) > (best.priority, best.specificity):
+                        best = rule
+                    break  # danh sách đã sắp theo priority, luật khớp đầu tiên là tốt nhất trong key này
+    return best
+
+
+def resolve_fee_percent(category_id=None, tasker_level=None, promotion=None, amount=None, at=None) -> Decimal:
+    """Phần trăm phí cho 1 payment; không có luật nào khớp -> PLATFORM_FEE_PERCENT_DEFAULT."""
+    rule = _lookup(decision_table(), category_id, tasker_level, promotion, amount, at or timezone.now())
+    return rule.percent if rule else default_percent()
+
+
+def evaluate_many(rows, at=None) -> list:
+    """
+    Đánh giá hàng loạt (rollup, mô phỏng đổi giá).
+    rows: iterable (category_id, tasker_level, promotion, amount). Trả về list percent cùng thứ tự.
+    """
+    table = decision_table()
+    at = at or timezone.now()
+    fallback = default_percent()
+    results = []
+    for category_id, tasker_level, promotion, amount in rows:
+        rule = _lookup(table, category_id, tasker_level, promotion, amount, at)
+        results.append(rule.percent if rule else fallback)
+    return results
+
+
+def compute_fee(amount: Decimal, percent: Decimal) -> Decimal:
+    return (amount * (percent / Decimal("100.00"))).quantize(CENT)
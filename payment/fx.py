@@ -0,0 +1,123 @@
+# payment/fx.py
+"""
+Quy đổi tiền tệ với tỷ giá cache trong process.
+
+- Toàn bộ lịch sử tỷ giá (bảng nhỏ: số cặp x số ngày) được nạp 1 lần (1 query) và giữ
+  trong bộ nhớ FX_CACHE_TTL giây; load_fx_rates gọi invalidate() sau khi ghi.
+- Dữ liệu lịch sử quy đổi theo tỷ giá hiệu lực tại ngày của dòng (bản ghi as_of gần nhất
+  <= ngày đó; trước bản ghi đầu tiên thì dùng bản ghi sớm nhất), nên sao kê cũ không đổi
+  khi nạp tỷ giá mới. Không truyền ngày -> tỷ giá mới nhất.
+- convert_totals()/convert_rows() quy đổi cả tập dữ liệu trong 1 lượt với bảng
+  tỷ giá đã nạp, không query tỷ giá theo từng dòng.
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import FxRate, Payment
+
+CENT = Decimal("0.01")
+DEFAULT_CURRENCY = Payment._meta.get_field("currency").default
+
+_lock = threading.Lock()
+_cache = {"expires": 0.0, "rates": {}}
+
+
+class FxRateMissing(ValueError):
+    pass
+
+
+def reporting_currency() -> str:
+    return getattr(settings, "REPORTING_CURRENCY", DEFAULT_CURRENCY)
+
+
+def invalidate():
+    with _lock:
+        _cache["expires"] = 0.0
+
+
+def rate_table() -> dict:
+    """
+    {(base, quote): ([as_of tăng dần], [rate])} cho mọi cặp; chiều nghịch được suy ra
+    (1 / rate) nếu không có bản ghi riêng.
+    """
+    now = time.monotonic()
+    if _cache["expires"] > now:
+        return _cache["rates"]
+    with _lock:
+        if _cache["expires"] > now:
+            return _cache["rates"]
+        rates = {}
+        rows = FxRate.objects.order_by("base", "quote", "as_of").values_list("base", "quote", "as_of", "rate")
+        for base, quote, as_of, rate in rows:
+            dates, values = rates.setdefault((base, quote), ([], []))
+            dates.append(as_of)
+            values.append(rate)
+        for (base, quote), (dates, values) in list(rates.items()):
+            if (quote, base) not in rates:
+                pairs = [(d, Decimal(1) / rate) for d, rate in zip(dates, values) if rate]
+                if pairs:
+                    rates[(quote, base)] = ([d for d, _ in pairs], [rate for _, rate in pairs])
+        _cache["rates"] = rates
+        _cache["expires"] = now + getattr(settings, "FX_CACHE_TTL", 300)
+        return rates
+
+
+def _as_date(on):
+    if isinstance(on, datetime):
+        return timezone.localdate(on) if timezone.is_aware(on) else on.date()
+    return on
+
+
+def get_rate(source: str, target: str, table: dict | None = None, on: date | datetime | None = None) -> Decimal:
+    """Tỷ giá source->target hiệu lực tại ngày on (None = mới nhất)."""
+    source = source or DEFAULT_CURRENCY
+    if source == target:
+        return Decimal(1)
+    table = rate_table() if table is None else table
+    try:
+        dates, values = table[(source, target)]
+    except KeyError:
+        raise FxRateMissing(f"Missing FX rate {source}->{target}")
+    if on is None:
+        return values[-1]
+    return values[max(bisect.bisect_right(dates, _as_date(on)) - 1, 0)]
+
+
+def convert(amount: Decimal, source: str, target: str, table: dict | None = None, on=None) -> Decimal:
+    return (amount * get_rate(source, target, table, on)).quantize(CENT)
+
+
+def convert_totals(totals: dict, target: str) -> Decimal:
+    """
+    Tổng các khoản quy về target (1 lần đọc bảng tỷ giá).
+    totals: {currency: amount} (tỷ giá mới nhất) hoặc {(currency, ngày): amount}.
+    """
+    table = rate_table()
+    result = Decimal("0.00")
+    for key, amount in totals.items():
+        currency, on = key if isinstance(key, tuple) else (key, None)
+        result += convert(amount, currency, target, table, on)
+    return result
+
+
+def convert_rows(rows, amount_index: int, currency_index: int, target: str, date_index: int | None = None):
+    """
+    Duyệt rows (tuple) và nối thêm cột amount đã quy đổi sang target, theo tỷ giá tại
+    ngày ở cột date_index (None = mới nhất). Tỷ giá lấy từ bảng đã nạp sẵn; thiếu tỷ giá -> None.
+    """
+    table = rate_table()
+    for row in rows:
+        try:
+            on = row[date_index] if date_index is not None else None
+            converted = convert(row[amount_index], row[currency_index], target, table, on)
+        except FxRateMissing:
+            converted = None
+        yield (*row, converted)
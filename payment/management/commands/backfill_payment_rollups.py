@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from payment.exports import parse_export_datetime
+from payment.rollups import backfill
+
+
+class Command(BaseCommand):
+    help = 'Rebuild PaymentRollup (hourly/daily GMV, fees and status counts) from the Payment table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since', default=None,
+            help='Only rebuild buckets from this date (YYYY-MM-DD or ISO datetime); default: full rebuild'
+        )
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        try:
+            since = parse_export_datetime(options['since'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size must be > 0')
+
+        scanned = backfill(since=since, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt payment rollups from {scanned} payments'))
@@ -0,0 +1,81 @@
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from payment.views import PaymentIntentCreateView
+from task.models import Category, Task
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Microbenchmark: PaymentIntent creations per second through PaymentIntentCreateView (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=500)
+
+    def handle(self, *args, **options):
+        count = options['count']
+        if count <= 0:
+            raise CommandError('--count must be > 0')
+
+        factory = APIRequestFactory()
+        view = PaymentIntentCreateView.as_view()
+        stats = {}
+        try:
+            with transaction.atomic():
+                suffix = uuid.uuid4().hex[:8]
+                client = get_user_model().objects.create_user(
+                    username=f'bench_{suffix}', email=f'bench_{suffix}@example.com', password=None
+                )
+                category = Category.objects.create(name=f'bench-{suffix}')
+                tasks = Task.objects.bulk_create([
+                    Task(client=client, category=category, title=f'bench {i}', description='bench',
+                         price=Decimal('100000.00'))
+                    for i in range(count)
+                ])
+
+                def create(task_id):
+                    request = factory.post('/api/payment/intent/create/',
+                                           {'task': task_id, 'amount': '100000.00'}, format='json')
+                    force_authenticate(request, user=client)
+                    return view(request)
+
+                # Đo số query của 1 lần tạo (bỏ qua khỏi phần tính thời gian)
+                with CaptureQueriesContext(connection) as ctx:
+                    create(tasks[0].id)
+                stats['queries'] = sum(
+                    1 for q in ctx.captured_queries
+                    if not q['sql'].upper().startswith(('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT'))
+                )
+
+                started = time.perf_counter()
+                for task in tasks[1:]:
+                    response = create(task.id)
+                    if response.status_code != 201:
+                        raise CommandError(f'Unexpected status {response.status_code}: {response.data}')
+                stats['elapsed'] = time.perf_counter() - started
+
+                conflict = create(tasks[0].id)
+                stats['conflict_status'] = conflict.status_code
+                raise _Rollback()
+        except _Rollback:
+            pass
+        finally:
+            reset_queries()
+
+        created = count - 1
+        rate = created / stats['elapsed'] if created and stats['elapsed'] else 0.0
+        self.stdout.write(f"Queries per creation (excluding savepoints): {stats['queries']}")
+        self.stdout.write(f"Duplicate creation status: {stats['conflict_status']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {created} intents in {stats['elapsed']:.3f}s -> {rate:.1f} intents/s"
+        ))
@@ -0,0 +1,97 @@
+import json
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory
+from django.urls import reverse
+
+from payment.mock_provider import MockProvider
+from payment.models import PaymentIntent, ProviderWebhookLog
+from payment.views_webhook import LeanPaymentWebhookView, PaymentWebhookView, orjson
+from task.models import Category, Task
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Microbenchmark: verified webhooks per second for a single worker, '
+        'legacy DRF endpoint vs lean endpoint (everything rolled back)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=500, help='Webhooks per endpoint')
+        parser.add_argument('--event', default='CANCELED', choices=['AUTHORIZED', 'CANCELED', 'EXPIRED'])
+        parser.add_argument('--padding', type=int, default=2048,
+                            help='Bytes of extra provider metadata per payload (real payloads are not tiny)')
+
+    def handle(self, *args, **options):
+        count = options['count']
+        if count <= 0 or options['padding'] < 0:
+            raise CommandError('--count must be > 0 and --padding >= 0')
+
+        provider = MockProvider()
+        factory = RequestFactory()
+        endpoints = [
+            ('legacy', reverse('payment-webhook'), PaymentWebhookView.as_view()),
+            ('lean', reverse('payment-webhook-lean'), LeanPaymentWebhookView.as_view()),
+        ]
+        stats = {}
+        try:
+            with transaction.atomic():
+                suffix = uuid.uuid4().hex[:8]
+                client = get_user_model().objects.create_user(
+                    username=f'bench_{suffix}', email=f'bench_{suffix}@example.com', password=None
+                )
+                category = Category.objects.create(name=f'bench-{suffix}')
+                for name, url, view in endpoints:
+                    tasks = Task.objects.bulk_create([
+                        Task(client=client, category=category, title=f'bench {i}', description='bench',
+                             price=Decimal('100000.00'))
+                        for i in range(count)
+                    ])
+                    intents = PaymentIntent.objects.bulk_create([
+                        PaymentIntent(task=t, client=client, amount=t.price, provider='MOCK',
+                                      provider_ref=f'mock_{uuid.uuid4().hex}')
+                        for t in tasks
+                    ])
+                    requests = []
+                    for intent in intents:
+                        body = provider.build_event(intent.provider_ref, options['event'],
+                                                    metadata={'blob': 'x' * options['padding']})
+                        requests.append(factory.post(
+                            url, data=body, content_type='application/json',
+                            HTTP_X_WEBHOOK_SIGNATURE=provider.sign(body),
+                        ))
+
+                    first_log = ProviderWebhookLog.objects.order_by('-id').values_list('id', flat=True).first() or 0
+                    started = time.perf_counter()
+                    for request in requests:
+                        response = view(request)
+                        if response.status_code != 200:
+                            raise CommandError(f'{name}: unexpected status {response.status_code}')
+                    elapsed = time.perf_counter() - started
+
+                    stored = 0
+                    for payload, raw in ProviderWebhookLog.objects.filter(id__gt=first_log).values_list(
+                            'payload', 'raw_payload'):
+                        stored += len(raw) if raw else len(json.dumps(payload))
+                    stats[name] = (elapsed, stored / count)
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        self.stdout.write(f"JSON parser: {'orjson' if orjson is not None else 'json (stdlib)'}")
+        for name, (elapsed, avg_stored) in stats.items():
+            self.stdout.write(
+                f'{name:>6}: {count / elapsed:8.1f} verified webhooks/s per worker '
+                f'({elapsed * 1000 / count:.2f} ms each), ~{avg_stored:.0f} bytes stored per log'
+            )
+        legacy, lean = stats['legacy'][0], stats['lean'][0]
+        self.stdout.write(self.style.SUCCESS(f'Lean endpoint speedup: {legacy / lean:.2f}x'))
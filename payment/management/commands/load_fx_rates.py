@@ -0,0 +1,56 @@
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from payment import fx
+from payment.models import CURRENCY_CHOICES, FxRate
+
+
+class Command(BaseCommand):
+    help = 'Load FX rates from a local CSV or JSON file (columns: base, quote, rate, as_of[, source])'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with a header row, or JSON list of objects')
+        parser.add_argument('--source', default='file', help='Source label stored with rates lacking one')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            with open(path, encoding='utf-8') as f:
+                if path.endswith('.json'):
+                    records = json.load(f)
+                else:
+                    records = list(csv.DictReader(f))
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Cannot read {path}: {e}')
+
+        currencies = {code for code, _ in CURRENCY_CHOICES}
+        rates = []
+        for line, record in enumerate(records, start=1):
+            base = (record.get('base') or '').upper()
+            quote = (record.get('quote') or '').upper()
+            as_of = parse_date(str(record.get('as_of') or ''))
+            try:
+                rate = Decimal(str(record.get('rate')))
+            except (InvalidOperation, TypeError):
+                rate = None
+            if base not in currencies or quote not in currencies or base == quote:
+                raise CommandError(f'Record {line}: invalid currency pair {base}/{quote}')
+            if as_of is None or rate is None or rate <= 0:
+                raise CommandError(f'Record {line}: invalid rate or as_of')
+            rates.append(FxRate(
+                base=base, quote=quote, rate=rate, as_of=as_of,
+                source=record.get('source') or options['source'],
+            ))
+
+        FxRate.objects.bulk_create(
+            rates, batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['base', 'quote', 'as_of'],
+            update_fields=['rate', 'source'],
+        )
+        fx.invalidate()
+        self.stdout.write(self.style.SUCCESS(f'Loaded {len(rates)} FX rates from {path}'))
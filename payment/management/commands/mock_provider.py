@@ -0,0 +1,134 @@
+import random
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from payment.mock_provider import LatencyHistogram, MockProvider
+from payment.models import PaymentIntent
+
+
+class Command(BaseCommand):
+    help = (
+        'Local MOCK payment provider: replay signed webhooks for pending MOCK intents '
+        'at a fixed rate, with injectable failures, and print a latency histogram'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url', default=None,
+            help='Webhook URL to POST to (default: call the webhook view in-process)'
+        )
+        parser.add_argument('--event', default='AUTHORIZED', choices=['AUTHORIZED', 'CANCELED', 'EXPIRED'])
+        parser.add_argument('--count', type=int, default=100, help='Number of intents to send events for')
+        parser.add_argument('--rate', type=float, default=50.0, help='Target events per second (0 = unthrottled)')
+        parser.add_argument('--concurrency', type=int, default=1, help='Parallel senders (HTTP mode)')
+        parser.add_argument(
+            '--bad-signature-rate', type=float, default=0.0,
+            help='Fraction of events sent with a corrupted signature'
+        )
+        parser.add_argument(
+            '--unknown-ref-rate', type=float, default=0.0,
+            help='Fraction of events sent for a provider_ref that does not exist'
+        )
+        parser.add_argument(
+            '--duplicate-rate', type=float, default=0.0,
+            help='Fraction of events delivered twice (provider retry)'
+        )
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        if options['url'] is None and options['concurrency'] != 1:
+            raise CommandError('--concurrency > 1 requires --url (in-process mode is single threaded)')
+        if options['count'] <= 0 or options['concurrency'] <= 0 or options['rate'] < 0:
+            raise CommandError('--count/--concurrency must be > 0 and --rate >= 0')
+
+        rng = random.Random(options['seed'])
+        provider = MockProvider()
+        refs = list(
+            PaymentIntent.objects.filter(
+                provider='MOCK',
+                status__in=[PaymentIntent.Status.CREATED, PaymentIntent.Status.REQUIRES_ACTION],
+                provider_ref__isnull=False,
+            ).order_by('id').values_list('provider_ref', flat=True)[:options['count']]
+        )
+        if not refs:
+            raise CommandError('No pending MOCK intents with provider_ref; create intents first')
+
+        jobs = []
+        for ref in refs:
+            if rng.random() < options['unknown_ref_rate']:
+                ref = f'mock_unknown_{rng.getrandbits(48):x}'
+            body = provider.build_event(ref, options['event'])
+            signature = provider.sign(body)
+            if rng.random() < options['bad_signature_rate']:
+                signature = signature[::-1]
+            jobs.append((body, signature))
+            if rng.random() < options['duplicate_rate']:
+                jobs.append((body, signature))
+
+        send = self._http_sender(options['url']) if options['url'] else self._inprocess_sender()
+        histogram = LatencyHistogram()
+        statuses = Counter()
+        interval = 1.0 / options['rate'] if options['rate'] else 0.0
+        started = time.perf_counter()
+
+        def run(index_job):
+            index, (body, signature) = index_job
+            if interval:
+                delay = started + index * interval - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            t0 = time.perf_counter()
+            code = send(body, signature)
+            return code, time.perf_counter() - t0
+
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            for code, elapsed in pool.map(run, enumerate(jobs)):
+                statuses[code] += 1
+                histogram.record(elapsed)
+
+        wall = time.perf_counter() - started
+        self.stdout.write(histogram.render())
+        self.stdout.write('Status codes: ' + ', '.join(f'{k}={v}' for k, v in sorted(statuses.items(), key=str)))
+        self.stdout.write(self.style.SUCCESS(
+            f'Sent {len(jobs)} webhooks in {wall:.2f}s -> {len(jobs) / wall:.1f} events/s'
+        ))
+
+    @staticmethod
+    def _http_sender(url):
+        def send(body, signature):
+            request = urllib.request.Request(
+                url, data=body, method='POST',
+                headers={'Content-Type': 'application/json', 'X-Webhook-Signature': signature},
+            )
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    return response.status
+            except urllib.error.HTTPError as e:
+                return e.code
+            except urllib.error.URLError as e:
+                return f'error:{e.reason}'
+        return send
+
+    @staticmethod
+    def _inprocess_sender():
+        client = Client()
+        url = reverse('payment-webhook')
+
+        def send(body, signature):
+            try:
+                response = client.post(
+                    url, data=body, content_type='application/json',
+                    HTTP_X_WEBHOOK_SIGNATURE=signature,
+                )
+                return response.status_code
+            finally:
+                connection.close_if_unusable_or_obsolete()
+        return send
@@ -0,0 +1,50 @@
+import json
+import sys
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from payment.reconcile import CHECKS, DEFAULT_CHUNK_SIZE, run_checks
+
+
+class Command(BaseCommand):
+    help = 'Reconcile payment intents, payments, wallets and webhook logs; write a JSONL discrepancy report'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', nargs='+', choices=list(CHECKS), default=None,
+            help='Checks to run (default: all)'
+        )
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--output', default='-', help='Report file path, "-" for stdout')
+        parser.add_argument(
+            '--fail-on-discrepancy', action='store_true',
+            help='Exit with an error if any discrepancy is found'
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size must be > 0')
+
+        output = options['output']
+        stream = sys.stdout if output == '-' else open(output, 'w', encoding='utf-8')
+        counts = Counter()
+        try:
+            for item in run_checks(options['check'], options['chunk_size']):
+                counts[item['check']] += 1
+                stream.write(json.dumps(item, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n')
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+
+        total = sum(counts.values())
+        for check, count in sorted(counts.items()):
+            self.stderr.write(f'{check}: {count}')
+        if total:
+            message = f'Found {total} discrepancies'
+            if options['fail_on_discrepancy']:
+                raise CommandError(message)
+            self.stderr.write(self.style.WARNING(message))
+        else:
+            self.stderr.write(self.style.SUCCESS('No discrepancies found'))
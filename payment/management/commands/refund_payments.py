@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from payment.batch import refund_held_payments, DEFAULT_CHUNK_SIZE
+from task.models import Task
+
+
+class Command(BaseCommand):
+    help = 'Refund HELD payments to client wallets in batches (e.g. mass cancellation) and report throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ids', nargs='+', type=int, help='Only refund these payment ids')
+        parser.add_argument('--category', nargs='+', type=int, help='Only refund payments of tasks in these categories')
+        parser.add_argument('--task-status', nargs='+', default=None,
+                            help='Only refund payments whose task is in these statuses')
+        parser.add_argument('--limit', type=int, default=None, help='Maximum number of payments to consider')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        task_statuses = options['task_status']
+        if not (options['ids'] or options['category'] or task_statuses):
+            raise CommandError('Give at least one of --ids, --category or --task-status')
+        if task_statuses:
+            invalid = [s for s in task_statuses if s not in Task.Status.values]
+            if invalid:
+                raise CommandError(f'Invalid task status: {", ".join(invalid)}')
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size must be > 0')
+
+        result = refund_held_payments(
+            payment_ids=options['ids'],
+            task_statuses=task_statuses,
+            category_ids=options['category'],
+            limit=options['limit'],
+            chunk_size=options['chunk_size'],
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Refunded {result.processed} payments '
+            f'({result.transactions_created} wallet transactions, {result.wallets_touched} wallets) '
+            f'in {result.elapsed:.2f}s -> {result.throughput:.1f} payments/s'
+        ))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from payment.batch import release_held_payments, DEFAULT_CHUNK_SIZE
+from task.models import Task
+
+
+class Command(BaseCommand):
+    help = 'Release HELD payments in batches and report throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ids', nargs='+', type=int, help='Only release these payment ids')
+        parser.add_argument(
+            '--task-status', nargs='+', default=None,
+            help='Only release payments whose task is in these statuses '
+                 '(default: completed client_confirmed when --ids is not given)'
+        )
+        parser.add_argument('--limit', type=int, default=None, help='Maximum number of payments to consider')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        task_statuses = options['task_status']
+        if task_statuses is None and not options['ids']:
+            task_statuses = [Task.Status.COMPLETED, Task.Status.CLIENT_CONFIRMED]
+        if task_statuses:
+            invalid = [s for s in task_statuses if s not in Task.Status.values]
+            if invalid:
+                raise CommandError(f'Invalid task status: {", ".join(invalid)}')
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size must be > 0')
+
+        result = release_held_payments(
+            payment_ids=options['ids'],
+            task_statuses=task_statuses,
+            limit=options['limit'],
+            chunk_size=options['chunk_size'],
+        )
+
+        for payment_id, reason in result.skipped:
+            self.stdout.write(self.style.WARNING(f'Skipped payment #{payment_id}: {reason}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Released {result.processed} payments '
+            f'({result.transactions_created} wallet transactions, {result.wallets_touched} wallets) '
+            f'in {result.elapsed:.2f}s -> {result.throughput:.1f} payments/s'
+        ))
@@ -0,0 +1,64 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from payment.fees import compute_fee, evaluate_many
+from payment.models import Payment
+from payment.reconcile import keyset_chunks
+from payment.rollups import ROLLUP_STATUSES
+from task.models import TaskerSkill
+
+
+class Command(BaseCommand):
+    help = (
+        'Reprice simulation: evaluate current FeeRules against existing payments in batch '
+        'and compare stored vs simulated platform fees per currency (read only)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--status', action='append', choices=list(ROLLUP_STATUSES),
+                            help='Payment status to include (repeatable, default: all rollup statuses)')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size must be > 0')
+
+        qs = Payment.objects.filter(status__in=options['status'] or list(ROLLUP_STATUSES))
+        fields = ('amount', 'currency', 'platform_fee_percent', 'tasker_id',
+                  'task__category_id', 'task__attributes')
+        totals = defaultdict(lambda: {'count': 0, 'changed': 0, 'current': Decimal('0'), 'simulated': Decimal('0')})
+
+        for rows in keyset_chunks(qs, fields, options['chunk_size']):
+            # 1 query level tasker cho cả chunk thay vì 1 query / payment
+            pairs = {(tasker_id, category_id) for _, _, _, _, tasker_id, category_id, _ in rows if tasker_id}
+            levels = {}
+            if pairs:
+                skills = TaskerSkill.objects.filter(
+                    user_id__in={p[0] for p in pairs}, category_id__in={p[1] for p in pairs}
+                ).values_list('user_id', 'category_id', 'experience_level')
+                levels = {(u, c): level for u, c, level in skills}
+
+            percents = evaluate_many(
+                (category_id, levels.get((tasker_id, category_id)), (attributes or {}).get('promotion_code'), amount)
+                for _, amount, _, _, tasker_id, category_id, attributes in rows
+            )
+            for (_, amount, currency, current_percent, *_), percent in zip(rows, percents):
+                bucket = totals[currency]
+                bucket['count'] += 1
+                bucket['current'] += compute_fee(amount, current_percent)
+                bucket['simulated'] += compute_fee(amount, percent)
+                if percent != current_percent:
+                    bucket['changed'] += 1
+
+        if not totals:
+            self.stdout.write('No payments to simulate.')
+            return
+        for currency, t in sorted(totals.items()):
+            delta = t['simulated'] - t['current']
+            self.stdout.write(
+                f"{currency}: payments={t['count']} repriced={t['changed']} "
+                f"current_fees={t['current']} simulated_fees={t['simulated']} delta={delta:+}"
+            )
+        self.stdout.write(self.style.SUCCESS('Simulation done (no rows were modified).'))
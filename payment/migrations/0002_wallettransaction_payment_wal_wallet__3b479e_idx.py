@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 03:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0001_initial'),
+        ('task', '0002_taskqr'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='wallettransaction',
+            index=models.Index(fields=['wallet', 'created_at'], name='payment_wal_wallet__3b479e_idx'),
+        ),
+    ]
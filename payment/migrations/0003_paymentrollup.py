@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-19 03:49
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0002_wallettransaction_payment_wal_wallet__3b479e_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentRollup',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('granularity', models.CharField(choices=[('hour', 'Hourly'), ('day', 'Daily')], max_length=8)),
+                ('bucket_start', models.DateTimeField()),
+                ('currency', models.CharField(choices=[('VND', 'Vietnamese Dong'), ('USD', 'US Dollar')], max_length=3)),
+                ('status', models.CharField(choices=[('NONE', 'None'), ('HELD', 'Held in Escrow'), ('RELEASING', 'Releasing'), ('RELEASED', 'Released'), ('REFUNDED', 'Refunded')], max_length=16)),
+                ('count', models.BigIntegerField(default=0)),
+                ('gross_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18)),
+                ('fee_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('granularity', 'bucket_start', 'currency', 'status'), name='uniq_payment_rollup_bucket')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-19 03:52
+
+import django.core.validators
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0003_paymentrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FxRate',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('base', models.CharField(choices=[('VND', 'Vietnamese Dong'), ('USD', 'US Dollar')], max_length=3)),
+                ('quote', models.CharField(choices=[('VND', 'Vietnamese Dong'), ('USD', 'US Dollar')], max_length=3)),
+                ('rate', models.DecimalField(decimal_places=10, max_digits=20, validators=[django.core.validators.MinValueValidator(Decimal('0'))])),
+                ('as_of', models.DateField()),
+                ('source', models.CharField(blank=True, max_length=32)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('base', 'quote', 'as_of'), name='uniq_fx_rate_pair_day')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 03:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0005_fee_rule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='providerwebhooklog',
+            name='raw_payload',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,93 @@
+# payment/mock_provider.py
+"""
+Provider giả lập (MOCK) chạy local, thay cho Tazapay khi dev/load test.
+
+- create_checkout(): cấp provider_ref / client_secret cho PaymentIntent. MOCK không có trang
+  thanh toán nên checkout_url để trống; thanh toán được "hoàn tất" bằng webhook ký sẵn:
+      python manage.py mock_provider --event AUTHORIZED --count <n>
+  (gửi AUTHORIZED cho các intent MOCK đang chờ, in-process hoặc --url tới webhook).
+- build_event() + sign(): dựng payload webhook và ký HMAC-SHA256 bằng WEBHOOK_SECRET,
+  đúng như PaymentWebhookView.verify_signature kiểm tra (hexdigest trên raw body).
+- LatencyHistogram: gom latency khi replay webhook (lệnh mock_provider).
+"""
+from __future__ import annotations
+
+import bisect
+import hashlib
+import hmac
+import json
+import secrets
+import uuid
+
+from django.conf import settings
+from django.utils import timezone
+
+
+class MockProvider:
+    name = "MOCK"
+
+    def __init__(self, secret: str | None = None):
+        self.secret = secret or getattr(settings, "WEBHOOK_SECRET", "mock-secret")
+
+    def create_checkout(self) -> dict:
+        """Giả lập 'create order' của provider: trả về các field cần lưu vào intent."""
+        return {
+            "provider_ref": f"mock_{uuid.uuid4().hex}",
+            "checkout_url": None,
+            "client_secret": secrets.token_urlsafe(24),
+        }
+
+    def build_event(self, provider_ref: str, event: str, **extra) -> bytes:
+        """Payload webhook dạng bytes (đúng body sẽ được ký và gửi đi)."""
+        payload = {
+            "provider": self.name,
+            "event": event,
+            "provider_ref": provider_ref,
+            "event_id": uuid.uuid4().hex,
+            "sent_at": timezone.now().isoformat(),
+            **extra,
+        }
+        return json.dumps(payload, separators=(",", ":")).encode()
+
+    def sign(self, body: bytes) -> str:
+        return hmac.new(self.secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+class LatencyHistogram:
+    """Histogram latency với bucket cố định (ms) + percentile tính từ mẫu đã ghi."""
+
+    BOUNDS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self.samples = []
+
+    def record(self, seconds: float):
+        ms = seconds * 1000.0
+        self.counts[bisect.bisect_left(self.BOUNDS_MS, ms)] += 1
+        self.samples.append(ms)
+
+    def percentile(self, p: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def render(self, width: int = 40) -> str:
+        total = len(self.samples)
+        if not total:
+            return "(no samples)"
+        peak = max(self.counts)
+        lines = []
+        labels = [f"<= {b} ms" for b in self.BOUNDS_MS] + [f">  {self.BOUNDS_MS[-1]} ms"]
+        for label, count in zip(labels, self.counts):
+            if not count:
+                continue
+            bar = "#" * max(1, int(width * count / peak))
+            lines.append(f"{label:>12} | {bar} {count}")
+        lines.append(
+            f"n={total} p50={self.percentile(50):.1f}ms p95={self.percentile(95):.1f}ms "
+            f"p99={self.percentile(99):.1f}ms max={max(self.samples):.1f}ms"
+        )
+        return "\n".join(lines)
@@ -1,7 +1,9 @@
 # payment/models.py
 from __future__ import annotations
 
+import json
 import uuid
+import zlib
 from decimal import Decimal
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -9,7 +11,9 @@ from django.db import models, transaction
 from django.utils import timezone
 
 # Liên kết sang Task
-from task.models import Task
+from task.models import Task, Category, TaskerSkill
+from outbox.handlers import TOPIC_NOTIFICATION
+from outbox.utils import enqueue
 
 
 CURRENCY_CHOICES = [
@@ -121,18 +125,72 @@ class Payment(models.Model):
     def compute_platform_fee(self) -> Decimal:
         return (self.amount * (self.platform_fee_percent / Decimal("100.00"))).quantize(Decimal("0.01"))
 
+    def notification_payload(self, user_id, title, message) -> dict:
+        """Payload outbox (topic noti.create) cho 1 thông báo liên quan payment này."""
+        return {
+            "user": user_id,
+            "type": "PAYMENT",
+            "title": title,
+            "message": message,
+            "task": self.task_id,
+            "payment": self.id,
+            "category": "payment",
+        }
+
+    def release_notification_payload(self) -> dict:
+        net = (self.amount - self.platform_fee_amount).quantize(Decimal("0.01"))
+        return self.notification_payload(
+            self.tasker_id,
+            f"Bạn đã nhận thanh toán cho task #{self.task_id}",
+            f"{net} {self.currency} đã được chuyển vào ví của bạn.",
+        )
+
     @transaction.atomic
     def mark_held(self):
-        if self.status not in [self.Status.NONE, self.Status.HELD]:
+        from .rollups import record_transition  # tránh circular import
+
+        # Đọc status trên dòng đã khoá: 2 webhook AUTHORIZED trùng nhau chạy đồng thời thì
+        # chỉ 1 request thấy NONE, rollup và thông báo escrow không bị ghi 2 lần
+        locked = Payment.objects.select_for_update().get(pk=self.pk)
+        if locked.status not in [self.Status.NONE, self.Status.HELD]:
             raise ValueError("Invalid transition to HELD")
-        self.status = self.Status.HELD
+        was_held = locked.status == self.Status.HELD
+        locked.status = self.Status.HELD
         # snapshot fee lần đầu chuyển HELD
-        if self.platform_fee_amount == Decimal("0.00") and self.platform_fee_percent > Decimal("0.00"):
-            self.platform_fee_amount = self.compute_platform_fee()
-        self.save(update_fields=["status", "platform_fee_amount", "updated_at"])
+        if locked.platform_fee_amount == Decimal("0.00") and locked.platform_fee_percent > Decimal("0.00"):
+            locked.platform_fee_amount = locked.compute_platform_fee()
+        locked.save(update_fields=["status", "platform_fee_amount", "updated_at"])
+        if not was_held:
+            record_transition(locked)
+            enqueue(TOPIC_NOTIFICATION, locked.notification_payload(
+                locked.client_id,
+                f"Đã giữ tiền escrow cho task #{locked.task_id}",
+                f"Khoản thanh toán {locked.amount} {locked.currency} đã được giữ an toàn cho đến khi task hoàn thành.",
+            ))
+        self.refresh_from_db(fields=["status", "platform_fee_amount", "updated_at"])
+
+    @transaction.atomic
+    def reprice_fee(self, percent):
+        """
+        Đổi % phí của payment chưa giải ngân (vd webhook tạo payment trước khi biết tasker,
+        tasker nhận task thì mới có level) và snapshot lại phí nếu đã HELD.
+        """
+        from .rollups import record_fee_change
+
+        if self.status not in [self.Status.NONE, self.Status.HELD]:
+            raise ValueError("Cannot reprice fee after release/refund")
+        old_fee = self.platform_fee_amount
+        self.platform_fee_percent = percent
+        self.platform_fee_amount = (
+            self.compute_platform_fee() if self.status == self.Status.HELD else Decimal("0.00")
+        )
+        self.save(update_fields=["platform_fee_percent", "platform_fee_amount", "updated_at"])
+        record_fee_change(self, old_fee)
 
     @transaction.atomic
     def mark_released(self):
+        from .rollups import record_transition
+
         if self.status != self.Status.HELD:
             raise ValueError("Invalid transition to RELEASED (must be HELD)")
         self.status = self.Status.RELEASING
@@ -143,20 +201,39 @@ class Payment(models.Model):
 
         self.status = self.Status.RELEASED
         self.save(update_fields=["status", "updated_at"])
+        record_transition(self)
+        enqueue(TOPIC_NOTIFICATION, self.release_notification_payload())
+
+    def refund_notification_payload(self) -> dict:
+        return self.notification_payload(
+            self.client_id,
+            f"Thanh toán task #{self.task_id} đã được hoàn lại",
+            f"Khoản {self.amount} {self.currency} đã được hoàn vào ví của bạn.",
+        )
 
     @transaction.atomic
     def mark_refunded(self):
-        if self.status != self.Status.HELD:
+        """
+        Hoàn toàn bộ amount về ví client (bút toán REFUND).
+        Dùng chung đường xử lý với refund hàng loạt (payment.batch.apply_refunds).
+        """
+        from .batch import REFUND_LOCK_FIELDS, BatchResult, apply_refunds  # tránh circular import
+
+        locked = (
+            Payment.objects.select_for_update()
+            .only(*REFUND_LOCK_FIELDS)
+            .get(pk=self.pk)
+        )
+        if locked.status != self.Status.HELD:
             raise ValueError("Invalid transition to REFUNDED (must be HELD)")
-        # Với v1 mock: chỉ đổi trạng thái và ghi log transaction hoàn.
-        self.status = self.Status.REFUNDED
-        self.save(update_fields=["status", "updated_at"])
-        # Lưu ý: Nếu cần sổ cái hoàn tiền client, có thể bổ sung Wallet cho client trong v2.
+        apply_refunds([locked], BatchResult())
+        self.refresh_from_db(fields=["status", "updated_at"])
 
 
 class Wallet(models.Model):
     """
-    Ví tiền. Mỗi tasker có 1 ví. Platform có thể có ví riêng (user=None).
+    Ví tiền. Mỗi user có tối đa 1 ví: tasker nhận tiền release, client nhận tiền refund.
+    Platform có thể có ví riêng (user=None).
     """
     id = models.BigAutoField(primary_key=True)
     user = models.OneToOneField(
@@ -194,13 +271,19 @@ class Wallet(models.Model):
         if net_to_tasker < Decimal("0.00"):
             raise ValueError("Net to tasker negative")
 
-        # Tasker wallet
-        tasker_wallet, _ = cls.objects.select_for_update().get_or_create(user_id=payment.tasker_id)
-        tasker_wallet.available_balance = (tasker_wallet.available_balance + net_to_tasker).quantize(Decimal("0.01"))
-        tasker_wallet.save(update_fields=["available_balance", "updated_at"])
+        from .batch import apply_credits, lock_wallets  # tránh circular import
+
+        # Lock ví tasker + ví platform giống đường batch (payment.batch): release đơn lẻ chạy
+        # cùng lúc với 1 chunk batch không ghi đè số dư phí của nhau
+        has_fee = fee > Decimal("0.00")
+        wallets = lock_wallets([payment.tasker_id], include_platform=has_fee)
+        credits = {payment.tasker_id: net_to_tasker}
+        if has_fee:
+            credits[None] = fee
+        apply_credits(wallets, credits)
 
         WalletTransaction.objects.create(
-            wallet=tasker_wallet,
+            wallet=wallets[payment.tasker_id],
             type=WalletTransaction.Type.ESCROW_RELEASE,
             amount=net_to_tasker,
             ref_task=payment.task,
@@ -209,13 +292,9 @@ class Wallet(models.Model):
         )
 
         # Platform wallet (phí)
-        if fee > Decimal("0.00"):
-            platform_wallet = cls.get_or_create_platform_wallet()
-            platform_wallet.available_balance = (platform_wallet.available_balance + fee).quantize(Decimal("0.01"))
-            platform_wallet.save(update_fields=["available_balance", "updated_at"])
-
+        if has_fee:
             WalletTransaction.objects.create(
-                wallet=platform_wallet,
+                wallet=wallets[None],
                 type=WalletTransaction.Type.PLATFORM_FEE,
                 amount=fee,
                 ref_task=payment.task,
@@ -251,6 +330,8 @@ class WalletTransaction(models.Model):
         indexes = [
             models.Index(fields=["type"]),
             models.Index(fields=["created_at"]),
+            # Sao kê theo ví + khoảng thời gian: 1 index range scan
+            models.Index(fields=["wallet", "created_at"]),
         ]
 
     def __str__(self):
@@ -268,6 +349,8 @@ class ProviderWebhookLog(models.Model):
     provider_ref = models.CharField(max_length=128, blank=True, null=True)
     signature = models.CharField(max_length=256, blank=True, null=True)
     payload = models.JSONField(default=dict)
+    # Endpoint webhook gọn chỉ lưu raw body nén zlib (payload để trống), xem decoded_payload()
+    raw_payload = models.BinaryField(blank=True, null=True)
     received_at = models.DateTimeField(default=timezone.now)
     processed = models.BooleanField(default=False)
     processed_at = models.DateTimeField(blank=True, null=True)
@@ -282,3 +365,104 @@ class ProviderWebhookLog(models.Model):
 
     def __str__(self):
         return f"Webhook({self.provider}) {self.event} {self.provider_ref or ''}"
+
+    def decoded_payload(self) -> dict:
+        if self.raw_payload:
+            return json.loads(zlib.decompress(bytes(self.raw_payload)))
+        return self.payload
+
+
+class PaymentRollup(models.Model):
+    """
+    Bảng tổng hợp sẵn (pre-aggregated) cho dashboard tài chính.
+    Mỗi dòng = 1 bucket thời gian (giờ/ngày) x currency x status đích của transition.
+    - count: số payment chuyển sang status này trong bucket.
+    - gross_amount: tổng amount của các payment đó (GMV = gross_amount của HELD).
+    - fee_amount: tổng platform_fee_amount (phí thực thu = fee_amount của RELEASED).
+    Được cộng dồn trong cùng transaction với transition (xem payment/rollups.py)
+    và có thể dựng lại bằng lệnh backfill_payment_rollups.
+    """
+    class Granularity(models.TextChoices):
+        HOUR = "hour", "Hourly"
+        DAY = "day", "Daily"
+
+    id = models.BigAutoField(primary_key=True)
+    granularity = models.CharField(max_length=8, choices=Granularity.choices)
+    bucket_start = models.DateTimeField()
+    currency = models.CharField(max_length=3, choices=CURRENCY_CHOICES)
+    status = models.CharField(max_length=16, choices=Payment.Status.choices)
+
+    count = models.BigIntegerField(default=0)
+    gross_amount = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal("0.00"))
+    fee_amount = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal("0.00"))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["granularity", "bucket_start", "currency", "status"],
+                name="uniq_payment_rollup_bucket",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Rollup({self.granularity} {self.bucket_start:%Y-%m-%d %H:00} {self.currency} {self.status}) n={self.count}"
+
+
+class FxRate(models.Model):
+    """
+    Tỷ giá quy đổi: 1 đơn vị base = rate đơn vị quote, áp dụng từ ngày as_of.
+    Nạp bằng lệnh load_fx_rates; đọc qua payment/fx.py (có cache trong process + TTL).
+    """
+    id = models.BigAutoField(primary_key=True)
+    base = models.CharField(max_length=3, choices=CURRENCY_CHOICES)
+    quote = models.CharField(max_length=3, choices=CURRENCY_CHOICES)
+    rate = models.DecimalField(max_digits=20, decimal_places=10, validators=[MinValueValidator(Decimal("0"))])
+    as_of = models.DateField()
+    source = models.CharField(max_length=32, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["base", "quote", "as_of"], name="uniq_fx_rate_pair_day"),
+        ]
+
+    def __str__(self):
+        return f"FX {self.base}/{self.quote}={self.rate} ({self.as_of})"
+
+
+class FeeRule(models.Model):
+    """
+    Luật phí nền tảng. Mỗi field điều kiện để trống = áp dụng cho mọi giá trị.
+    Khi nhiều luật cùng khớp: priority cao hơn thắng, bằng nhau thì luật cụ thể hơn thắng.
+    Luật được compile thành bảng tra cứu trong bộ nhớ (payment/fees.py) và cache lại,
+    tự invalidate khi có thay đổi (payment/signals.py).
+    """
+    id = models.BigAutoField(primary_key=True)
+    name = models.CharField(max_length=100)
+
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True, related_name="fee_rules")
+    tasker_level = models.CharField(max_length=20, choices=TaskerSkill.ExperienceLevel.choices, blank=True)
+    promotion_code = models.CharField(max_length=32, blank=True)
+    min_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    max_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+
+    percent = models.DecimalField(
+        max_digits=5, decimal_places=2,
+        validators=[MinValueValidator(Decimal("0.00")), MaxValueValidator(Decimal("100.00"))],
+    )
+    priority = models.IntegerField(default=0)
+    is_active = models.BooleanField(default=True)
+    valid_from = models.DateTimeField(null=True, blank=True)
+    valid_until = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["is_active"]),
+        ]
+
+    def __str__(self):
+        return f"FeeRule#{self.id} {self.name} {self.percent}%"
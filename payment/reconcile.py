@@ -0,0 +1,192 @@
+# payment/reconcile.py
+"""
+Đối soát chéo giữa PaymentIntent, Payment, Wallet/WalletTransaction và ProviderWebhookLog.
+
+Mỗi check duyệt bảng nguồn theo keyset (pk tăng dần, từng chunk) và kiểm tra
+bất biến bằng 1 query gộp (IN / GROUP BY) cho cả chunk, nên bộ nhớ chỉ phụ thuộc
+vào chunk_size chứ không phụ thuộc số dòng trong bảng.
+
+Mỗi check là 1 generator trả về các dict discrepancy:
+    {"check": "<tên check>", "object": "<model>", "id": <pk>, ...chi tiết}
+"""
+from __future__ import annotations
+
+from decimal import Decimal
+
+from django.db.models import Sum
+
+from .models import PaymentIntent, Payment, Wallet, WalletTransaction, ProviderWebhookLog
+
+DEFAULT_CHUNK_SIZE = 5000
+
+FUNDED_PAYMENT_STATUSES = [
+    Payment.Status.HELD,
+    Payment.Status.RELEASING,
+    Payment.Status.RELEASED,
+    Payment.Status.REFUNDED,
+]
+
+
+def keyset_chunks(qs, fields, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Duyệt queryset theo keyset trên pk: WHERE pk > last ORDER BY pk LIMIT chunk_size.
+    Trả về từng list tuple (pk, *fields). Không dùng OFFSET nên chi phí mỗi chunk là hằng số.
+    """
+    last_pk = 0
+    while True:
+        rows = list(qs.filter(pk__gt=last_pk).order_by("pk").values_list("pk", *fields)[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        last_pk = rows[-1][0]
+
+
+def check_authorized_intents(chunk_size=DEFAULT_CHUNK_SIZE):
+    """Intent AUTHORIZED (escrow đã nhận tiền) nhưng không có Payment đã funded."""
+    qs = PaymentIntent.objects.filter(status=PaymentIntent.Status.AUTHORIZED)
+    for rows in keyset_chunks(qs, ["task_id", "amount"], chunk_size):
+        task_ids = [task_id for _, task_id, _ in rows]
+        payments = dict(
+            Payment.objects.filter(task_id__in=task_ids).values_list("task_id", "status")
+        )
+        for intent_id, task_id, amount in rows:
+            payment_status = payments.get(task_id)
+            if payment_status not in FUNDED_PAYMENT_STATUSES:
+                yield {
+                    "check": "authorized_intent_without_held_payment",
+                    "object": "PaymentIntent",
+                    "id": intent_id,
+                    "task": task_id,
+                    "amount": amount,
+                    "payment_status": payment_status,
+                }
+
+
+def check_funded_payments(chunk_size=DEFAULT_CHUNK_SIZE):
+    """Payment đã funded nhưng intent của task không AUTHORIZED (hoặc không tồn tại)."""
+    qs = Payment.objects.filter(status__in=FUNDED_PAYMENT_STATUSES)
+    for rows in keyset_chunks(qs, ["task_id", "status", "amount"], chunk_size):
+        task_ids = [task_id for _, task_id, _, _ in rows]
+        intents = dict(
+            PaymentIntent.objects.filter(task_id__in=task_ids).values_list("task_id", "status")
+        )
+        for payment_id, task_id, status, amount in rows:
+            intent_status = intents.get(task_id)
+            if intent_status != PaymentIntent.Status.AUTHORIZED:
+                yield {
+                    "check": "funded_payment_without_authorized_intent",
+                    "object": "Payment",
+                    "id": payment_id,
+                    "task": task_id,
+                    "status": status,
+                    "amount": amount,
+                    "intent_status": intent_status,
+                }
+
+
+def check_released_payments(chunk_size=DEFAULT_CHUNK_SIZE):
+    """Payment RELEASED thiếu bút toán ESCROW_RELEASE, hoặc kẹt ở RELEASING."""
+    qs = Payment.objects.filter(status__in=[Payment.Status.RELEASED, Payment.Status.RELEASING])
+    for rows in keyset_chunks(qs, ["status"], chunk_size):
+        payment_ids = [pk for pk, _ in rows]
+        ledgered = set(
+            WalletTransaction.objects.filter(
+                ref_payment_id__in=payment_ids, type=WalletTransaction.Type.ESCROW_RELEASE
+            ).values_list("ref_payment_id", flat=True)
+        )
+        for payment_id, status in rows:
+            if status == Payment.Status.RELEASING:
+                yield {"check": "payment_stuck_releasing", "object": "Payment", "id": payment_id}
+            elif payment_id not in ledgered:
+                yield {"check": "released_payment_without_ledger", "object": "Payment", "id": payment_id}
+
+
+def check_refunded_payments(chunk_size=DEFAULT_CHUNK_SIZE):
+    """Payment REFUNDED thiếu bút toán REFUND vào ví client."""
+    qs = Payment.objects.filter(status=Payment.Status.REFUNDED)
+    for rows in keyset_chunks(qs, ["client_id"], chunk_size):
+        payment_ids = [pk for pk, _ in rows]
+        ledgered = set(
+            WalletTransaction.objects.filter(
+                ref_payment_id__in=payment_ids, type=WalletTransaction.Type.REFUND
+            ).values_list("ref_payment_id", flat=True)
+        )
+        for payment_id, client_id in rows:
+            if payment_id not in ledgered:
+                yield {"check": "refunded_payment_without_ledger", "object": "Payment", "id": payment_id,
+                       "client": client_id}
+
+
+def check_wallet_balances(chunk_size=DEFAULT_CHUNK_SIZE):
+    """Số dư ví khác tổng WalletTransaction của ví đó."""
+    for rows in keyset_chunks(Wallet.objects.all(), ["user_id", "available_balance"], chunk_size):
+        wallet_ids = [pk for pk, _, _ in rows]
+        totals = dict(
+            WalletTransaction.objects.filter(wallet_id__in=wallet_ids)
+            .values("wallet_id")
+            .annotate(total=Sum("amount"))
+            .values_list("wallet_id", "total")
+        )
+        for wallet_id, user_id, balance in rows:
+            ledger = totals.get(wallet_id) or Decimal("0.00")
+            if ledger != balance:
+                yield {
+                    "check": "wallet_balance_mismatch",
+                    "object": "Wallet",
+                    "id": wallet_id,
+                    "user": user_id,
+                    "balance": balance,
+                    "ledger_total": ledger,
+                    "difference": balance - ledger,
+                }
+
+
+def check_webhook_logs(chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    - Webhook chưa xử lý được (processed=False).
+    - Webhook AUTHORIZED đã xử lý nhưng intent tương ứng không AUTHORIZED.
+    """
+    qs = ProviderWebhookLog.objects.filter(processed=False)
+    for rows in keyset_chunks(qs, ["event", "provider_ref", "error"], chunk_size):
+        for log_id, event, provider_ref, error in rows:
+            yield {
+                "check": "webhook_unprocessed",
+                "object": "ProviderWebhookLog",
+                "id": log_id,
+                "event": event,
+                "provider_ref": provider_ref,
+                "error": error,
+            }
+
+    qs = ProviderWebhookLog.objects.filter(processed=True, event="AUTHORIZED")
+    for rows in keyset_chunks(qs, ["provider_ref"], chunk_size):
+        refs = {ref for _, ref in rows if ref}
+        intents = dict(
+            PaymentIntent.objects.filter(provider_ref__in=refs).values_list("provider_ref", "status")
+        )
+        for log_id, provider_ref in rows:
+            intent_status = intents.get(provider_ref)
+            if intent_status != PaymentIntent.Status.AUTHORIZED:
+                yield {
+                    "check": "webhook_authorized_intent_mismatch",
+                    "object": "ProviderWebhookLog",
+                    "id": log_id,
+                    "provider_ref": provider_ref,
+                    "intent_status": intent_status,
+                }
+
+
+CHECKS = {
+    "intents": check_authorized_intents,
+    "payments": check_funded_payments,
+    "releases": check_released_payments,
+    "refunds": check_refunded_payments,
+    "wallets": check_wallet_balances,
+    "webhooks": check_webhook_logs,
+}
+
+
+def run_checks(names=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Chạy lần lượt các check (mặc định: tất cả), trả về stream discrepancy."""
+    for name in names or CHECKS:
+        yield from CHECKS[name](chunk_size)
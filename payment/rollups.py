@@ -0,0 +1,200 @@
+# payment/rollups.py
+"""
+Duy trì bảng PaymentRollup (giờ/ngày x currency x status).
+
+- record_transitions(): gọi trong cùng transaction với transition của Payment
+  (mark_held / mark_released / mark_refunded / batch processor). Các entry được
+  cộng dồn trong bộ nhớ theo bucket trước, rồi mỗi bucket chỉ 1 UPDATE ... SET count = count + n.
+- backfill(): dựng lại rollup từ bảng Payment (duyệt keyset), dùng khi mới
+  triển khai hoặc khi nghi ngờ lệch số.
+"""
+from __future__ import annotations
+
+from datetime import timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import fx
+from .models import Payment, PaymentRollup
+from .reconcile import keyset_chunks
+
+ROLLUP_STATUSES = [Payment.Status.HELD, Payment.Status.RELEASED, Payment.Status.REFUNDED]
+BACKFILL_FLUSH_KEYS = 10000
+
+
+def bucket_starts(at):
+    """Trả về [(granularity, bucket_start)] của thời điểm at (theo UTC)."""
+    at = at.astimezone(dt_timezone.utc)
+    hour = at.replace(minute=0, second=0, microsecond=0)
+    day = hour.replace(hour=0)
+    return [(PaymentRollup.Granularity.HOUR, hour), (PaymentRollup.Granularity.DAY, day)]
+
+
+def _accumulate(buckets: dict, at, currency, status, amount, fee):
+    for granularity, start in bucket_starts(at):
+        key = (granularity, start, currency, status)
+        count, gross, fees = buckets.get(key, (0, Decimal("0.00"), Decimal("0.00")))
+        buckets[key] = (count + 1, gross + amount, fees + fee)
+
+
+def _upsert(key, count, gross, fees):
+    granularity, start, currency, status = key
+    lookup = dict(granularity=granularity, bucket_start=start, currency=currency, status=status)
+    delta = dict(
+        count=F("count") + count,
+        gross_amount=F("gross_amount") + gross,
+        fee_amount=F("fee_amount") + fees,
+        updated_at=timezone.now(),
+    )
+    if PaymentRollup.objects.filter(**lookup).update(**delta):
+        return
+    try:
+        with transaction.atomic():
+            PaymentRollup.objects.create(count=count, gross_amount=gross, fee_amount=fees, **lookup)
+    except IntegrityError:
+        # Worker khác vừa tạo bucket này -> cộng dồn vào dòng đó
+        PaymentRollup.objects.filter(**lookup).update(**delta)
+
+
+def flush(buckets: dict):
+    # Sắp xếp key để các transaction đồng thời lock bucket theo cùng thứ tự
+    for key in sorted(buckets):
+        _upsert(key, *buckets[key])
+
+
+def record_transitions(entries):
+    """
+    entries: iterable (at, currency, status, amount, fee).
+    Chỉ ghi các status nằm trong ROLLUP_STATUSES.
+    """
+    buckets = {}
+    for at, currency, status, amount, fee in entries:
+        if status in ROLLUP_STATUSES:
+            _accumulate(buckets, at, currency, status, amount, fee)
+    flush(buckets)
+
+
+def record_transition(payment: Payment, at=None):
+    """Ghi transition của 1 payment sang status hiện tại của nó."""
+    record_transitions([
+        (at or timezone.now(), payment.currency, payment.status, payment.amount, payment.platform_fee_amount)
+    ])
+
+
+def record_fee_change(payment: Payment, old_fee):
+    """
+    Payment đã vào rollup được định giá lại phí (Payment.reprice_fee): cộng chênh lệch phí
+    vào bucket của status hiện tại tại created_at (cùng quy ước với backfill), count không đổi.
+    """
+    delta = payment.platform_fee_amount - old_fee
+    if not delta or payment.status not in ROLLUP_STATUSES:
+        return
+    flush({
+        (granularity, start, payment.currency, payment.status): (0, Decimal("0.00"), delta)
+        for granularity, start in bucket_starts(payment.created_at)
+    })
+
+
+def backfill(since=None, chunk_size=5000) -> int:
+    """
+    Dựng lại rollup từ Payment. Nếu có since: chỉ dựng lại các bucket từ ngày của since trở đi.
+    Quy ước thời điểm (bảng Payment không lưu lịch sử transition):
+      - HELD tại created_at (payment được tạo và HELD ngay khi escrow funded).
+      - RELEASED / REFUNDED tại updated_at.
+    Trả về số payment đã duyệt.
+    """
+    if since is not None:
+        since = bucket_starts(since)[1][1]  # làm tròn về đầu ngày để không cắt dở bucket ngày
+
+    qs = Payment.objects.filter(status__in=ROLLUP_STATUSES)
+    if since is not None:
+        qs = qs.filter(updated_at__gte=since)
+
+    scanned = 0
+    with transaction.atomic():
+        stale = PaymentRollup.objects.all()
+        if since is not None:
+            stale = stale.filter(bucket_start__gte=since)
+        stale.delete()
+
+        buckets = {}
+        fields = ["currency", "status", "amount", "platform_fee_amount", "created_at", "updated_at"]
+        for rows in keyset_chunks(qs, fields, chunk_size):
+            for _, currency, status, amount, fee, created_at, updated_at in rows:
+                if since is None or created_at >= since:
+                    _accumulate(buckets, created_at, currency, Payment.Status.HELD, amount, fee)
+                if status != Payment.Status.HELD:
+                    _accumulate(buckets, updated_at, currency, status, amount, fee)
+            scanned += len(rows)
+            if len(buckets) >= BACKFILL_FLUSH_KEYS:
+                flush(buckets)
+                buckets = {}
+        flush(buckets)
+    return scanned
+
+
+def summarize(granularity, start=None, end=None, currency=None):
+    """
+    Đọc rollup cho dashboard. Trả về (series, totals):
+      series: [{bucket_start, currency, gmv, fees, counts: {status: n}}] theo thời gian
+      totals: {currency: {gmv, fees, counts}}
+    """
+    qs = PaymentRollup.objects.filter(granularity=granularity)
+    if start:
+        qs = qs.filter(bucket_start__gte=start)
+    if end:
+        qs = qs.filter(bucket_start__lte=end)
+    if currency:
+        qs = qs.filter(currency=currency)
+
+    series = {}
+    totals = {}
+    rows = qs.order_by("bucket_start", "currency").values_list(
+        "bucket_start", "currency", "status", "count", "gross_amount", "fee_amount"
+    )
+    for bucket, cur, status, count, gross, fees in rows:
+        point = series.setdefault((bucket, cur), {
+            "bucket_start": bucket, "currency": cur,
+            "gmv": Decimal("0.00"), "fees": Decimal("0.00"), "counts": {},
+        })
+        total = totals.setdefault(cur, {"gmv": Decimal("0.00"), "fees": Decimal("0.00"), "counts": {}})
+        for target in (point, total):
+            target["counts"][status] = target["counts"].get(status, 0) + count
+            if status == Payment.Status.HELD:
+                target["gmv"] += gross
+            elif status == Payment.Status.RELEASED:
+                target["fees"] += fees
+    return list(series.values()), totals
+
+
+def convert_summary(series, target):
+    """
+    Gộp series nhiều currency về 1 currency target trong 1 lượt (bảng tỷ giá nạp 1 lần),
+    mỗi bucket theo tỷ giá hiệu lực tại bucket_start.
+    Trả về (series_converted, totals_converted). Raise fx.FxRateMissing nếu thiếu tỷ giá.
+    """
+    table = fx.rate_table()
+    merged = {}
+    totals = {"currency": target, "gmv": Decimal("0.00"), "fees": Decimal("0.00")}
+    for point in series:
+        gmv = fx.convert(point["gmv"], point["currency"], target, table, point["bucket_start"])
+        fees = fx.convert(point["fees"], point["currency"], target, table, point["bucket_start"])
+        bucket = merged.setdefault(point["bucket_start"], {
+            "bucket_start": point["bucket_start"], "gmv": Decimal("0.00"), "fees": Decimal("0.00"),
+        })
+        bucket["gmv"] += gmv
+        bucket["fees"] += fees
+        totals["gmv"] += gmv
+        totals["fees"] += fees
+    return list(merged.values()), totals
+
+
+def default_range(granularity):
+    """Khoảng mặc định cho dashboard: 48 giờ gần nhất hoặc 30 ngày gần nhất."""
+    now = timezone.now()
+    if granularity == PaymentRollup.Granularity.HOUR:
+        return now - timedelta(hours=48), now
+    return now - timedelta(days=30), now
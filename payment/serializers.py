@@ -1,27 +1,35 @@
+from collections.abc import Mapping
+
 from rest_framework import serializers
+from rest_framework.utils import html
 from .models import PaymentIntent, Payment
+from .mock_provider import MockProvider
+from .batch import DEFAULT_CHUNK_SIZE
+from task.models import Task
 
 
 class PaymentIntentSerializer(serializers.ModelSerializer):
+    # task được view lấy (có lock) và truyền vào save(); serializer không tự query Task
+    task = serializers.PrimaryKeyRelatedField(read_only=True)
+
     class Meta:
         model = PaymentIntent
         fields = [
             "id", "task", "client", "amount", "currency",
-            "is_authorized", "provider_ref", "created_at"
+            "is_authorized", "status", "provider", "provider_ref", "checkout_url", "created_at"
+        ]
+        read_only_fields = [
+            "id", "client", "is_authorized", "status", "provider", "provider_ref", "checkout_url", "created_at"
         ]
-        read_only_fields = ["id", "client", "is_authorized", "created_at", "provider_ref"]
-
-    def validate_task(self, task):
-        """
-        - Một task chỉ có thể có 1 PaymentIntent tại 1 thời điểm
-        (logic business, không phải permission).
-        """
-        if PaymentIntent.objects.filter(task=task).exists():
-            raise serializers.ValidationError("Task này đã có PaymentIntent.")
-        return task
 
     def create(self, validated_data):
+        # "Một task chỉ có 1 PaymentIntent" do unique constraint (OneToOne) đảm bảo,
+        # view bắt IntegrityError -> 409 thay vì query exists() trước.
         validated_data["client"] = self.context["request"].user
+        # Provider MOCK: cấp checkout ngay (không gọi ra ngoài), chờ webhook AUTHORIZED
+        if validated_data.get("provider", "MOCK") == "MOCK":
+            validated_data.update(MockProvider().create_checkout())
+            validated_data["status"] = PaymentIntent.Status.REQUIRES_ACTION
         return super().create(validated_data)
 
 
@@ -45,3 +53,50 @@ class PaymentSerializer(serializers.ModelSerializer):
             "platform_fee_amount", "task_title", "platform_fee_percent"
         ]
 
+
+
+class PaymentBatchSerializer(serializers.Serializer):
+    """
+    Tham số release / refund hàng loạt. task_status nhận 1 giá trị hoặc list;
+    phải có ít nhất payment_ids hoặc task_status (tránh thao tác nhầm toàn bộ escrow).
+    """
+    payment_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=True)
+    task_status = serializers.ListField(child=serializers.ChoiceField(choices=Task.Status.choices), required=False)
+    limit = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+    chunk_size = serializers.IntegerField(min_value=1, required=False, default=DEFAULT_CHUNK_SIZE)
+
+    scalar_list_fields = ("task_status",)
+    required_one_of = ("payment_ids", "task_status")
+
+    def to_internal_value(self, data):
+        # Form / query string (QueryDict): ListField tự đọc mọi giá trị bằng getlist(),
+        # chỉ body JSON mới cần bọc giá trị đơn thành list
+        if html.is_html_input(data) or not isinstance(data, Mapping):
+            return super().to_internal_value(data)
+        if any(isinstance(data.get(name), (str, int)) for name in self.scalar_list_fields):
+            data = dict(data.items())
+            for name in self.scalar_list_fields:
+                if isinstance(data.get(name), (str, int)):
+                    data[name] = [data[name]]
+        return super().to_internal_value(data)
+
+    def validate(self, attrs):
+        if not any(attrs.get(name) for name in self.required_one_of):
+            raise serializers.ValidationError(f"Cần {' hoặc '.join(self.required_one_of)}")
+        return attrs
+
+    def batch_params(self) -> dict:
+        data = self.validated_data
+        return {
+            "payment_ids": data.get("payment_ids") or None,
+            "task_statuses": data.get("task_status") or None,
+            "limit": data.get("limit"),
+            "chunk_size": data["chunk_size"],
+        }
+
+
+class PaymentBatchRefundSerializer(PaymentBatchSerializer):
+    category = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+
+    scalar_list_fields = ("task_status", "category")
+    required_one_of = ("payment_ids", "category", "task_status")
@@ -0,0 +1,18 @@
+# payment/signals.py
+"""
+Signals cho payment app.
+
+- FeeRule thay đổi (tạo/sửa/xoá) -> bỏ bảng luật phí đã compile của process này
+  (process khác thấy qua phiên bản luật trong DB, payment/fees.py).
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import fees
+from .models import FeeRule
+
+
+@receiver(post_save, sender=FeeRule)
+@receiver(post_delete, sender=FeeRule)
+def fee_rule_changed(sender, **kwargs):
+    fees.invalidate()
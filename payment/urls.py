@@ -5,8 +5,14 @@ from .views import (
     PaymentReleaseView,
     PaymentRefundView,
     PaymentAdminListView,
+    PaymentBatchReleaseView,
+    PaymentBatchRefundView,
+    PaymentAdminExportView,
+    WalletStatementExportView,
+    PaymentAnalyticsView,
+    WalletStatementSummaryView,
 )
-from .views_webhook import PaymentWebhookView
+from .views_webhook import PaymentWebhookView, LeanPaymentWebhookView
 
 urlpatterns = [
     # Client tạo PaymentIntent cho task
@@ -24,5 +30,23 @@ urlpatterns = [
     # Admin xem toàn bộ Payment
     path("admin/list/", PaymentAdminListView.as_view(), name="payment-admin-list"),
 
+    # Admin export toàn bộ Payment (stream CSV/JSONL)
+    path("admin/export/", PaymentAdminExportView.as_view(), name="payment-admin-export"),
+
+    # Admin dashboard (GMV, phí, số lượng theo status) từ bảng rollup
+    path("admin/analytics/", PaymentAnalyticsView.as_view(), name="payment-admin-analytics"),
+
+    # Sao kê ví (stream CSV/JSONL)
+    path("wallet/statement/export/", WalletStatementExportView.as_view(), name="wallet-statement-export"),
+    path("wallet/statement/summary/", WalletStatementSummaryView.as_view(), name="wallet-statement-summary"),
+
+    # Admin release hàng loạt payment HELD
+    path("admin/release-batch/", PaymentBatchReleaseView.as_view(), name="payment-admin-release-batch"),
+
+    # Admin refund hàng loạt payment HELD về ví client
+    path("admin/refund-batch/", PaymentBatchRefundView.as_view(), name="payment-admin-refund-batch"),
+
     path("webhook/", PaymentWebhookView.as_view(), name="payment-webhook"),
+    # Webhook bản gọn: verify trên raw bytes, parse 1 lần, lưu raw payload nén
+    path("webhook/lean/", LeanPaymentWebhookView.as_view(), name="payment-webhook-lean"),
 ]
@@ -2,10 +2,23 @@ from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from decimal import Decimal
 
-from .models import PaymentIntent, Payment
-from .serializers import PaymentIntentSerializer, PaymentSerializer
-from .permissions import IsClientOfTask, IsTaskerOfTask, IsPlatformAdmin,IsClientOfTaskForIntent
+from .models import PaymentIntent, Payment, PaymentRollup, Wallet
+from .serializers import (
+    PaymentIntentSerializer, PaymentSerializer, PaymentBatchSerializer, PaymentBatchRefundSerializer,
+)
+from .permissions import IsClientOfTask, IsTaskerOfTask, IsPlatformAdmin
+from .batch import release_held_payments, refund_held_payments
+from .rollups import summarize, convert_summary, default_range
+from .exports import (
+    EXPORT_FORMATS, PAYMENT_EXPORT_HEADER, STATEMENT_HEADER,
+    export_response, iter_payments, iter_wallet_statement, parse_export_datetime, with_converted_column,
+)
+from . import fx
 from task.models import Task
 
 
@@ -17,10 +30,37 @@ class PaymentIntentCreateView(generics.CreateAPIView):
     Client tạo PaymentIntent cho Task.
     - Chỉ client của task mới tạo được.
     - Một task chỉ có thể có 1 PaymentIntent.
+    Tổng cộng 2 query: 1 SELECT ... FOR UPDATE lấy task (kiểm tra tồn tại + quyền)
+    và 1 INSERT dựa vào unique constraint của task -> trùng thì trả 409.
     """
     queryset = PaymentIntent.objects.all()
     serializer_class = PaymentIntentSerializer
-    permission_classes = [permissions.IsAuthenticated, IsClientOfTaskForIntent]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def create(self, request, *args, **kwargs):
+        try:
+            # body JSON không phải object (list, string...) không có .get -> AttributeError
+            task_id = int(request.data.get("task"))
+        except (AttributeError, TypeError, ValueError):
+            return Response({"task": ["Task id không hợp lệ."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            task = Task.objects.select_for_update().only("id", "client_id").filter(pk=task_id).first()
+            if task is None:
+                return Response({"error": "Task không tồn tại"}, status=status.HTTP_404_NOT_FOUND)
+            if task.client_id != request.user.id:
+                return Response({"error": "Chỉ client của task mới tạo được PaymentIntent"},
+                                status=status.HTTP_403_FORBIDDEN)
+            try:
+                with transaction.atomic():
+                    serializer.save(task=task)
+            except IntegrityError:
+                return Response({"error": "Task này đã có PaymentIntent."}, status=status.HTTP_409_CONFLICT)
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
 # -------------------------
@@ -118,3 +158,237 @@ class PaymentAdminListView(generics.ListAPIView):
     queryset = Payment.objects.all().select_related("task", "client", "tasker")
     serializer_class = PaymentSerializer
     permission_classes = [permissions.IsAuthenticated, IsPlatformAdmin]
+
+
+def _parse_export_params(request):
+    """
+    Đọc output/start/end từ query params.
+    Trả về (output, start, end, None) hoặc (None, None, None, Response lỗi).
+    Dùng 'output' thay vì 'format' vì 'format' là param content negotiation của DRF.
+    """
+    output = request.query_params.get("output", "csv")
+    if output not in EXPORT_FORMATS:
+        error = Response({"error": f"output phải là một trong {list(EXPORT_FORMATS)}"},
+                         status=status.HTTP_400_BAD_REQUEST)
+        return None, None, None, error
+    try:
+        start = parse_export_datetime(request.query_params.get("start"))
+        end = parse_export_datetime(request.query_params.get("end"), end_of_day=True)
+    except ValueError as e:
+        return None, None, None, Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return output, start, end, None
+
+
+def _get_statement_wallet(request, view):
+    """Ví của chính user, hoặc ?wallet=<id> nếu là admin. Trả về (wallet, None) hoặc (None, Response lỗi)."""
+    wallet_id = request.query_params.get("wallet")
+    if wallet_id:
+        if not IsPlatformAdmin().has_permission(request, view):
+            return None, Response({"error": "Bạn không có quyền xem ví này"}, status=status.HTTP_403_FORBIDDEN)
+        if not wallet_id.isdigit():
+            return None, Response({"error": "wallet phải là id (số nguyên)"}, status=status.HTTP_400_BAD_REQUEST)
+        return get_object_or_404(Wallet, pk=wallet_id), None
+    return get_object_or_404(Wallet, user=request.user), None
+
+
+class PaymentAdminExportView(APIView):
+    """
+    Admin export toàn bộ Payment dạng stream (không qua serializer).
+    Query params: output=csv|jsonl, start, end (theo created_at), status, currency.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsPlatformAdmin]
+
+    def get(self, request):
+        output, start, end, error = _parse_export_params(request)
+        if error:
+            return error
+
+        filters = {}
+        if start:
+            filters["created_at__gte"] = start
+        if end:
+            filters["created_at__lte"] = end
+        if request.query_params.get("status"):
+            filters["status"] = request.query_params["status"]
+        if request.query_params.get("currency"):
+            filters["currency"] = request.query_params["currency"]
+
+        header, rows = with_converted_column(PAYMENT_EXPORT_HEADER, iter_payments(filters), "amount", "currency")
+        return export_response(header, rows, output, "payments", request)
+
+
+class PaymentAnalyticsView(APIView):
+    """
+    Dashboard tài chính cho admin, đọc từ bảng PaymentRollup (không quét bảng Payment).
+    Query params:
+      - granularity=hour|day (mặc định day)
+      - start, end: ngày hoặc ISO datetime (mặc định 48 giờ / 30 ngày gần nhất)
+      - currency=VND|USD (tuỳ chọn)
+      - convert_to=VND|USD (mặc định REPORTING_CURRENCY)
+    """
+    permission_classes = [permissions.IsAuthenticated, IsPlatformAdmin]
+
+    def get(self, request):
+        granularity = request.query_params.get("granularity", PaymentRollup.Granularity.DAY)
+        if granularity not in PaymentRollup.Granularity.values:
+            return Response(
+                {"error": f"granularity phải là một trong {PaymentRollup.Granularity.values}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            start = parse_export_datetime(request.query_params.get("start"))
+            end = parse_export_datetime(request.query_params.get("end"), end_of_day=True)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if start is None and end is None:
+            start, end = default_range(granularity)
+
+        series, totals = summarize(granularity, start, end, request.query_params.get("currency"))
+
+        # Gộp mọi currency về 1 currency báo cáo (mặc định REPORTING_CURRENCY)
+        target = request.query_params.get("convert_to") or fx.reporting_currency()
+        try:
+            converted_series, converted_totals = convert_summary(series, target)
+            converted = {"currency": target, "series": converted_series, "totals": converted_totals}
+        except fx.FxRateMissing as e:
+            converted = {"currency": target, "error": str(e)}
+
+        return Response({
+            "granularity": granularity,
+            "start": start,
+            "end": end,
+            "series": series,
+            "totals": totals,
+            "converted": converted,
+        }, status=status.HTTP_200_OK)
+
+
+# -------------------------
+# WALLET STATEMENT
+# -------------------------
+class WalletStatementExportView(APIView):
+    """
+    Export sao kê ví (WalletTransaction) theo khoảng thời gian, dạng stream.
+    Query params:
+      - output=csv|jsonl (mặc định csv)
+      - start, end: ngày (YYYY-MM-DD) hoặc ISO datetime
+      - wallet=<id>: chỉ admin; mặc định là ví của chính user
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        output, start, end, error = _parse_export_params(request)
+        if error:
+            return error
+
+        wallet, error = _get_statement_wallet(request, self)
+        if error:
+            return error
+
+        rows = iter_wallet_statement(wallet.id, start=start, end=end)
+        header, rows = with_converted_column(STATEMENT_HEADER, rows, "amount", "currency")
+        return export_response(header, rows, output, f"wallet-{wallet.id}-statement", request)
+
+
+class WalletStatementSummaryView(APIView):
+    """
+    Tổng hợp sao kê ví theo currency + loại giao dịch (1 query GROUP BY),
+    kèm tổng quy đổi sang REPORTING_CURRENCY (hoặc ?convert_to=).
+    Query params giống export: start, end, wallet (admin).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        try:
+            start = parse_export_datetime(request.query_params.get("start"))
+            end = parse_export_datetime(request.query_params.get("end"), end_of_day=True)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        wallet, error = _get_statement_wallet(request, self)
+        if error:
+            return error
+        target = request.query_params.get("convert_to") or fx.reporting_currency()
+
+        qs = wallet.transactions.all()
+        if start:
+            qs = qs.filter(created_at__gte=start)
+        if end:
+            qs = qs.filter(created_at__lte=end)
+        # Nhóm thêm theo ngày để quy đổi mỗi phần theo tỷ giá hiệu lực ngày đó
+        rows = qs.values_list("ref_payment__currency", "type", TruncDate("created_at")).annotate(
+            total=Sum("amount"), count=Count("id")
+        )
+
+        by_currency = {}
+        by_currency_day = {}
+        breakdown = {}
+        for currency, txn_type, day, total, count in rows:
+            currency = currency or fx.DEFAULT_CURRENCY
+            by_currency[currency] = by_currency.get(currency, Decimal("0.00")) + total
+            by_currency_day[(currency, day)] = by_currency_day.get((currency, day), Decimal("0.00")) + total
+            item = breakdown.setdefault(
+                (currency, txn_type), {"currency": currency, "type": txn_type, "total": Decimal("0.00"), "count": 0}
+            )
+            item["total"] += total
+            item["count"] += count
+
+        try:
+            converted = {"currency": target, "total": fx.convert_totals(by_currency_day, target)}
+        except fx.FxRateMissing as e:
+            converted = {"currency": target, "total": None, "error": str(e)}
+
+        return Response({
+            "wallet": wallet.id,
+            "start": start,
+            "end": end,
+            "totals_by_currency": by_currency,
+            "breakdown": list(breakdown.values()),
+            "converted": converted,
+        }, status=status.HTTP_200_OK)
+
+
+class PaymentBatchReleaseView(APIView):
+    """
+    Admin release hàng loạt payment HELD trong 1 lượt.
+    Body:
+    {
+      "payment_ids": [1, 2, 3],            # tuỳ chọn
+      "task_status": ["completed", ...],   # tuỳ chọn
+      "limit": 5000,                       # tuỳ chọn
+      "chunk_size": 500                    # tuỳ chọn
+    }
+    Phải có ít nhất payment_ids hoặc task_status (tránh release nhầm toàn bộ escrow).
+    """
+    permission_classes = [permissions.IsAuthenticated, IsPlatformAdmin]
+
+    def post(self, request):
+        serializer = PaymentBatchSerializer(data=request.data or {})
+        serializer.is_valid(raise_exception=True)
+
+        result = release_held_payments(**serializer.batch_params())
+        return Response(result.as_dict(), status=status.HTTP_200_OK)
+
+
+class PaymentBatchRefundView(APIView):
+    """
+    Admin refund hàng loạt payment HELD về ví client (vd huỷ hàng loạt khi 1 category gặp sự cố).
+    Body:
+    {
+      "payment_ids": [1, 2, 3],            # tuỳ chọn
+      "category": [4, 5],                  # tuỳ chọn
+      "task_status": ["open", ...],        # tuỳ chọn
+      "limit": 5000,                       # tuỳ chọn
+      "chunk_size": 500                    # tuỳ chọn
+    }
+    Phải có ít nhất payment_ids, category hoặc task_status.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsPlatformAdmin]
+
+    def post(self, request):
+        serializer = PaymentBatchRefundSerializer(data=request.data or {})
+        serializer.is_valid(raise_exception=True)
+
+        result = refund_held_payments(
+            category_ids=serializer.validated_data.get("category") or None, **serializer.batch_params()
+        )
+        return Response(result.as_dict(), status=status.HTTP_200_OK)
@@ -1,11 +1,75 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from django.http import JsonResponse
 from django.utils import timezone
-import hmac, hashlib
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+import hmac, hashlib, json, zlib
 from django.conf import settings
 
+try:  # parser JSON nhanh (tuỳ chọn); không có thì dùng json chuẩn
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
 from .models import PaymentIntent, Payment, ProviderWebhookLog
+from .fees import resolve_fee_percent
+
+
+def loads_json(body: bytes):
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+
+def process_webhook_event(log: ProviderWebhookLog, event, provider_ref):
+    """
+    Cập nhật PaymentIntent & Payment theo event, đánh dấu log đã xử lý.
+    Trả về (http_status, body) để view tự dựng response.
+    """
+    try:
+        # Xử lý logic cập nhật PaymentIntent
+        intent = PaymentIntent.objects.filter(provider_ref=provider_ref).first()
+        if not intent:
+            log.error = "Không tìm thấy PaymentIntent"
+            log.save(update_fields=["error"])
+            return status.HTTP_404_NOT_FOUND, {"error": "PaymentIntent not found"}
+
+        if event == "AUTHORIZED":
+            intent.status = PaymentIntent.Status.AUTHORIZED
+            intent.save(update_fields=["status", "updated_at"])
+
+            # Nếu chưa có Payment thì tạo
+            payment, _ = Payment.objects.get_or_create(
+                task=intent.task,
+                defaults={
+                    "client": intent.client,
+                    "tasker": intent.task.tasker,  # tasker có thể null lúc tạo
+                    "amount": intent.amount,
+                    "currency": intent.currency,
+                    "platform_fee_percent": resolve_fee_percent(
+                        category_id=intent.task.category_id,
+                        promotion=(intent.task.attributes or {}).get("promotion_code"),
+                        amount=intent.amount,
+                    ),
+                },
+            )
+            payment.mark_held()
+
+        elif event in ["CANCELED", "EXPIRED"]:
+            intent.status = PaymentIntent.Status.CANCELED if event == "CANCELED" else PaymentIntent.Status.EXPIRED
+            intent.save(update_fields=["status", "updated_at"])
+
+        log.processed = True
+        log.processed_at = timezone.now()
+        log.save(update_fields=["processed", "processed_at"])
+
+        return status.HTTP_200_OK, {"message": f"Webhook {event} processed"}
+
+    except Exception as e:
+        log.error = str(e)
+        log.save(update_fields=["error"])
+        return status.HTTP_500_INTERNAL_SERVER_ERROR, {"error": str(e)}
 
 
 class PaymentWebhookView(APIView):
@@ -41,42 +105,46 @@ class PaymentWebhookView(APIView):
             payload=payload,
             received_at=timezone.now(),
         )
-        
+
+        code, body = process_webhook_event(log, event, provider_ref)
+        return Response(body, status=code)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class LeanPaymentWebhookView(View):
+    """
+    Webhook bản gọn cho lúc bão webhook:
+    - Không qua DRF (không content negotiation / parser / authentication).
+    - HMAC kiểm tra trực tiếp trên raw bytes, chữ ký sai bị loại trước khi parse.
+    - Parse JSON đúng 1 lần (orjson nếu có).
+    - Log lưu raw body nén zlib (ProviderWebhookLog.raw_payload) thay vì JSON đầy đủ.
+    """
+
+    http_method_names = ["post"]
+
+    def post(self, request, *args, **kwargs):
+        body = request.body
+        signature = request.headers.get("X-Webhook-Signature")
+        if not signature or not PaymentWebhookView.verify_signature(PaymentWebhookView.WEBHOOK_SECRET, signature, body):
+            return JsonResponse({"error": "Invalid signature"}, status=status.HTTP_400_BAD_REQUEST)
+
         try:
-            # Xử lý logic cập nhật PaymentIntent
-            intent = PaymentIntent.objects.filter(provider_ref=provider_ref).first()
-            if not intent:
-                log.error = "Không tìm thấy PaymentIntent"
-                log.save(update_fields=["error"])
-                return Response({"error": "PaymentIntent not found"}, status=status.HTTP_404_NOT_FOUND)
-
-            if event == "AUTHORIZED":
-                intent.status = PaymentIntent.Status.AUTHORIZED
-                intent.save(update_fields=["status", "updated_at"])
-
-                # Nếu chưa có Payment thì tạo
-                payment, _ = Payment.objects.get_or_create(
-                    task=intent.task,
-                    defaults={
-                        "client": intent.client,
-                        "tasker": intent.task.tasker,  # tasker có thể null lúc tạo
-                        "amount": intent.amount,
-                        "currency": intent.currency,
-                    },
-                )
-                payment.mark_held()
-
-            elif event in ["CANCELED", "EXPIRED"]:
-                intent.status = PaymentIntent.Status.CANCELED if event == "CANCELED" else PaymentIntent.Status.EXPIRED
-                intent.save(update_fields=["status", "updated_at"])
-
-            log.processed = True
-            log.processed_at = timezone.now()
-            log.save(update_fields=["processed", "processed_at"])
-
-            return Response({"message": f"Webhook {event} processed"}, status=status.HTTP_200_OK)
-
-        except Exception as e:
-            log.error = str(e)
-            log.save(update_fields=["error"])
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            payload = loads_json(body)
+        except ValueError:
+            return JsonResponse({"error": "Invalid JSON"}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(payload, dict):
+            return JsonResponse({"error": "Invalid JSON"}, status=status.HTTP_400_BAD_REQUEST)
+
+        event = payload.get("event")
+        provider_ref = payload.get("provider_ref")
+        log = ProviderWebhookLog.objects.create(
+            provider=payload.get("provider", "MOCK"),
+            event=event or "UNKNOWN",
+            provider_ref=provider_ref,
+            signature=signature,
+            raw_payload=zlib.compress(body),
+            received_at=timezone.now(),
+        )
+
+        code, data = process_webhook_event(log, event, provider_ref)
+        return JsonResponse(data, status=code)
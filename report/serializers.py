@@ -83,6 +83,7 @@ class ReportCreateSerializer(serializers.ModelSerializer):
             "id",
             "type",
             "task",
+            "reporter",
             "reported_user",
             "category",
             "severity",
@@ -7,7 +7,7 @@ from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 from django.db import models
 from django.contrib.auth import get_user_model
-from noti.utils import push_notification
+from noti.utils import notification_batch, push_notification, push_notifications
 from noti.models import Notification
 
 from .models import Report, ReportAttachment, ReportEvent
@@ -47,17 +47,17 @@ class ReportListCreateView(generics.ListCreateAPIView):
         serializer.context["request"] = self.request
         report = serializer.save()
 
-        # 🔔 Gửi noti cho admin
+        # 🔔 Gửi noti cho admin: 1 query lấy id + 1 bulk_create, không phụ thuộc số admin
         User = get_user_model()
-        admins = User.objects.filter(is_staff=True)
-        for admin in admins:
-            push_notification(
-                user=admin,
-                type=Notification.Type.SYSTEM,
-                title=f"New report #{report.id}",
-                message=f"Report {report.title} created by {report.reporter.username}",
-                metadata={"report_id": report.id},
-            )
+        admin_ids = User.objects.filter(is_staff=True).values_list("id", flat=True)
+        push_notifications(
+            admin_ids,
+            type=Notification.Type.SYSTEM,
+            title=f"New report #{report.id}",
+            message=f"Report {report.title} created by {report.reporter.username}",
+            metadata={"report_id": report.id},
+            category="report",
+        )
         return report
 
 
@@ -127,47 +127,29 @@ class ReportModerateView(APIView):
             metadata={"source": "admin:moderate"},
         )
 
-        # 🔔 Notify reporter
-        push_notification(
-            user=report.reporter,
-            type=Notification.Type.SYSTEM,
-            title=f"Report #{report.id} updated",
-            message=f"Your report status: {report.status}",
-            metadata={"report_id": report.id},
-        )
-
-        # 🔔 Notify reported_user
-        if report.reported_user_id:
+        with notification_batch():
+            # 🔔 Notify reporter
             push_notification(
-                user=report.reported_user,
+                user=report.reporter_id,
                 type=Notification.Type.SYSTEM,
-                title=f"Report #{report.id} outcome",
-                message=f"You were reported. Status: {report.status}",
+                title=f"Report #{report.id} updated",
+                message=f"Your report status: {report.status}",
                 metadata={"report_id": report.id},
+                category="report",
             )
 
-        return Response({"message": "Report updated", "status": report.status}, status=status.HTTP_200_OK)
-
-User = get_user_model()
-
-class ReportListCreateView(generics.ListCreateAPIView):
-    ...
-    def perform_create(self, serializer):
-        serializer.context["request"] = self.request
-        report = serializer.save()
+            # 🔔 Notify reported_user
+            if report.reported_user_id:
+                push_notification(
+                    user=report.reported_user_id,
+                    type=Notification.Type.SYSTEM,
+                    title=f"Report #{report.id} outcome",
+                    message=f"You were reported. Status: {report.status}",
+                    metadata={"report_id": report.id},
+                    category="report",
+                )
 
-        # 🔔 Gửi noti cho admin
-        admins = User.objects.filter(is_staff=True)
-        for admin in admins:
-            push_notification(
-                user=admin,
-                type=Notification.Type.SYSTEM,
-                title=f"New report #{report.id}",
-                message=f"Report {report.title} created by {report.reporter.username}",
-                metadata={"report_id": report.id},
-            )
-        return report
-    
+        return Response({"message": "Report updated", "status": report.status}, status=status.HTTP_200_OK)
 
 class ReportStatusUpdateView(generics.UpdateAPIView):
     queryset = Report.objects.all()
@@ -177,21 +159,24 @@ class ReportStatusUpdateView(generics.UpdateAPIView):
     def perform_update(self, serializer):
         report = serializer.save()
 
-        # 🔔 Notify reporter
-        push_notification(
-            user=report.reporter,
-            type=Notification.Type.SYSTEM,
-            title=f"Report #{report.id} resolved",
-            message=f"Your report has been marked as {report.status}",
-            metadata={"report_id": report.id},
-        )
-
-        # 🔔 Notify reported_user
-        if report.reported_user:
+        with notification_batch():
+            # 🔔 Notify reporter
             push_notification(
-                user=report.reported_user,
+                user=report.reporter_id,
                 type=Notification.Type.SYSTEM,
-                title=f"Report #{report.id} outcome",
-                message=f"You were reported. Status: {report.status}",
+                title=f"Report #{report.id} resolved",
+                message=f"Your report has been marked as {report.status}",
                 metadata={"report_id": report.id},
-            )
\ No newline at end of file
+                category="report",
+            )
+
+            # 🔔 Notify reported_user
+            if report.reported_user_id:
+                push_notification(
+                    user=report.reported_user_id,
+                    type=Notification.Type.SYSTEM,
+                    title=f"Report #{report.id} outcome",
+                    message=f"You were reported. Status: {report.status}",
+                    metadata={"report_id": report.id},
+                    category="report",
+                )
\ No newline at end of file
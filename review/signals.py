@@ -7,15 +7,19 @@ Signals cho review app.
   2) Ghi 1 TaskEvent (dùng task.TaskEvent) để audit (sử dụng EventType có sẵn và metadata "review_created").
 
 Kỹ thuật:
-- Dùng transaction.on_commit(...) để thực hiện side-effects SAU khi transaction commit thành công.
-- Import noti.TaskEvent,... bên trong hàm để giảm nguy cơ circular import.
-- Ghi log mọi exception thay vì raise để không phá huỷ luồng chính.
+- Side-effects được ghi vào outbox (outbox.OutboxEvent) trong CÙNG transaction với
+  insert Review, relay worker (relay_outbox) sẽ tạo Notification/TaskEvent sau.
+  Không còn dùng transaction.on_commit(...) vì closure đó mất nếu process chết ngay sau commit.
+- Mỗi enqueue chạy trong savepoint riêng; ghi log mọi exception thay vì raise để không phá huỷ luồng chính.
 """
 import logging
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.db import transaction
-from django.utils import timezone
+
+from outbox.handlers import TOPIC_NOTIFICATION, TOPIC_TASK_EVENT
+from outbox.utils import enqueue
+from task.models import TaskEvent
 
 from .models import Review
 
@@ -25,82 +29,58 @@ logger = logging.getLogger(__name__)
 @receiver(post_save, sender=Review)
 def review_post_save(sender, instance: Review, created: bool, **kwargs):
     """
-    Xử lý khi review được tạo.
-    Side-effects (Notification, TaskEvent) sẽ chạy sau commit.
+    Xử lý khi review được tạo: ghi outbox cho Notification + TaskEvent.
     """
     if not created:
         return
 
     review = instance  # alias
 
-    def _after_commit():
-        # Import ở đây để tránh circular import khi module import lúc Django start
-        try:
-            from noti.models import Notification
-        except Exception as e:
-            logger.exception("Cannot import Notification model in review signals: %s", e)
-            Notification = None
-
-        try:
-            from task.models import TaskEvent
-        except Exception as e:
-            logger.exception("Cannot import TaskEvent model in review signals: %s", e)
-            TaskEvent = None
-
-        # 1) Create Notification for reviewee (if Notification model available)
-        if Notification is not None:
-            try:
-                task_title = getattr(review.task, "title", "")
-                title = f"Bạn vừa nhận được đánh giá từ {review.reviewer.username}"
-                message = (
-                    f"{review.reviewer.username} đã đánh giá bạn {review.rating}/5"
-                    f"{f' cho công việc \"{task_title}\"' if task_title else ''}."
-                )
-
-                Notification.objects.create(
-                    user=review.reviewee,
-                    type=Notification.Type.TASK,
-                    title=title,
-                    message=message,
-                    is_read=False,
-                    task=review.task,
-                    metadata={
-                        "rating": float(review.rating),
-                        "role": review.role,
-                        "review_id": review.id,
-                    },
-                    created_at=timezone.now(),
-                )
-            except Exception as exc:
-                # Log but don't raise — side-effect should not crash main flow
-                logger.exception("Failed to create Notification for Review(id=%s): %s", review.id, exc)
+    # 1) Notification cho reviewee
+    try:
+        task_title = getattr(review.task, "title", "")
+        title = f"Bạn vừa nhận được đánh giá từ {review.reviewer.username}"
+        message = (
+            f"{review.reviewer.username} đã đánh giá bạn {review.rating}/5"
+            f"{f' cho công việc \"{task_title}\"' if task_title else ''}."
+        )
 
-        # 2) Create TaskEvent for audit (if TaskEvent model available)
-        if TaskEvent is not None:
-            try:
-                # Use an existing EventType (avoid inventing new enum values).
-                # We reuse STATUS_CHANGED and attach metadata to indicate review creation.
-                TaskEvent.objects.create(
-                    task=review.task,
-                    actor=review.reviewer,
-                    event=TaskEvent.EventType.STATUS_CHANGED,
-                    from_status="",
-                    to_status=review.task.status,
-                    note=f"Review created: {review.reviewer_id} -> {review.reviewee_id}",
-                    metadata={
-                        "action": "review_created",
-                        "rating": review.rating,
-                        "role": review.role,
-                        "review_id": review.id,
-                    },
-                )
-            except Exception as exc:
-                logger.exception("Failed to create TaskEvent for Review(id=%s): %s", review.id, exc)
+        with transaction.atomic():
+            enqueue(TOPIC_NOTIFICATION, {
+                "user": review.reviewee_id,
+                "type": "TASK",
+                "title": title,
+                "message": message,
+                "task": review.task_id,
+                "category": "review",
+                "metadata": {
+                    "rating": float(review.rating),
+                    "role": review.role,
+                    "review_id": review.id,
+                },
+            })
+    except Exception as exc:
+        # Log but don't raise — side-effect should not crash main flow
+        logger.exception("Failed to enqueue Notification for Review(id=%s): %s", review.id, exc)
 
-    # Ensure the side-effects run only after the DB transaction commits.
+    # 2) TaskEvent for audit
     try:
-        transaction.on_commit(_after_commit)
+        # Use an existing EventType (avoid inventing new enum values).
+        # We reuse STATUS_CHANGED and attach metadata to indicate review creation.
+        with transaction.atomic():
+            enqueue(TOPIC_TASK_EVENT, {
+                "task": review.task_id,
+                "actor": review.reviewer_id,
+                "event": TaskEvent.EventType.STATUS_CHANGED,
+                "from_status": "",
+                "to_status": review.task.status,
+                "note": f"Review created: {review.reviewer_id} -> {review.reviewee_id}",
+                "metadata": {
+                    "action": "review_created",
+                    "rating": review.rating,
+                    "role": review.role,
+                    "review_id": review.id,
+                },
+            })
     except Exception as exc:
-        # If on_commit is not available for some reason, attempt to run synchronously
-        logger.exception("transaction.on_commit failed for Review(id=%s): %s. Running side-effects synchronously.", review.id, exc)
-        _after_commit()
+        logger.exception("Failed to enqueue TaskEvent for Review(id=%s): %s", review.id, exc)
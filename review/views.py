@@ -1,4 +1,5 @@
 # review/views.py
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
@@ -27,8 +28,9 @@ class ReviewCreateView(generics.CreateAPIView):
     permission_classes = [permissions.IsAuthenticated, CanCreateReview]
 
     def perform_create(self, serializer):
-        review = serializer.save(reviewer=self.request.user)
-        # TODO: Tích hợp TaskEvent + Notification ở đây
+        # Review + outbox (Notification, TaskEvent từ review/signals.py) commit cùng nhau
+        with transaction.atomic():
+            review = serializer.save(reviewer=self.request.user)
         return review
 
 
@@ -1,6 +1,7 @@
 from rest_framework import generics, permissions, status, viewsets
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 
 from .models import Category, Task, TaskerSkill, TaskAttachment, TaskEvent
@@ -20,6 +21,9 @@ from .permissions import (
 )
 from user.models import User
 from payment.models import Payment
+from payment.fees import resolve_fee_percent
+from outbox.handlers import TOPIC_TASK_EVENT
+from outbox.utils import enqueue
 
 
 # -------------------------
@@ -85,28 +89,57 @@ class TaskAcceptView(APIView):
             return Response({"error": "Thanh toán chưa được xác thực (escrow chưa giữ tiền)."},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        # Nếu chưa có Payment record → tạo mới
-        if not hasattr(task, "payment"):
-            payment = Payment.objects.create(
-                task=task,
-                client=task.client,
-                tasker=request.user,
+        # Payment, task và side-effect (qua outbox) commit cùng nhau
+        with transaction.atomic():
+            # Phí theo FeeRule (category / level tasker / promotion), mặc định PLATFORM_FEE_PERCENT_DEFAULT
+            tasker_level = (
+                TaskerSkill.objects.filter(user=request.user, category_id=task.category_id)
+                .values_list("experience_level", flat=True).first()
+            )
+            fee_percent = resolve_fee_percent(
+                category_id=task.category_id,
+                tasker_level=tasker_level,
+                promotion=(task.attributes or {}).get("promotion_code"),
                 amount=task.price,
-                currency=task.payment_intent.currency,
-                platform_fee_percent=10.0  # ví dụ: 10% phí nền tảng
             )
-            payment.mark_held()
-        else:
-            payment = task.payment
-            if payment.status != Payment.Status.HELD:
-                payment.mark_held()
 
-        # Gán tasker và update status
-        task.tasker = request.user
-        task.status = "in_progress"  # giữ đúng với Task.Status
-        task.save()
+            # Nếu chưa có Payment record → tạo mới
+            if not hasattr(task, "payment"):
+                payment = Payment.objects.create(
+                    task=task,
+                    client=task.client,
+                    tasker=request.user,
+                    amount=task.price,
+                    currency=task.payment_intent.currency,
+                    platform_fee_percent=fee_percent,
+                )
+                payment.mark_held()
+            else:
+                # Payment thường do webhook AUTHORIZED tạo trước (chưa có tasker / level):
+                # gán tasker và định giá lại phí theo level của tasker nhận task
+                payment = Payment.objects.select_for_update().get(pk=task.payment.pk)
+                if payment.tasker_id is None:
+                    payment.tasker = request.user
+                    payment.save(update_fields=["tasker", "updated_at"])
+                if (payment.platform_fee_percent != fee_percent
+                        and payment.status in [Payment.Status.NONE, Payment.Status.HELD]):
+                    payment.reprice_fee(fee_percent)
+                if payment.status != Payment.Status.HELD:
+                    payment.mark_held()
+
+            # Gán tasker và update status
+            from_status = task.status
+            task.tasker = request.user
+            task.status = "in_progress"  # giữ đúng với Task.Status
+            task.save()
 
-        TaskEvent.objects.create(task=task, event="assigned", actor=request.user)
+            enqueue(TOPIC_TASK_EVENT, {
+                "task": task.id,
+                "event": TaskEvent.EventType.ASSIGNED,
+                "actor": request.user.id,
+                "from_status": from_status,
+                "to_status": task.status,
+            })
 
         return Response({"message": "Nhận task thành công"}, status=status.HTTP_200_OK)
 